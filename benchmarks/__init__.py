@@ -0,0 +1 @@
+"""Performance measurements for Pedantic, run with `python -m benchmarks.<name>`."""
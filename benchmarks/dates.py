@@ -0,0 +1,101 @@
+"""
+Date parameter validation cost, dateutil against the format recognizers.
+
+Times checking the values of a query string of many dates with dateutil
+alone (as before `pedantic.dates`), with the recognizers and an empty memo,
+and with the memo warm, then validating the whole request.
+
+Usage:
+    python -m benchmarks.dates
+"""
+
+from __future__ import absolute_import, print_function
+
+import timeit
+from datetime import datetime, timedelta
+try:
+    from urllib.parse import urlencode
+except ImportError:
+    from urllib import urlencode
+
+from pedantic import dates
+from pedantic.check_against_schema import (
+    compile_method,
+    parse_data,
+    validate_request_against_schema,
+)
+
+FORMATS = (
+    '{:%a, %d %b %Y %H:%M:%S} GMT',
+    '{:%A, %d-%b-%y %H:%M:%S} GMT',
+    '{:%a %b %d %H:%M:%S %Y}',
+    '{:%Y-%m-%d}',
+    '{:%Y-%m-%dT%H:%M:%S}Z',
+)
+SIZES = (1, 10, 100)
+NUMBER = 200
+
+
+def make_values(count):
+    """ Distinct dates, in every format in turn """
+    start = datetime(1994, 11, 6, 8, 49, 37)
+    return [FORMATS[index % len(FORMATS)].format(start + timedelta(days=index))
+            for index in range(count)]
+
+
+def _dateutil(values):
+    for value in values:
+        dates._parse(value)
+
+
+def _cold(values):
+    dates.clear()
+    for value in values:
+        dates.is_date(value)
+
+
+def _warm(values):
+    for value in values:
+        dates.is_date(value)
+
+
+def run(sizes=SIZES, number=NUMBER):
+    method = compile_method({
+        'method': 'get',
+        'queryParameters': {'since': {'type': 'date'}},
+    })
+    results = []
+    for size in sizes:
+        values = make_values(size)
+        fixture = {
+            'method': 'GET',
+            'path_info': '/',
+            'query_string': urlencode([('since', value) for value in values]),
+            'request': {'any': 'value'},
+        }
+        data = parse_data(dict(fixture), parse_query=False)
+
+        def validate():
+            validate_request_against_schema(data, method)
+
+        timings = []
+        for call in (lambda: _dateutil(values), lambda: _cold(values),
+                     lambda: _warm(values), validate):
+            call()
+            seconds = min(timeit.repeat(call, number=number, repeat=3))
+            timings.append(seconds / number * 1e6)
+        results.append((size, timings))
+    dates.clear()
+    return results
+
+
+def main():
+    print("{:>6} {:>14} {:>14} {:>14} {:>14}".format(
+        "dates", "dateutil (us)", "cold (us)", "warm (us)", "request (us)"))
+    for size, timings in run():
+        print("{:>6} {:>14.1f} {:>14.1f} {:>14.1f} {:>14.1f}".format(
+            size, *timings))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Envelope check of `parse_data`: hand coded fast path against jsonschema.
+
+Usage:
+    python -m benchmarks.envelope
+"""
+
+from __future__ import absolute_import, print_function
+
+import timeit
+
+from pedantic.check_against_schema import (
+    LOCAL_SCHEMA,
+    LOCAL_SCHEMA_KEY,
+    _is_envelope,
+    _validate,
+)
+
+NUMBER = 20000
+FIXTURE = {
+    'method': 'POST',
+    'path_info': '/api/v5/test/',
+    'query_string': 'required_param=a_string,optional_param=1',
+    'status_code': 200,
+    'request': {'x': 'data'},
+    'response': {'data': {'some': 'thing'}},
+}
+
+
+def run(number=NUMBER):
+    checks = [
+        ('jsonschema', lambda: _validate(
+            FIXTURE, LOCAL_SCHEMA, key=LOCAL_SCHEMA_KEY)),
+        ('fast path', lambda: _is_envelope(FIXTURE)),
+    ]
+    results = []
+    for name, check in checks:
+        seconds = min(timeit.repeat(check, number=number, repeat=3))
+        results.append((name, seconds / number * 1e6))
+    return results
+
+
+def main():
+    results = run()
+    baseline = results[0][1]
+    print("{:>12} {:>12} {:>9}".format("check", "time (us)", "speedup"))
+    for name, micros in results:
+        print("{:>12} {:>12.2f} {:>8.1f}x".format(
+            name, micros, baseline / micros))
+
+
+if __name__ == "__main__":
+    main()
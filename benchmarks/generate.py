@@ -0,0 +1,373 @@
+"""
+Generates fixtures from a parsed spec, or a synthetic spec, for load tests.
+
+For every method of the spec, writes a valid and a deliberately invalid
+request fixture, and a valid and an invalid response fixture per status
+code. Each generated case is checked against Pedantic itself and dropped
+unless it gets the expected verdict, e.g. for schemas using `$ref`. Run it
+with `python -m benchmarks.generate`, then replay the cases with
+`benchmarks.load`.
+
+Usage:
+    benchmarks.generate fixtures <spec> [--output=PATH]
+    benchmarks.generate spec [--resources=N] [--depth=N] [--properties=N] [--output=PATH]
+
+Options:
+    -h, --help          Show this screen
+    --output=PATH       Write to this file rather than stdout
+    --resources=N       Resources of the synthetic spec [default: 1000]
+    --depth=N           Nested sub-resources per top-level resource [default: 1]
+    --properties=N      Properties of the request and response bodies [default: 5]
+"""
+
+from __future__ import absolute_import, print_function
+
+import json
+import re
+import sys
+from copy import deepcopy
+try:
+    import re._parser as sre_parse
+    from re._constants import MAXREPEAT
+except ImportError:
+    import sre_parse
+    from sre_constants import MAXREPEAT
+try:
+    from urllib.parse import urlencode
+except ImportError:
+    from urllib import urlencode
+
+import docopt
+
+from pedantic.check_against_schema import (
+    JSONSchemaValidationError,
+    RouteIndex,
+    UndefinedSchemaError,
+    get_spec,
+    parse_data,
+    validate_request_against_schema,
+    validate_response_against_schema,
+)
+
+from .synthetic import make_spec
+
+DATE = 'Sun, 06 Nov 1994 08:49:37 GMT'
+# the value of the wrong type put in an invalid body, by expected type
+WRONG_TYPES = {
+    'string': 12345,
+    'integer': 'not an integer',
+    'number': 'not a number',
+    'boolean': 'not a boolean',
+    'array': 'not an array',
+    'object': 'not an object',
+    'null': 'not null',
+}
+uri_parameter = re.compile(r'{([^}]+)}')
+
+
+class Unsupported(Exception):
+    """Raised for schemas no instance can be generated for."""
+    pass
+
+
+def sample(schema):
+    """
+    Returns an instance of the schema, preferring its declared examples.
+
+    :raises: :class:`.Unsupported`
+
+    """
+    if not isinstance(schema, dict) or '$ref' in schema or 'not' in schema:
+        raise Unsupported(schema)
+    for key in ('example', 'default'):
+        if key in schema:
+            return deepcopy(schema[key])
+    if schema.get('enum'):
+        return deepcopy(schema['enum'][0])
+    if 'allOf' in schema:
+        merged = {}
+        for option in schema['allOf']:
+            value = sample(option)
+            if not isinstance(value, dict):
+                return value
+            merged.update(value)
+        return merged
+    for key in ('anyOf', 'oneOf'):
+        if schema.get(key):
+            return sample(schema[key][0])
+
+    kind = _type(schema)
+    if kind == 'object':
+        return dict(
+            (name, sample(prop))
+            for (name, prop) in sorted(schema.get('properties', {}).items()))
+    if kind == 'array':
+        items = schema.get('items', {})
+        if isinstance(items, list):
+            return [sample(item) for item in items]
+        count = max(schema.get('minItems', 1), 1)
+        if 'maxItems' in schema:
+            count = min(count, schema['maxItems'])
+        return [sample(items) for _ in range(count)]
+    if kind in ('integer', 'number'):
+        value = 1
+        if 'minimum' in schema:
+            value = int(schema['minimum']) + 1
+        if 'maximum' in schema:
+            value = min(value, int(schema['maximum']) - 1)
+            if value < schema.get('minimum', value):
+                value = schema['minimum']
+        return value
+    if kind == 'boolean':
+        return True
+    if kind == 'null':
+        return None
+    if kind == 'date':
+        return DATE
+    if kind == 'string':
+        if 'pattern' in schema:
+            return pattern_string(schema['pattern'])
+        value = 'value'
+        value += 'x' * (schema.get('minLength', 0) - len(value))
+        return value[:schema.get('maxLength', len(value))]
+    raise Unsupported(schema)
+
+
+def _type(schema):
+    kind = schema.get('type')
+    if isinstance(kind, list):
+        kind = next((k for k in kind if k != 'null'), 'null')
+    if kind is None:
+        if 'properties' in schema:
+            return 'object'
+        if 'items' in schema:
+            return 'array'
+        return 'string'
+    return kind
+
+
+def pattern_string(pattern):
+    """ Returns a string matching the regular expression """
+    return ''.join(_expand(sre_parse.parse(pattern)))
+
+
+def _expand(parsed):
+    for (op, arg) in parsed:
+        name = str(op)
+        if name == 'LITERAL':
+            yield chr(arg)
+        elif name == 'NOT_LITERAL':
+            yield 'a' if arg != ord('a') else 'b'
+        elif name == 'ANY':
+            yield 'a'
+        elif name == 'IN':
+            yield _first_in(arg)
+        elif name in ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT'):
+            (low, high, item) = arg
+            count = max(low, 1) if high == MAXREPEAT else min(max(low, 1), high)
+            for _ in range(count):
+                for char in _expand(item):
+                    yield char
+        elif name == 'SUBPATTERN':
+            for char in _expand(arg[-1]):
+                yield char
+        elif name == 'BRANCH':
+            for char in _expand(arg[1][0]):
+                yield char
+        elif name in ('AT', 'ASSERT', 'ASSERT_NOT'):
+            continue
+        else:
+            raise Unsupported(name)
+
+
+def _first_in(items):
+    if items and str(items[0][0]) == 'NEGATE':
+        excluded = ''.join(_first_in([item]) for item in items[1:])
+        return next(char for char in 'az09_' if char not in excluded)
+    (op, arg) = items[0]
+    name = str(op)
+    if name == 'LITERAL':
+        return chr(arg)
+    if name == 'RANGE':
+        return chr(arg[0])
+    if name == 'CATEGORY':
+        return {'CATEGORY_DIGIT': '1', 'CATEGORY_SPACE': ' '}.get(
+            str(arg), 'a')
+    raise Unsupported(name)
+
+
+def break_instance(schema, instance):
+    """
+    Returns a copy of a valid object instance that violates the schema, or
+    None if no violation is known for it.
+    """
+    if not isinstance(instance, dict):
+        return None
+    broken = deepcopy(instance)
+    for (name, prop) in sorted(schema.get('properties', {}).items()):
+        kind = prop.get('type') if isinstance(prop, dict) else None
+        if isinstance(kind, str) and kind in WRONG_TYPES:
+            broken[name] = WRONG_TYPES[kind]
+            return broken
+    if schema.get('required'):
+        broken.pop(schema['required'][0], None)
+        return broken
+    if schema.get('additionalProperties') is False:
+        broken['unexpected_property'] = 'value'
+        return broken
+    return None
+
+
+def generate(spec):
+    """
+    Generates fixtures for every method and status code of the spec.
+
+    :param dict spec: the parsed spec
+
+    :rtype tuple: the cases, each with a ``name``, its ``expect``ed status
+        and the ``fixture``, and how many cases were dropped
+
+    """
+    index = RouteIndex(spec)
+    cases = []
+    dropped = 0
+    for (path, method) in _methods(spec, '', {}):
+        for case in _method_cases(path, method):
+            if case is None:
+                dropped += 1
+            elif _verdict(case['fixture'], index) == case['expect']:
+                cases.append(case)
+            else:
+                dropped += 1
+    return cases, dropped
+
+
+def _methods(resource, parent_uri, uri_params):
+    for child in resource.get('resources', ()):
+        params = dict(uri_params)
+        params.update(child.get('uriParameters') or {})
+        uri = parent_uri + child['relativeUri']
+        for method in child.get('methods', ()):
+            try:
+                yield _path(uri, params), method
+            except Unsupported:
+                continue
+        for found in _methods(child, uri, params):
+            yield found
+
+
+def _path(uri, uri_params):
+    def replace(match):
+        schema = uri_params.get(match.group(1)) or {}
+        return '{}'.format(sample(dict(schema, type=schema.get('type', 'string'))))
+    return uri_parameter.sub(replace, uri)
+
+
+def _body_schema(definition):
+    try:
+        raw = definition['body']['application/json']['schema']
+    except (KeyError, TypeError):
+        return None
+    return json.loads(raw) if raw else None
+
+
+def _method_cases(path, method):
+    name = '{} {}'.format(method['method'].upper(), path)
+    envelope = {'method': method['method'].upper(), 'path_info': path}
+    params = method.get('queryParameters') or {}
+    try:
+        query = dict(
+            (key, _query_value(sample(schema)))
+            for (key, schema) in sorted(params.items()))
+    except Unsupported:
+        query = None
+    if query:
+        envelope['query_string'] = urlencode(query)
+
+    # requests
+    schema = _body_schema(method)
+    try:
+        body = sample(schema) if schema else {'any': 'value'}
+    except Unsupported:
+        body = None
+    yield _case(name + ' request', 200, envelope, request=body)
+    if schema and body is not None:
+        yield _case(name + ' request invalid body', 400, envelope,
+                    request=break_instance(schema, body))
+    required = [key for (key, schema) in sorted(params.items())
+                if schema.get('required') in (True, 'true')]
+    if query and required and body:
+        invalid = dict(envelope, query_string=urlencode(dict(
+            (key, value) for (key, value) in query.items()
+            if key != required[0])))
+        yield _case(name + ' request missing query param', 400, invalid,
+                    request=body)
+
+    # responses
+    for (code, response) in sorted((method.get('responses') or {}).items()):
+        schema = _body_schema(response)
+        try:
+            body = sample(schema) if schema else {'any': 'value'}
+        except Unsupported:
+            body = None
+        label = '{} response {}'.format(name, code)
+        yield _case(label, 200, envelope, status_code=int(code),
+                    response=body)
+        if schema and body is not None:
+            yield _case(label + ' invalid body', 400, envelope,
+                        status_code=int(code),
+                        response=break_instance(schema, body))
+
+
+def _query_value(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, list):
+        return ','.join(_query_value(item) for item in value)
+    return '{}'.format(value)
+
+
+def _case(name, expect, envelope, **fields):
+    if any(value is None for value in fields.values()):
+        return None
+    fixture = dict(envelope, **fields)
+    return {'name': name, 'expect': expect, 'fixture': fixture}
+
+
+def _verdict(fixture, index):
+    """ The status `POST /` answers for the fixture, without a whitelist """
+    try:
+        data = parse_data(deepcopy(fixture))
+        method = get_spec(data, index)
+        if data.request:
+            validate_request_against_schema(data, method)
+        if data.response:
+            validate_response_against_schema(data, method)
+    except (JSONSchemaValidationError, UndefinedSchemaError):
+        return 400
+    except Exception:
+        return 500
+    return 200
+
+
+def main(argv=None):
+    args = docopt.docopt(__doc__, argv)
+    if args['spec']:
+        output = make_spec(int(args['--resources']), int(args['--depth']),
+                           int(args['--properties']))
+    else:
+        with open(args['<spec>']) as f:
+            output, dropped = generate(json.load(f))
+        print("{} fixtures generated, {} dropped".format(
+            len(output), dropped), file=sys.stderr)
+
+    if args['--output']:
+        with open(args['--output'], 'w') as f:
+            json.dump(output, f, indent=1)
+    else:
+        json.dump(output, sys.stdout, indent=1)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
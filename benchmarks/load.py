@@ -0,0 +1,164 @@
+"""
+Replays generated fixtures against a running service at a set concurrency.
+
+Each thread keeps its connection alive and posts the next case in turn,
+cycling through the cases until the number of requests or the duration is
+reached. Reports the throughput and latency distribution, overall and by
+expected status, and the responses whose status wasn't the expected one.
+Run it with `python -m benchmarks.load`, the cases are written by
+`benchmarks.generate`.
+
+Usage:
+    benchmarks.load <url> <cases> [options]
+
+Options:
+    -h, --help          Show this screen
+    --concurrency=N     Requests in flight [default: 8]
+    --requests=N        Requests sent in total [default: 10000]
+    --duration=SECONDS  Stop after this long, even before --requests
+    --timeout=SECONDS   Timeout of each request [default: 30]
+"""
+
+from __future__ import absolute_import, print_function
+
+import itertools
+import json
+import sys
+import threading
+try:
+    from http.client import HTTPConnection
+    from urllib.parse import urlparse
+except ImportError:
+    from httplib import HTTPConnection
+    from urlparse import urlparse
+
+import docopt
+
+from pedantic.metrics import timer
+
+from .suite import percentile
+
+MAX_LISTED = 20  # cases with an unexpected status listed in the report
+
+
+class Driver(object):
+    """Posts the cases to `POST /` of the service, from several threads.
+
+    :param str url: the service's URL, e.g. ``http://localhost:5000``
+
+    :param list cases: as written by `benchmarks.generate`
+
+    """
+
+    def __init__(self, url, cases, concurrency=8, timeout=30):
+        self.url = urlparse(url)
+        self.cases = [
+            (case['name'], case['expect'], json.dumps(case['fixture']))
+            for case in cases]
+        self.concurrency = concurrency
+        self.timeout = timeout
+        # (expected status, status or None if the request failed, seconds)
+        self.samples = []
+        self.mismatches = {}
+        self._lock = threading.Lock()
+
+    def run(self, requests, duration=None):
+        """ Sends the requests, returns the elapsed seconds """
+        counter = itertools.count()
+        started = timer()
+        deadline = started + duration if duration else None
+        threads = [
+            threading.Thread(target=self._send, args=(counter, requests,
+                                                      deadline))
+            for _ in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return timer() - started
+
+    def _send(self, counter, requests, deadline):
+        connection = None
+        samples = []
+        mismatches = {}
+        path = self.url.path.rstrip('/') + '/'
+        for number in counter:
+            if number >= requests or (deadline and timer() > deadline):
+                break
+            (name, expect, body) = self.cases[number % len(self.cases)]
+            if connection is None:
+                connection = HTTPConnection(
+                    self.url.hostname, self.url.port, timeout=self.timeout)
+            started = timer()
+            try:
+                connection.request('POST', path, body, {
+                    'Content-Type': 'application/json'})
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except Exception:
+                connection.close()
+                connection = None
+                status = None
+            samples.append((expect, status, timer() - started))
+            if status != expect:
+                mismatches[name] = status
+        if connection is not None:
+            connection.close()
+        with self._lock:
+            self.samples.extend(samples)
+            self.mismatches.update(mismatches)
+
+    def report(self, elapsed):
+        """ Returns the results as printable lines """
+        lines = ["{} requests in {:.2f}s: {:.0f} requests/s".format(
+            len(self.samples), elapsed, len(self.samples) / elapsed)]
+        if not self.samples:
+            return lines
+        failed = sum(1 for sample in self.samples if sample[1] is None)
+        if failed:
+            lines.append("{} requests failed".format(failed))
+        lines.append("{:>10} {:>8} {:>10} {:>10} {:>10} {:>10}".format(
+            "expected", "count", "p50 (ms)", "p90 (ms)", "p99 (ms)",
+            "max (ms)"))
+        groups = [('all', self.samples)] + [
+            (expect, [sample for sample in self.samples
+                      if sample[0] == expect])
+            for expect in sorted(set(sample[0] for sample in self.samples))]
+        for (label, samples) in groups:
+            latencies = sorted(sample[2] * 1000 for sample in samples)
+            lines.append(
+                "{:>10} {:>8} {:>10.2f} {:>10.2f} {:>10.2f} {:>10.2f}".format(
+                    label, len(latencies), percentile(latencies, 0.5),
+                    percentile(latencies, 0.9), percentile(latencies, 0.99),
+                    latencies[-1]))
+        if self.mismatches:
+            lines.append("{} cases got an unexpected status:".format(
+                len(self.mismatches)))
+            names = sorted(self.mismatches)
+            for name in names[:MAX_LISTED]:
+                lines.append("  {} ({})".format(name, self.mismatches[name]))
+            if len(names) > MAX_LISTED:
+                lines.append("  ... and {} more".format(
+                    len(names) - MAX_LISTED))
+        return lines
+
+
+def main(argv=None):
+    args = docopt.docopt(__doc__, argv)
+    with open(args['<cases>']) as f:
+        cases = json.load(f)
+    if not cases:
+        print("No cases to replay.", file=sys.stderr)
+        return 1
+    driver = Driver(args['<url>'], cases, int(args['--concurrency']),
+                    float(args['--timeout']))
+    duration = float(args['--duration']) if args['--duration'] else None
+    elapsed = driver.run(int(args['--requests']), duration)
+    for line in driver.report(elapsed):
+        print(line)
+    return 1 if driver.mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""
+Memory held by a loaded spec against spec size.
+
+Measures with `tracemalloc` what stays allocated once a spec received as
+JSON text is loaded, next to what its parsed JSON alone takes.
+
+Usage:
+    python -m benchmarks.memory
+"""
+
+from __future__ import absolute_import, print_function
+
+import gc
+import json
+import tracemalloc
+
+from pedantic import validator_service as val
+
+from .synthetic import make_spec
+
+SIZES = (100, 1000, 10000)
+
+
+def retained(function, *args):
+    """ Calls the function, returns the bytes its result holds on to """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = function(*args)
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del result
+    return size
+
+
+def run(sizes=SIZES):
+    results = []
+    for size in sizes:
+        text = json.dumps(make_spec(size))
+        results.append((
+            size,
+            retained(json.loads, text),
+            retained(val.load_spec, text),
+        ))
+    return results
+
+
+def main():
+    print("{:>10} {:>12} {:>12}".format("resources", "json (MB)", "loaded (MB)"))
+    for size, parsed, loaded in run():
+        print("{:>10} {:>12.1f} {:>12.1f}".format(
+            size, parsed / 1e6, loaded / 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Route lookup cost against spec size.
+
+Usage:
+    python -m benchmarks.routes
+"""
+
+from __future__ import absolute_import, print_function
+
+import timeit
+
+from pedantic.check_against_schema import RouteIndex, _get_path_segments
+
+from .synthetic import make_spec, make_path
+
+SIZES = (100, 1000, 10000)
+NUMBER = 2000
+
+
+def run(sizes=SIZES, number=NUMBER):
+    results = []
+    for size in sizes:
+        index = RouteIndex(make_spec(size))
+        # the last resource was the worst case for the old linear scan
+        req_segs = _get_path_segments(make_path(size))['remaining']
+        seconds = min(timeit.repeat(
+            lambda: index.lookup(req_segs), number=number, repeat=3))
+        results.append((index.size, seconds / number * 1e6))
+    return results
+
+
+def main():
+    print("{:>10} {:>14}".format("resources", "lookup (us)"))
+    for size, micros in run():
+        print("{:>10} {:>14.2f}".format(size, micros))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Times each validation step against synthetic specs of increasing size.
+
+Reports the throughput and latency percentiles of `parse_data`, `get_spec`,
+`validate_request_against_schema`, `validate_response_against_schema` and
+of `POST /` through the Flask test client. Results can be saved as a
+baseline and compared against on a later commit. Run it with
+`python -m benchmarks.suite`.
+
+Usage:
+    benchmarks.suite [options]
+
+Options:
+    -h, --help          Show this screen
+    --sizes=LIST        Resources of the synthetic specs, comma separated [default: 100,1000,10000]
+    --depth=N           Nested sub-resources per top-level resource [default: 1]
+    --properties=N      Properties of the request and response bodies [default: 5]
+    --number=N          Calls timed per step and spec [default: 1000]
+    --save=PATH         Save the results as a JSON baseline
+    --compare=PATH      Compare the median of each step against a saved baseline
+    --threshold=RATIO   Slowdown of the median reported as a regression [default: 0.1]
+"""
+
+from __future__ import absolute_import, print_function
+
+import json
+import platform
+import subprocess
+import sys
+from copy import deepcopy
+
+import docopt
+
+from pedantic import validator_service as val
+from pedantic.check_against_schema import (
+    RouteIndex,
+    get_spec,
+    parse_data,
+    validate_request_against_schema,
+    validate_response_against_schema,
+)
+from pedantic.metrics import timer
+
+from .synthetic import make_fixture, make_spec
+
+STEPS = ('parse_data', 'get_spec', 'validate_request', 'validate_response',
+         'endpoint')
+
+
+def percentile(samples, fraction):
+    """ Nearest rank percentile of sorted samples """
+    index = int(round(fraction * (len(samples) - 1)))
+    return samples[index]
+
+
+def measure(call, number):
+    """
+    Times `number` calls, after one untimed call to warm caches.
+
+    :rtype dict: the calls per second and the 50th, 90th and 99th
+        percentile latencies, in microseconds
+
+    """
+    call()
+    samples = []
+    for _ in range(number):
+        started = timer()
+        call()
+        samples.append(timer() - started)
+    samples.sort()
+    return {
+        'ops': number / sum(samples),
+        'p50': percentile(samples, 0.5) * 1e6,
+        'p90': percentile(samples, 0.9) * 1e6,
+        'p99': percentile(samples, 0.99) * 1e6,
+    }
+
+
+def run(sizes, depth=1, properties=5, number=1000):
+    """
+    Times every step against a spec of each size.
+
+    :rtype dict: the `measure` results keyed by "<step> <size>"
+
+    """
+    val.app.config['TESTING'] = True
+    client = val.app.test_client()
+    cache_size = val.verdicts.max_size
+    # every call must validate rather than answer from the verdict cache
+    val.verdicts.resize(0)
+    results = {}
+    try:
+        for size in sizes:
+            spec = make_spec(size, depth, properties)
+            index = RouteIndex(spec)
+            val.set_proxy_settings(deepcopy(spec), None)
+            fixture = make_fixture(size, depth, properties)
+            data = parse_data(deepcopy(fixture))
+            method = get_spec(data, index)
+            body = json.dumps(fixture)
+            calls = {
+                'parse_data': lambda: parse_data(dict(fixture)),
+                'get_spec': lambda: get_spec(data, index),
+                'validate_request': lambda: validate_request_against_schema(
+                    data, method),
+                'validate_response': lambda: validate_response_against_schema(
+                    data, method),
+                'endpoint': lambda: client.post(
+                    '/', data=body, content_type='application/json'),
+            }
+            for step in STEPS:
+                results['{} {}'.format(step, size)] = measure(
+                    calls[step], number)
+    finally:
+        val.verdicts.resize(cache_size)
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            stderr=subprocess.DEVNULL).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+    }
+
+
+def compare(results, baseline):
+    """
+    Compares the median latencies against the baseline's.
+
+    :rtype list: (name, median, baseline median, change) for every result
+        also in the baseline, the change being the relative slowdown
+
+    """
+    rows = []
+    for name in sorted(results):
+        if name in baseline:
+            median = results[name]['p50']
+            before = baseline[name]['p50']
+            rows.append((name, median, before, median / before - 1))
+    return rows
+
+
+def main(argv=None):
+    args = docopt.docopt(__doc__, argv)
+    sizes = [int(size) for size in args['--sizes'].split(',')]
+    results = run(sizes, int(args['--depth']), int(args['--properties']),
+                  int(args['--number']))
+
+    print("{:>24} {:>12} {:>10} {:>10} {:>10}".format(
+        "step", "calls/s", "p50 (us)", "p90 (us)", "p99 (us)"))
+    for size in sizes:
+        for step in STEPS:
+            name = '{} {}'.format(step, size)
+            result = results[name]
+            print("{:>24} {:>12.0f} {:>10.1f} {:>10.1f} {:>10.1f}".format(
+                name, result['ops'], result['p50'], result['p90'],
+                result['p99']))
+
+    if args['--save']:
+        with open(args['--save'], 'w') as f:
+            json.dump({'environment': environment(), 'results': results},
+                      f, indent=2, sort_keys=True)
+
+    if args['--compare']:
+        with open(args['--compare']) as f:
+            saved = json.load(f)
+        threshold = float(args['--threshold'])
+        print("\ncompared to {} (python {}):".format(
+            saved['environment'].get('commit') or args['--compare'],
+            saved['environment'].get('python')))
+        regressions = 0
+        for name, median, before, change in compare(
+                results, saved['results']):
+            flag = ''
+            if change > threshold:
+                flag = '  REGRESSION'
+                regressions += 1
+            print("{:>24} {:>10.1f} {:>10.1f} {:>+8.1%}{}".format(
+                name, median, before, change, flag))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""Synthetic parsed-RAML specs shaped like `tests/example_schema.json`."""
+
+from __future__ import absolute_import, unicode_literals
+
+import json
+
+
+def make_body_schema(properties=5):
+    return {
+        'type': 'object',
+        'required': ['prop0'],
+        'properties': dict(
+            ('prop{}'.format(idx), {'type': 'string', 'maxLength': 64})
+            for idx in range(properties)
+        ),
+    }
+
+
+def make_method(properties=5):
+    body = json.dumps(make_body_schema(properties))
+    return {
+        'method': 'post',
+        'queryParameters': {
+            'required_param': {'type': 'string', 'required': True},
+            'optional_param': {'type': 'number'},
+        },
+        'body': {'application/json': {'schema': body}},
+        'responses': {
+            '200': {'body': {'application/json': {'schema': body}}},
+        },
+    }
+
+
+def make_resource(name, depth, properties):
+    """A `/name/{name_id}` resource with `depth` nested sub-resources."""
+    param = '{}_id'.format(name)
+    leaf = item = {
+        'relativeUri': '/{' + param + '}',
+        'uriParameters': {
+            param: {'type': 'string', 'pattern': '^{}:\\d+$'.format(name)},
+        },
+        'methods': [make_method(properties)],
+    }
+    for level in range(depth):
+        child = {
+            'relativeUri': '/sub{}'.format(level),
+            'methods': [make_method(properties)],
+        }
+        leaf['resources'] = [child]
+        leaf = child
+    return {
+        'relativeUri': '/{}'.format(name),
+        'methods': [make_method(properties)],
+        'resources': [item],
+    }
+
+
+def make_spec(resources=100, depth=1, properties=5):
+    """
+    Returns a spec with roughly `resources` resources under `/api/v5`.
+
+    Every top-level resource accounts for `depth + 2` resources.
+
+    """
+    count = max(1, resources // (depth + 2))
+    return {
+        'resources': [{
+            'relativeUri': '/api/v5',
+            'resources': [
+                make_resource('res{}'.format(idx), depth, properties)
+                for idx in range(count)
+            ],
+        }]
+    }
+
+
+def make_path(resources=100, depth=1, idx=None):
+    """Returns a request path to the deepest resource of one spec entry."""
+    count = max(1, resources // (depth + 2))
+    if idx is None:
+        idx = count - 1
+    name = 'res{}'.format(idx)
+    subs = ''.join('/sub{}'.format(level) for level in range(depth))
+    return '/api/v5/{0}/{0}:1{1}'.format(name, subs)
+
+
+def make_fixture(resources=100, depth=1, properties=5, idx=None):
+    """Returns a valid fixture for `make_path`, in the format of `POST /`."""
+    body = dict(
+        ('prop{}'.format(prop), 'value{}'.format(prop))
+        for prop in range(properties)
+    )
+    return {
+        'method': 'POST',
+        'path_info': make_path(resources, depth, idx),
+        'query_string': 'required_param=a_string&optional_param=1',
+        'status_code': 200,
+        'request': body,
+        'response': dict(body),
+    }
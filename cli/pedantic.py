@@ -1,42 +1,176 @@
 #!/usr/bin/env python
 """
-Configure and start the Pedantic service.
+Configure and start the Pedantic service, or check fixture files offline.
 
 Usage:
-    pedantic <raml_url> [options]
+    pedantic <raml_url> [--spec=SPEC]... [options]
+    pedantic check <raml_url> <fixtures>... [--spec=SPEC]... [options]
 
 Example:
     pedantic https://example.com/index.raml --whitelist=https://example.com/whitelist.json
+    pedantic https://example.com/index.raml --spec=users,/users/,https://example.com/users.raml
+    pedantic check https://example.com/index.raml tests/fixtures/ "more/**/*.json"
 
 Options:
     -h, --help          Show this screen
     --whitelist=URL     URL containing JSON whitelist contents
+    --spec=SPEC         Serve another spec, as `KEY,PREFIX,RAML_URL[,WHITELIST_URL]`.
+                        Fixtures choose it with their `spec` field or `?spec=KEY`,
+                        else by the longest PREFIX of their path. <raml_url> is
+                        served as `default` with an empty prefix.
+    --workers=N         Number of forked server processes sharing the port [default: 1]
+    --server=NAME       Server to run: `flask`, or `asgi` for the asyncio variant
+                        served by uvicorn (must be installed) [default: flask]
+    --max-errors=N      Stop validating a fixture after N errors
+    --first-error       Stop validating a fixture at its first error
+    --verdict-cache=N   Number of fixture verdicts to remember, 0 to disable [default: 4096]
+    --echo=N            Characters of an invalid fixture echoed in its error, 0 to disable [default: 2048]
+    --raml-parser=NAME  RAML parser: `python` (requires PyYAML), `node`, or `auto` to fall
+                        back to node for specs the python one can't load [default: auto]
+    --reload=SECONDS    Poll the spec and whitelist for changes, swapping in new versions
+                        without a restart, 0 to disable [default: 0]
+    --engine=NAME       Body validation engine: `jsonschema`, or `codegen` to compile
+                        schemas into Python functions [default: jsonschema]
+    --server-timing     Report the duration of each validation phase in a
+                        `Server-Timing` response header
+    --artifact-dir=PATH Directory caching the compiled specs, created if missing and
+                        only used if owned by the current user [default: <tmp>/pedantic-<uid>]
 """
 
 from __future__ import absolute_import
 
+import gc
+import glob
 import hashlib
+import json
+import multiprocessing
 import os
+import signal
+import socket
 import subprocess
+import sys
 import tempfile
 import time
 from time import time
 
 import docopt
+from werkzeug.serving import make_server
 import pedantic.validator_service as val
+from pedantic import raml
+from pedantic.artifacts import UnsafeDirectoryError, prepare_directory
+from pedantic.reloader import Reloader
 
 
 DEFAULT_TTL = 1800  # in seconds
 
 
 def pedantic(args):
+    val.validators.set_engine(args["--engine"])
+    artifact_dir = artifact_directory(args)
+    load_settings(args, artifact_dir)
+    val.verdicts.resize(int(args["--verdict-cache"]))
+    val.set_echo_size(int(args["--echo"]))
+    val.set_server_timing(args["--server-timing"])
+    if args["--first-error"]:
+        val.set_default_max_errors(1)
+    elif args["--max-errors"]:
+        val.set_default_max_errors(int(args["--max-errors"]))
+    if args["check"]:
+        sys.exit(check(args["<fixtures>"]))
+
+    reloaders = []
+    if int(args["--reload"]):
+        tmp_dir = tempfile.gettempdir()
+        for key, prefix, raml_url, whitelist_url in spec_options(args):
+            reloader = Reloader(
+                raml_url,
+                whitelist_url,
+                interval=int(args["--reload"]),
+                load=lambda url: load_raml(url, args["--raml-parser"], tmp_dir, refresh=True),
+                artifact_dir=artifact_dir,
+                key=key,
+            )
+            reloader.prime()
+            reloaders.append(reloader)
+    serve(
+        int(os.environ.get("PORT")), int(args["--workers"]), args["--server"], reloaders
+    )
+
+
+def spec_options(args):
+    """
+    Returns the served specs as (key, prefix, raml_url, whitelist_url) tuples.
+    """
+    specs = [(val.DEFAULT_SPEC, "", args["<raml_url>"], args["--whitelist"])]
+    for option in args["--spec"]:
+        parts = option.split(",")
+        if len(parts) not in (3, 4) or not parts[0] or not parts[2]:
+            sys.exit(f"Invalid --spec `{option}`, use KEY,PREFIX,RAML_URL[,WHITELIST_URL].")
+        if any(parts[0] == spec[0] for spec in specs):
+            sys.exit(f"Duplicate spec `{parts[0]}`.")
+        specs.append((parts[0], parts[1], parts[2], parts[3] if len(parts) == 4 else None))
+    return specs
+
+
+def artifact_directory(args):
+    """
+    Returns the directory caching the compiled specs, or None if it can't
+    be used safely.
+    """
+    directory = args["--artifact-dir"]
+    if directory == "<tmp>/pedantic-<uid>":
+        directory = os.path.join(tempfile.gettempdir(), f"pedantic-{os.getuid()}")
+    try:
+        return prepare_directory(directory)
+    except (OSError, UnsafeDirectoryError) as e:
+        log(f"Not caching compiled specs: {e}")
+        return None
+
+
+def load_settings(args, artifact_dir=None):
     tmp_dir = tempfile.gettempdir()
-    raml_url = args["<raml_url>"]
+    parser = args["--raml-parser"]
+    if parser not in ("auto", "python", "node"):
+        sys.exit(f"Unknown RAML parser `{parser}`, use `auto`, `python` or `node`.")
+
+    for key, prefix, raml_url, whitelist_url in spec_options(args):
+        try:
+            schema = load_raml(raml_url, parser, tmp_dir)
+        except raml.RamlError as e:
+            sys.exit(f"RAML: {e}")
+
+        whitelist = None
+        if whitelist_url:
+            whitelist_url_hash = hashlib.md5(whitelist_url.encode("utf-8")).hexdigest()
+            whitelist_path = os.path.join(tmp_dir, f"{whitelist_url_hash}.json")
+            download_to(whitelist_url, whitelist_path)
+            with open(whitelist_path) as f:
+                whitelist = f.read()
+
+        val.set_proxy_settings(
+            schema, whitelist, artifact_dir=artifact_dir, key=key, prefix=prefix
+        )
+
+
+def load_raml(raml_url, parser, tmp_dir, refresh=False):
+    if parser != "node":
+        log(f"RAML: loading {raml_url}...")
+        try:
+            return raml.load(raml_url)
+        except raml.RamlError as e:
+            if parser == "python":
+                raise
+            log(f"RAML: {e}, falling back to the node parser")
+    return parse_with_node(raml_url, tmp_dir, refresh)
+
+
+def parse_with_node(raml_url, tmp_dir, refresh=False):
     raml_url_hash = hashlib.md5(raml_url.encode("utf-8")).hexdigest()
     schema_path = os.path.join(tmp_dir, f"{raml_url_hash}.json")
 
     if (
-        os.path.isfile(schema_path)
+        not refresh
+        and os.path.isfile(schema_path)
         and os.path.getmtime(schema_path) >= time() - DEFAULT_TTL
     ):
         log(f"RAML: cache found {schema_path}")
@@ -48,20 +182,145 @@ def pedantic(args):
         )
 
     with open(schema_path) as f:
-        schema = f.read()
-
-    whitelist = None
-    if args["--whitelist"]:
-        whitelist_url_hash = hashlib.md5(
-            args["--whitelist"].encode("utf-8")
-        ).hexdigest()
-        whitelist_path = os.path.join(tmp_dir, f"{whitelist_url_hash}.json")
-        download_to(args["--whitelist"], whitelist_path)
-        with open(whitelist_path) as f:
-            whitelist = f.read()
-
-    val.set_proxy_settings(schema, whitelist)
-    val.app.run(host="0.0.0.0", port=int(os.environ.get("PORT")))
+        return f.read()
+
+
+def serve(port, workers, server="flask", reloaders=()):
+    if server not in ("flask", "asgi"):
+        sys.exit(f"Unknown server `{server}`, use `flask` or `asgi`.")
+    if workers <= 1:
+        for reloader in reloaders:
+            reloader.start()
+        if server == "asgi":
+            asgi_server(port).run()
+        else:
+            val.app.run(host="0.0.0.0", port=port)
+        return
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("0.0.0.0", port))
+    sock.listen(128)
+    if hasattr(gc, "freeze"):
+        # keep the loaded spec out of the collector's reach so its memory
+        # pages stay shared copy-on-write with the workers
+        gc.freeze()
+
+    log(f"Serving on port {port} with {workers} workers")
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            # threads don't survive the fork, each worker polls
+            for reloader in reloaders:
+                reloader.start()
+            if server == "asgi":
+                asgi_server(port).run(sockets=[sock])
+            else:
+                make_server("0.0.0.0", port, val.app, fd=sock.fileno()).serve_forever()
+            os._exit(0)
+        children.append(pid)
+
+    def stop(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for pid in children:
+        os.waitpid(pid, 0)
+
+
+def asgi_server(port):
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit("The `asgi` server requires uvicorn: pip install uvicorn")
+    from pedantic.asgi_service import app
+
+    return uvicorn.Server(uvicorn.Config(app, host="0.0.0.0", port=port))
+
+
+def check(patterns):
+    """
+    Validates fixture files against the loaded spec across a process pool.
+
+    Each file holds one fixture, or a list of fixtures, in the format of the
+    service's `POST /`. Workers are forked after the spec is loaded so they
+    share it instead of parsing it again.
+
+    Returns the exit status: 0 if every fixture passed, 1 otherwise.
+    """
+    paths = find_fixtures(patterns)
+    if not paths:
+        log("No fixture files found.")
+        return 1
+
+    counts = {"ok": 0, "whitelisted": 0, "failed": 0}
+    processes = available_cores()
+    chunksize = max(1, len(paths) // (processes * 4))
+    context = multiprocessing.get_context("fork")
+    with context.Pool(processes=processes) as pool:
+        for path, results in pool.imap(check_file, paths, chunksize):
+            for name, value, status in results:
+                if status != 200:
+                    counts["failed"] += 1
+                    log(f"FAIL {name} ({status})\n{value['error']}")
+                elif "warning" in value:
+                    counts["whitelisted"] += 1
+                else:
+                    counts["ok"] += 1
+
+    total = sum(counts.values())
+    log(
+        f"{total} fixtures in {len(paths)} files: {counts['ok']} ok, "
+        f"{counts['whitelisted']} whitelisted, {counts['failed']} failed"
+    )
+    return 1 if counts["failed"] else 0
+
+
+def find_fixtures(patterns):
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, dirs, files in os.walk(pattern):
+                dirs.sort()
+                paths.extend(
+                    os.path.join(root, name)
+                    for name in sorted(files)
+                    if name.endswith(".json")
+                )
+        else:
+            paths.extend(sorted(glob.glob(pattern, recursive=True)))
+    return paths
+
+
+def check_file(path):
+    try:
+        with open(path) as f:
+            fixtures = json.load(f)
+    except (OSError, ValueError) as e:
+        return path, [(path, {"error": f"Pedantic error - {e}"}, 400)]
+
+    # check_fixture answers unexpected errors with a 500 verdict, so they
+    # don't abort the pool
+    if not isinstance(fixtures, list):
+        return path, [(path, *val.check_fixture(fixtures))]
+    specs = {}
+    return path, [
+        (f"{path}[{idx}]", *val.check_fixture(fixture, specs))
+        for idx, fixture in enumerate(fixtures)
+    ]
+
+
+def available_cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
 
 
 def download_to(url, dest):
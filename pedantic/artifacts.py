@@ -0,0 +1,202 @@
+"""On-disk cache of compiled specs.
+
+Loading a spec means parsing its JSON and building the `RouteIndex`, with
+the compiled methods and preprocessed body schemas. The result is pickled
+to a file named after a hash of the spec's text as received and of the code
+compiling it, so a restart with an unchanged spec skips that work, parsing
+included. Files are
+written to a temporary name and atomically renamed, so processes sharing
+the directory never see a partial artifact.
+
+Unpickling runs code, so artifacts live in a directory of their own that
+only the current user can write to (see `prepare_directory`), and files
+owned by anyone else are never loaded. Artifacts of other formats, and
+those unused for `MAX_ARTIFACT_AGE`, are removed whenever one is saved.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import copyreg
+import hashlib
+import os
+import pickle
+import stat
+import tempfile
+import time
+from types import MappingProxyType
+
+from . import __version__
+from . import check_against_schema
+
+import logging
+log = logging.getLogger(__name__)
+
+ARTIFACT_PREFIX = "pedantic-spec-"
+# bumped whenever the pickled shape of the compiled spec changes, so the
+#   artifacts of the previous shape are pruned right away. In case a change
+#   is missed, keys also cover the code of the pickled classes.
+ARTIFACT_FORMAT = 3
+MAX_ARTIFACT_AGE = 7 * 24 * 3600  # in seconds since an artifact was used
+
+
+class UnsafeDirectoryError(Exception):
+    """Raised for an artifact directory other users could write to."""
+    pass
+
+
+def _mapping_proxy(mapping):
+    return MappingProxyType(mapping)
+
+
+def _reduce_mapping_proxy(proxy):
+    return _mapping_proxy, (dict(proxy),)
+
+
+# compiled methods hold their schemas in read-only mappings
+copyreg.pickle(MappingProxyType, _reduce_mapping_proxy)
+
+
+def _code_digest():
+    with open(check_against_schema.__file__, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+_CODE_DIGEST = _code_digest()
+
+
+def artifact_key(spec_text):
+    """
+    Returns the key of the artifact compiled from a spec.
+
+    :param spec_text: the spec as JSON, exactly as read
+    :type spec_text: str or bytes
+
+    """
+    if not isinstance(spec_text, bytes):
+        spec_text = spec_text.encode("utf8")
+    digest = hashlib.sha256()
+    digest.update("{}:{}:{}:{}:".format(
+        __version__, ARTIFACT_FORMAT, pickle.HIGHEST_PROTOCOL,
+        _CODE_DIGEST).encode("utf8"))
+    digest.update(spec_text)
+    return digest.hexdigest()
+
+
+def _format_prefix():
+    return "{}{}-".format(ARTIFACT_PREFIX, ARTIFACT_FORMAT)
+
+
+def artifact_path(directory, key):
+    return os.path.join(directory, "{}{}.pickle".format(_format_prefix(), key))
+
+
+def prepare_directory(directory):
+    """
+    Creates the artifact directory, accessible to the current user only.
+
+    :raises: :class:`.UnsafeDirectoryError` if it is not a directory, or is
+        owned by another user
+
+    """
+    try:
+        os.makedirs(directory, 0o700)
+    except OSError:
+        if not os.path.isdir(directory):
+            raise
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode):
+        raise UnsafeDirectoryError(
+            "{} is not a directory".format(directory))
+    if info.st_uid != os.getuid():
+        raise UnsafeDirectoryError(
+            "{} is owned by another user".format(directory))
+    if stat.S_IMODE(info.st_mode) != 0o700:
+        os.chmod(directory, 0o700)
+    return directory
+
+
+def load_artifact(directory, key):
+    """
+    Reads a compiled spec.
+
+    :rtype: the saved value, or None if it is missing, unreadable or owned
+        by another user
+
+    """
+    path = artifact_path(directory, key)
+    try:
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_NOFOLLOW", 0))
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        log.warning("Ignoring unreadable spec artifact %s: %s", key, e)
+        return None
+    with os.fdopen(fd, "rb") as f:
+        if os.fstat(f.fileno()).st_uid != os.getuid():
+            log.warning(
+                "Ignoring spec artifact %s owned by another user", key)
+            return None
+        try:
+            value = pickle.load(f)
+        except Exception as e:
+            # corrupted, compile again
+            log.warning("Ignoring unreadable spec artifact %s: %s", key, e)
+            return None
+    try:
+        # keeps it from being pruned
+        os.utime(path, None)
+    except OSError:
+        pass
+    return value
+
+
+def save_artifact(directory, key, value):
+    """
+    Writes a compiled spec, replacing any artifact with the same key.
+
+    Failing to write is logged and otherwise ignored, the cache is only an
+    optimization.
+    """
+    try:
+        fd, tmp_path = tempfile.mkstemp(
+            prefix=_format_prefix(), suffix=".tmp", dir=directory)
+    except OSError as e:
+        log.warning("Can't write spec artifact %s: %s", key, e)
+        return
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(value, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, artifact_path(directory, key))
+    except Exception as e:
+        log.warning("Can't write spec artifact %s: %s", key, e)
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return
+    prune_artifacts(directory)
+
+
+def prune_artifacts(directory, max_age=MAX_ARTIFACT_AGE):
+    """
+    Removes the artifacts of other formats, and those (or temporary files)
+    unused for `max_age` seconds.
+    """
+    current = _format_prefix()
+    oldest = time.time() - max_age
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+    for name in names:
+        if not name.startswith(ARTIFACT_PREFIX):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            stale = (not name.startswith(current) or
+                     os.lstat(path).st_mtime < oldest)
+            if stale:
+                os.remove(path)
+        except OSError:
+            # removed meanwhile by another process
+            pass
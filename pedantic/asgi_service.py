@@ -0,0 +1,287 @@
+"""Asyncio (ASGI) variant of the Pedantic service.
+
+Serves the same routes, responses and status codes as `validator_service`,
+which also holds the loaded spec (see `validator_service.set_proxy_settings`).
+Connections are handled on one event loop while the CPU bound validation
+runs on a bounded executor.
+
+Run it with any ASGI server, eg::
+
+    uvicorn pedantic.asgi_service:app
+
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+try:
+    from urlparse import parse_qs
+except ImportError:
+    from urllib.parse import parse_qs
+
+from . import validator_service as val
+from .metrics import CONTENT_TYPE, expose, timer
+
+executor = None
+slots = None
+max_pending = None
+
+INVALID_REQUEST = object()
+
+
+def configure(workers=None, pending=None):
+    """
+    Sizes the executor that validation is handed to.
+
+    :param int workers: executor threads, defaults to the number of cores
+
+    :param int pending: validations allowed to wait for the executor before
+        new requests stop being read, defaults to 4 per thread
+
+    """
+    global executor
+    global slots
+    global max_pending
+
+    if executor is not None:
+        executor.shutdown(wait=False)
+    workers = workers or os.cpu_count() or 1
+    executor = ThreadPoolExecutor(max_workers=workers)
+    max_pending = pending or workers * 4
+    slots = None  # bound to the running loop on first use
+
+
+async def run_in_executor(func, *args):
+    global slots
+
+    if executor is None:
+        configure()
+    if slots is None:
+        slots = asyncio.Semaphore(max_pending)
+    async with slots:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(executor, func, *args)
+
+
+async def run_timed(func, *args):
+    """
+    `run_in_executor`, also returning the durations of the phases when
+    ``Server-Timing`` is enabled (see `validator_service.set_server_timing`).
+    """
+    if not val.server_timing:
+        return await run_in_executor(func, *args), None
+    return await run_in_executor(val.collect_timings, func, *args)
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    methods = ROUTES.get(scope["path"])
+    if methods is None:
+        await send_json(send, 404, {"error": "Not found."})
+    elif scope["method"] not in methods:
+        # as Flask, for a known path
+        allow = ", ".join(sorted(methods)).encode("latin-1")
+        await send_json(send, 405, {"error": "Method not allowed."},
+                        headers=[(b"allow", allow)])
+    else:
+        await methods[scope["method"]](scope, receive, send)
+
+
+async def healthcheck(scope, receive, send):
+    await send_text(send, 200, "OK")
+
+
+async def stats(scope, receive, send):
+    value = {
+        "validators": val.validators.stats(),
+        "verdicts": val.verdicts.stats(),
+    }
+    await send_json(send, 200, value)
+
+
+async def metrics(scope, receive, send):
+    body = expose(val.METRICS).encode("utf8")
+    await send_body(send, 200, body, CONTENT_TYPE.encode("latin-1"))
+
+
+async def start_profiling(scope, receive, send):
+    value, status = val.start_profiling(query_args(scope))
+    await send_json(send, status, value)
+
+
+async def profile_report(scope, receive, send):
+    value, status = val.profile_report(query_args(scope))
+    await send_json(send, status, value)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            if executor is None:
+                configure()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            if executor is not None:
+                executor.shutdown(wait=False)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def validator(scope, receive, send):
+    """ Same as `validator_service.validator` """
+    if not has_content_type(scope, "application/json"):
+        msg = "Transport header `Content-Type` must be `application/json`."
+        await send_json(send, 400, {"error": msg})
+        return
+
+    max_errors = await read_max_errors(scope, send)
+    if max_errors is INVALID_REQUEST:
+        return
+    the_json = await read_json(receive, send)
+    if the_json is not INVALID_REQUEST:
+        (value, status), timings = await run_timed(
+            val.check_fixture, the_json, None, max_errors, None,
+            query_args(scope).get("spec"))
+        await send_json(send, status, value, timings)
+
+
+async def batch_validator(scope, receive, send):
+    """ Same as `validator_service.batch_validator` """
+    if not has_content_type(scope, "application/json"):
+        msg = "Transport header `Content-Type` must be `application/json`."
+        await send_json(send, 400, {"error": msg})
+        return
+
+    max_errors = await read_max_errors(scope, send)
+    if max_errors is INVALID_REQUEST:
+        return
+    fixtures = await read_json(receive, send)
+    if fixtures is INVALID_REQUEST:
+        return
+    if not isinstance(fixtures, list):
+        error = {"error": "Pedantic error - batch payload must be a JSON array."}
+        await send_json(send, 400, error)
+        return
+    results, timings = await run_timed(
+        val.check_batch, fixtures, max_errors, query_args(scope).get("spec"))
+    await send_json(send, 200, results, timings)
+
+
+async def stream_validator(scope, receive, send):
+    """ Same as `validator_service.stream_validator` """
+    if not has_content_type(scope, "application/x-ndjson"):
+        msg = "Transport header `Content-Type` must be `application/x-ndjson`."
+        await send_json(send, 400, {"error": msg})
+        return
+
+    max_errors = await read_max_errors(scope, send)
+    if max_errors is INVALID_REQUEST:
+        return
+    spec = query_args(scope).get("spec")
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"application/x-ndjson")],
+    })
+    buffered = b""
+    more_body = True
+    while more_body:
+        message = await receive()
+        more_body = message.get("more_body", False)
+        buffered += message.get("body", b"")
+        lines = buffered.split(b"\n")
+        buffered = lines.pop() if more_body else b""
+        for line in lines:
+            if line.strip():
+                result = await run_in_executor(
+                    val.check_line, line, max_errors, spec)
+                await send({
+                    "type": "http.response.body",
+                    "body": result.encode("utf8"),
+                    "more_body": True,
+                })
+    await send({"type": "http.response.body", "body": b""})
+
+
+# handlers by path and method, the routes of `validator_service`
+ROUTES = {
+    "/": {"GET": healthcheck, "POST": validator},
+    "/batch": {"POST": batch_validator},
+    "/stream": {"POST": stream_validator},
+    "/stats": {"GET": stats},
+    "/metrics": {"GET": metrics},
+    "/profile": {"GET": profile_report, "POST": start_profiling},
+}
+
+
+def has_content_type(scope, content_type):
+    for (name, value) in scope["headers"]:
+        if name.lower() == b"content-type":
+            return content_type in value.decode("latin-1")
+    return False
+
+
+def query_args(scope):
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return dict((key, values[0]) for (key, values) in query.items())
+
+
+async def read_max_errors(scope, send):
+    try:
+        return val.max_errors_option(query_args(scope))
+    except ValueError:
+        await send_json(send, 400, {"error": val.MAX_ERRORS_ERROR})
+        return INVALID_REQUEST
+
+
+async def read_json(receive, send):
+    body = b""
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get("body", b"")
+        more_body = message.get("more_body", False)
+    try:
+        return json.loads(body.decode("utf8"))
+    except ValueError as e:
+        error = {"error": "Pedantic error - invalid JSON: {}".format(e)}
+        await send_json(send, 400, error)
+        return INVALID_REQUEST
+
+
+async def send_json(send, status, value, timings=None, headers=()):
+    started = timer()
+    body = json.dumps(value, default=val.json_default).encode("utf8") + b"\n"
+    seconds = timer() - started
+    val.observe("serialize", seconds)
+    headers = list(headers)
+    if timings is not None:
+        timings["serialize"] = timings.get("serialize", 0.0) + seconds
+        header = val.server_timing_header(timings)
+        headers.append((b"server-timing", header.encode("latin-1")))
+    await send_body(send, status, body, b"application/json", headers)
+
+
+async def send_text(send, status, text):
+    await send_body(send, status, text.encode("utf8"), b"text/html")
+
+
+async def send_body(send, status, body, content_type, headers=()):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", content_type),
+            (b"content-length", str(len(body)).encode("latin-1")),
+        ] + list(headers),
+    })
+    await send({"type": "http.response.body", "body": body})
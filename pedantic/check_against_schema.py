@@ -1,9 +1,12 @@
 from __future__ import absolute_import, unicode_literals
 
 import json
+import numbers
 import re
 import os
 from collections import namedtuple
+from itertools import islice
+from types import MappingProxyType
 try:
     from urlparse import parse_qs
 except ImportError:
@@ -11,7 +14,9 @@ except ImportError:
 
 from jsonschema.exceptions import ValidationError
 from jsonschema.validators import Draft4Validator
-from dateutil.parser import parse as validate_date
+
+from .codegen import compile_schema
+from .dates import is_date, recognize as recognize_date
 
 
 import logging
@@ -20,15 +25,127 @@ log = logging.getLogger(__name__)
 Data = namedtuple('Data', 'path method request response')
 Request = namedtuple('Request', 'request_data query_data')
 Response = namedtuple('Response', 'response_data status_code')
+CompiledMethod = namedtuple(
+    'CompiledMethod',
+    'query_parameters required_params request_schema responses query_params')
+BodySchema = namedtuple('BodySchema', 'key schema')
+# how a query parameter's values are parsed, and the registry key of its
+# schema, see `compile_method`
+QueryParam = namedtuple('QueryParam', 'key parse')
 
 dir_path = os.path.dirname(os.path.realpath(__file__))
 with open(os.path.join(dir_path, 'pedantic_api.json')) as f:
     LOCAL_SCHEMA = json.load(f)
+LOCAL_SCHEMA_KEY = 'pedantic_api.json'
+
+DEFAULT_ECHO_SIZE = 2048
+
+
+class ErrorRecord(namedtuple(
+        'ErrorRecord', 'location path keyword message schema_path context')):
+    """One violation found while validating a fixture.
+
+    :param str location: where it was found, `query`, `request` or `response`
+
+    :param tuple path: the path to the offending value in the request or
+        response body, for `query` starting with the param's name
+
+    :param str keyword: the failing keyword, e.g. `type` or `required`
+
+    :param str message: what is wrong
+
+    :param tuple schema_path: the path to the keyword in the schema
+
+    :param tuple context: (schema path, message) of the `anyOf`/`oneOf`
+        sub errors
+
+    """
+    __slots__ = ()
+
+    @property
+    def pointer(self):
+        """ The JSON pointer (RFC 6901) of the offending value """
+        return "".join(
+            "/" + str(item).replace("~", "~0").replace("/", "~1")
+            for item in self.path)
+
+    def as_dict(self):
+        return {
+            "location": self.location,
+            "pointer": self.pointer,
+            "keyword": self.keyword,
+            "message": self.message,
+            "schema_path": list(self.schema_path),
+        }
+
+    def render(self):
+        if self.location == 'query':
+            return self._render_query()
+        lines = [" - ", _get_pretty_path(self.path), ": ", self.message, "\n"]
+        for (schema_path, message) in self.context:
+            lines.extend([
+                "     > Schema path: ", str(list(schema_path)),
+                " Error: ", message, "\n"])
+        return "".join(lines)
+
+    def _render_query(self):
+        # the texts query param errors have always had, `message` is only
+        # reworded in `as_dict`
+        if self.keyword == 'required':
+            return " - Missing required query param: '{}'\n".format(
+                self.path[0])
+        if self.keyword == 'queryParameters' and self.path:
+            return " - Query parameter ''{}'' undefined in specification.\n"\
+                .format(self.path[0])
+        if self.keyword == 'queryParameters':
+            return " - {}\n".format(self.message)
+        if self.keyword == 'date':
+            return " - Request query param {}.\n".format(self.message)
+        # a param's value is validated on its own, item by item for lists
+        path = self.path[1:]
+        if path and isinstance(path[0], int):
+            path = path[1:]
+        return self._replace(location=None, path=path).render()
 
 
 class JSONSchemaValidationError(Exception):
-    """Raised for errors specific to schema validation"""
-    pass
+    """Raised for errors specific to schema validation
+
+    The message is only rendered when the error is printed, see `render`.
+
+    :param list errors: the `ErrorRecord`s found
+
+    :param Data data: the validated fixture, echoed in the message
+
+    :param str location: `request` or `response`, whichever was validated
+
+    :param int error_count: the errors counted against `max_errors`
+
+    """
+
+    def __init__(self, errors, data=None, location='request',
+                 error_count=None):
+        super(JSONSchemaValidationError, self).__init__()
+        self.errors = errors
+        self.data = data
+        self.location = location
+        self.error_count = error_count
+
+    def __str__(self):
+        return self.render()
+
+    def render(self, echo_size=DEFAULT_ECHO_SIZE):
+        """
+        Describes the errors found.
+
+        :param int echo_size: characters of the fixture to echo, 0 for none
+
+        :rtype str:
+
+        """
+        if self.location == 'response':
+            return _render_response_errors(self.errors, self.data, echo_size)
+        return _render_request_errors(self.errors, self.data, echo_size)
 
 
 class UndefinedSchemaError(Exception):
@@ -36,11 +153,118 @@ class UndefinedSchemaError(Exception):
     pass
 
 
-def parse_data(json_data):
+ENGINES = ('jsonschema', 'codegen')
+
+
+class ValidatorRegistry(object):
+    """Builds one validator per distinct schema and reuses it.
+
+    Schemas are keyed by their canonical JSON form unless the caller already
+    holds a stable key for them (e.g. the raw schema string from the spec).
+    With the `codegen` engine schemas are compiled into Python functions by
+    `codegen.compile_schema`, falling back to `Draft4Validator` for schemas
+    it doesn't support.
+    """
+
+    def __init__(self, engine='jsonschema'):
+        self._validators = {}
+        self.engine = engine
+        self.hits = 0
+        self.misses = 0
+        self.fallbacks = 0
+
+    def set_engine(self, engine):
+        if engine not in ENGINES:
+            raise ValueError("Unknown validation engine `{}`, expected one "
+                             "of: {}".format(engine, ", ".join(ENGINES)))
+        self.engine = engine
+        self.clear()
+
+    def get(self, schema, key=None):
+        if key is None:
+            key = json.dumps(schema, sort_keys=True)
+        try:
+            validator = self._validators[key]
+        except KeyError:
+            self.misses += 1
+            validator = self._validators[key] = self._build(schema)
+        else:
+            self.hits += 1
+        return validator
+
+    def _build(self, schema):
+        if self.engine == 'codegen':
+            validator = compile_schema(schema)
+            if validator is not None:
+                return validator
+            self.fallbacks += 1
+        return Draft4Validator(schema)
+
+    def clear(self):
+        self._validators.clear()
+        self.hits = 0
+        self.misses = 0
+        self.fallbacks = 0
+
+    def stats(self):
+        return {
+            'engine': self.engine,
+            'hits': self.hits,
+            'misses': self.misses,
+            'fallbacks': self.fallbacks,
+            'size': len(self._validators),
+        }
+
+
+validators = ValidatorRegistry()
+
+
+class _ErrorLimit(object):
+    """Counts down how many more errors should be collected.
+
+    :param int max_errors: the number of errors to collect, None for all
+
+    """
+
+    def __init__(self, max_errors=None):
+        self.max_errors = max_errors
+        self.remaining = max_errors
+
+    @property
+    def reached(self):
+        return self.remaining is not None and self.remaining <= 0
+
+    @property
+    def collected(self):
+        return None if self.max_errors is None else (
+            self.max_errors - self.remaining)
+
+    def take(self, errors):
+        """ Consumes the errors iterator up to the limit """
+        if self.remaining is None:
+            return list(errors)
+        errors = list(islice(errors, max(self.remaining, 0)))
+        self.remaining -= len(errors)
+        return errors
+
+    def count(self):
+        if self.remaining is not None:
+            self.remaining -= 1
+
+
+class RawQuery(dict):
+    """Query values as strings, to parse with `parse_query_data`."""
+    pass
+
+
+def parse_data(json_data, parse_query=True):
     """Parses the request parameter.
 
     Args:
         json_data (dict): the request json
+        parse_query (bool): whether to parse the query values, else they
+            are left as lists of strings in a `RawQuery` until the method's
+            query parameters are known, see `parse_query_data`
 
     Returns:
         Data: Contains relevant information from the request object.::
@@ -51,8 +275,10 @@ def parse_data(json_data):
             query_data (dict): query string items
 
     """
-    # Ensure all conditions of Pedantic API are met
-    _validate(json_data, LOCAL_SCHEMA)
+    # Ensure all conditions of Pedantic API are met, the full schema
+    # validation only runs to describe what is wrong
+    if not _is_envelope(json_data):
+        _validate(json_data, LOCAL_SCHEMA, key=LOCAL_SCHEMA_KEY)
 
     for (key, value) in LOCAL_SCHEMA['properties'].items():
         if key not in json_data:
@@ -66,13 +292,10 @@ def parse_data(json_data):
             query_data,
             keep_blank_values=True
         )
-        for key in query_data:
-            if len(query_data[key]) == 1:
-                # remove the enclosing list from non-list types
-                query_data[key] = _parse_from_string(query_data[key][0])
-            else:
-                for idx, val in enumerate(query_data[key]):
-                    query_data[key][idx] = _parse_from_string(val)
+        if parse_query:
+            query_data = _parse_query(query_data, {})
+        else:
+            query_data = RawQuery(query_data)
 
     request = None
     if json_data['request']:
@@ -96,28 +319,140 @@ def parse_data(json_data):
     )
 
 
+# the property types of `pedantic_api.json`, its `path_info` pattern matches
+# any string
+envelope_types = {
+    'path_info': str,
+    'method': str,
+    'request': dict,
+    'response': dict,
+    'query_string': str,
+    'status_code': numbers.Number,
+    'spec': str,
+}
+
+
+def _is_envelope(json_data):
+    """ Hand coded check of the rules in `pedantic_api.json` """
+    if not isinstance(json_data, dict):
+        return False
+    for (key, value) in json_data.items():
+        types = envelope_types.get(key)
+        # bool is a number in python, not in JSONSchema
+        if types is None or not isinstance(value, types) or (
+                value is True or value is False):
+            return False
+    return 'path_info' in json_data and 'method' in json_data and (
+        'request' in json_data or
+        ('response' in json_data and 'status_code' in json_data))
+
+
 def is_whitelisted(info, whitelist):
-    path = info.path
-    method = info.method
+    """
+    Checks whether the request matches any entry of the whitelist.
+
+    :param namedtuple info: generated by `parse_data`
+
+    :param whitelist: the whitelist entries, or the `Whitelist` compiled from
+        them
+
+    :rtype bool:
 
-    if info.response:
-        code = info.response.status_code
-    else:
-        code = None
+    """
+    if not isinstance(whitelist, Whitelist):
+        whitelist = Whitelist(whitelist)
+    return whitelist.match(info)
+
+
+class Whitelist(object):
+    """Whitelist entries compiled into as few regexes as possible.
+
+    Entries are grouped by how they constrain the request: by path only, by
+    path and method, or by path, method and status code. The path patterns
+    of each group are joined into one alternation that is matched once.
+
+    :param list entries: whitelist entries eg
+        [{"path": "/some/path", "method": "POST", "code": 200}]
 
-    for item in whitelist:
-        match = re.match(item['path'], path)
-        if match:
+    """
+
+    def __init__(self, entries):
+        self.entries = list(entries)
+        any_paths = []
+        method_paths = {}
+        code_paths = {}
+        for item in self.entries:
             if 'code' in item:
-                if code:
-                    # if whitelist code exists it should also have the method
-                    if item['code'] == code and item['method'] == method:
-                        return True
-            elif 'method' in item and method:
-                if item['method'] == method:
-                    return True
+                key = (item['code'], item.get('method'))
+                code_paths.setdefault(key, []).append(item['path'])
+            elif 'method' in item:
+                method_paths.setdefault(item['method'], []).append(
+                    item['path'])
             else:
+                any_paths.append(item['path'])
+
+        self._any = _compile_patterns(any_paths)
+        # without a request method, method entries only match on path
+        self._any_method = _compile_patterns(
+            [path for paths in method_paths.values() for path in paths])
+        self._by_method = dict(
+            (method, _compile_patterns(paths))
+            for (method, paths) in method_paths.items())
+        self._by_code = dict(
+            (key, _compile_patterns(paths))
+            for (key, paths) in code_paths.items())
+
+    def __len__(self):
+        return len(self.entries)
+
+    def match(self, info):
+        path = info.path
+        method = info.method
+        code = info.response.status_code if info.response else None
+
+        if _match_patterns(self._any, path):
+            return True
+        if method:
+            patterns = self._by_method.get(method, ())
+        else:
+            patterns = self._any_method
+        if _match_patterns(patterns, path):
+            return True
+        if code:
+            patterns = self._by_code.get((code, method), ())
+            if _match_patterns(patterns, path):
                 return True
+        return False
+
+
+# backreferences and global flags depend on the pattern standing alone
+uncombinable_pattern = re.compile(r'\\[1-9]|\(\?P=|\(\?\(|^\(\?[aiLmsux]+\)')
+
+
+def _compile_patterns(patterns):
+    combinable = []
+    compiled = []
+    for pattern in patterns:
+        if uncombinable_pattern.search(pattern):
+            compiled.append(re.compile(pattern))
+        else:
+            combinable.append(pattern)
+    if len(combinable) == 1:
+        compiled.append(re.compile(combinable[0]))
+    elif combinable:
+        try:
+            compiled.append(re.compile("|".join(
+                "(?:{})".format(pattern) for pattern in combinable)))
+        except re.error:
+            # eg the same group name used by several patterns
+            compiled.extend(re.compile(pattern) for pattern in combinable)
+    return compiled
+
+
+def _match_patterns(patterns, path):
+    for pattern in patterns:
+        if pattern.match(path):
+            return True
     return False
 
 
@@ -139,48 +474,279 @@ def _get_method_spec_from_resource(endpoint, request):
         for method in endpoint['methods']:
             if method['method'].lower() == req_method:
                 return method
-    raise UndefinedSchemaError(
+    raise _undefined_method_error(req_method, request.path)
+
+
+def _undefined_method_error(req_method, path):
+    return UndefinedSchemaError(
         "The requested method '{}' for '{}' was not found in spec.".format(
-            req_method, request.path))
+            req_method, path))
 
 
 uri_param_key = re.compile(r'{(.*)}')
+segments = re.compile(r'\/[^\/]*')
 
 
-def _match_uri_segments(req_segments, relative_segs, rsrc):
-    for idx, (rel_seg, seg) in enumerate(zip(relative_segs, req_segments)):
-        if rel_seg != seg:
-            key = uri_param_key.search(rel_seg)
-            if key:
-                schema = rsrc['uriParameters'][key.group(1)]
-                err_msg = _do_param_validation(seg.lstrip('/'), schema)
-                if err_msg:
-                    return False  # don't raise, there may be other resources
-            else:
-                return False
-    return req_segments[len(relative_segs):]
+class SchemaInterner(object):
+    """Maps equal JSON values to one shared instance.
 
+    Lets several compiled specs share their identical (sub)schemas, see
+    `RouteIndex.share_schemas`. Shared values must not be modified.
+    """
 
-segments = re.compile(r'\/[^\/]*')
+    def __init__(self):
+        self._values = {}
+
+    def intern(self, value):
+        return self._intern(value)[0]
+
+    def _intern(self, value):
+        # returns the shared instance and what identifies it: the identity
+        # of the shared children for containers, the value for scalars
+        if isinstance(value, dict):
+            items = [(key,) + self._intern(item)
+                     for (key, item) in value.items()]
+            identity = ('object',) + tuple(
+                (key, ident) for (key, _, ident) in items)
+            shared = self._values.get(identity)
+            if shared is None:
+                if all(item is value[key] for (key, item, _) in items):
+                    shared = value
+                else:
+                    shared = dict((key, item) for (key, item, _) in items)
+                self._values[identity] = shared
+            return shared, id(shared)
+        if isinstance(value, list):
+            items = [self._intern(item) for item in value]
+            identity = ('array',) + tuple(ident for (_, ident) in items)
+            shared = self._values.get(identity)
+            if shared is None:
+                if all(item is old for ((item, _), old) in zip(items, value)):
+                    shared = value
+                else:
+                    shared = [item for (item, _) in items]
+                self._values[identity] = shared
+            return shared, id(shared)
+        return value, (type(value), value)
+
+
+# whether a path segment matches a uriParameter schema, by the schema's
+#   registry key and the segment, emptied once full
+MAX_SEGMENT_MATCHES = 4096
+segment_matches = {}
+
+
+class _RouteNode(object):
+    __slots__ = ('literals', 'params', 'resource', 'methods')
+
+    def __init__(self):
+        self.literals = {}  # relative segment -> _RouteNode
+        # (relative segment, uriParameter schema, its registry key, node)
+        self.params = []
+        # the resource's definition, or True if the index doesn't keep them
+        self.resource = None
+        self.methods = {}   # lower case method name -> CompiledMethod
+
+
+class RouteIndex(object):
+    """Segment trie of the spec's resources, built once per loaded spec.
+
+    Each node is one path segment of a resource's `relativeUri`. Lookups try
+    the literal child for a segment first and then the `{param}` children in
+    spec order, so the cost depends on the depth of the path rather than on
+    the number of resources in the spec. The methods of every resource are
+    compiled with `compile_method` while the index is built, their distinct
+    body schemas are kept in `body_schemas`.
+
+    :param dict schemas: the global specification containing all schemas
+
+    :param bool keep_resources: whether `lookup` returns the definitions of
+        the resources, else only True. Without them the index doesn't hold
+        on to any part of the spec besides the compiled schemas.
+
+    """
+
+    def __init__(self, schemas, keep_resources=True):
+        self.keep_resources = keep_resources
+        self.root = _RouteNode()
+        self.size = 0
+        self._body_schemas = {}
+        self._add_resources(self.root, schemas)
+        self.body_schemas = tuple(self._body_schemas.values())
+        del self._body_schemas
+
+    def share_schemas(self, interner):
+        """
+        Replaces the compiled schemas by the instances shared through the
+        interner, which then also shares them with the other indexes it is
+        used for.
+
+        :param SchemaInterner interner:
+
+        """
+        bodies = {}
+
+        def share(body):
+            if body is None:
+                return None
+            if body.key not in bodies:
+                bodies[body.key] = body._replace(
+                    schema=interner.intern(body.schema))
+            return bodies[body.key]
+
+        for node in self._nodes():
+            node.params = [
+                (rel_seg, interner.intern(schema), key, child)
+                for (rel_seg, schema, key, child) in node.params]
+            for (name, method) in node.methods.items():
+                query_parameters = method.query_parameters
+                if query_parameters is not None:
+                    query_parameters = MappingProxyType(dict(
+                        (key, interner.intern(qp_schema))
+                        for (key, qp_schema) in query_parameters.items()))
+                node.methods[name] = method._replace(
+                    query_parameters=query_parameters,
+                    request_schema=share(method.request_schema),
+                    responses=MappingProxyType(dict(
+                        (code, share(body))
+                        for (code, body) in method.responses.items())),
+                )
+        self.body_schemas = tuple(share(body) for body in self.body_schemas)
+
+    def schemas(self):
+        """ Yields the compiled uri parameter, query and body schemas """
+        for node in self._nodes():
+            for (_, schema, _, _) in node.params:
+                yield schema
+            for method in node.methods.values():
+                for qp_schema in (method.query_parameters or {}).values():
+                    yield qp_schema
+        for body in self.body_schemas:
+            yield body.schema
+
+    def _nodes(self):
+        nodes = [self.root]
+        while nodes:
+            node = nodes.pop()
+            nodes.extend(node.literals.values())
+            nodes.extend(child for (_, _, _, child) in node.params)
+            yield node
+
+    def _add_resources(self, node, parent):
+        for rsrc in parent.get('resources', ()):
+            child = node
+            for rel_seg in segments.findall(rsrc['relativeUri']):
+                child = self._add_segment(child, rel_seg, rsrc)
+            if child.resource is None:
+                # the first resource defined for a path wins
+                child.resource = rsrc if self.keep_resources else True
+                child.methods = self._compile_methods(rsrc)
+                self.size += 1
+            self._add_resources(child, rsrc)
+
+    def _compile_methods(self, rsrc):
+        methods = {}
+        for method in rsrc.get('methods', ()):
+            name = method['method'].lower()
+            if name not in methods:
+                methods[name] = compile_method(method, self._body_schemas)
+        return methods
+
+    @staticmethod
+    def _add_segment(node, rel_seg, rsrc):
+        key = uri_param_key.search(rel_seg)
+        if not key:
+            return node.literals.setdefault(rel_seg, _RouteNode())
+        schema = rsrc.get('uriParameters', {}).get(key.group(1))
+        for (param_seg, param_schema, _, child) in node.params:
+            if param_seg == rel_seg and param_schema == schema:
+                return child
+        child = _RouteNode()
+        key = None
+        if schema is not None:
+            key = json.dumps(schema, sort_keys=True)
+        node.params.append((rel_seg, schema, key, child))
+        return child
+
+    def lookup(self, req_segs):
+        """
+        Returns the resource matching the request path segments or None.
+
+        :param list req_segs: path segments eg ['/api', '/v5', '/post']
+
+        """
+        node = self._lookup(self.root, req_segs, 0)
+        return node.resource if node else None
+
+    def _lookup(self, node, req_segs, idx):
+        if idx == len(req_segs):
+            return node if node.resource is not None else None
+        seg = req_segs[idx]
+        child = node.literals.get(seg)
+        if child is not None:
+            found = self._lookup(child, req_segs, idx + 1)
+            if found is not None:
+                return found
+        for (param_seg, schema, key, child) in node.params:
+            if _match_uri_segment(seg, param_seg, schema, key):
+                found = self._lookup(child, req_segs, idx + 1)
+                if found is not None:
+                    return found
+        return None
+
+    def get_method(self, data):
+        """
+        Returns the compiled method matching the request path and method.
+
+        :param namedtuple data: generated by `parse_data`
+
+        :rtype CompiledMethod:
+
+        :raises: :class:`.UndefinedSchemaError`
+
+        """
+        paths = _get_path_segments(data.path)
+        node = self._lookup(self.root, paths['remaining'], 0)
+        if node is None:
+            raise _undefined_resource_error(data.path)
+        req_method = data.method.lower()
+        try:
+            return node.methods[req_method]
+        except KeyError:
+            raise _undefined_method_error(req_method, data.path)
+
+
+def _match_uri_segment(seg, rel_seg, schema, key=None):
+    if seg == rel_seg or schema is None:
+        return True
+    if key is None:
+        key = json.dumps(schema, sort_keys=True)
+    try:
+        return segment_matches[key, seg]
+    except KeyError:
+        pass
+    # don't raise, there may be other resources
+    matched = not _do_param_validation(
+        seg.lstrip('/'), schema, _ErrorLimit(1), (), key)
+    if len(segment_matches) >= MAX_SEGMENT_MATCHES:
+        segment_matches.clear()
+    segment_matches[key, seg] = matched
+    return matched
 
 
 def _find_resource(schemas, paths):
-    """ Recursively walks the schema to find the matching resource """
-    req_segs = paths['remaining']
-    if 'resources' in schemas:
-        for rsrc in schemas['resources']:
-            relative_segs = segments.findall(rsrc['relativeUri'])
-            if len(req_segs) >= len(relative_segs):
-                remaining_segs = _match_uri_segments(req_segs,
-                                                     relative_segs, rsrc)
-                if remaining_segs:
-                    paths['remaining'] = remaining_segs
-                    return _find_resource(rsrc, paths)
-                elif type(remaining_segs) == list:
-                    return rsrc
-    raise UndefinedSchemaError(
-        "The requested resource '{}' was not found in spec.".format(
-            paths['path_info']))
+    """ Looks up the resource matching the path in the route index """
+    if not isinstance(schemas, RouteIndex):
+        schemas = RouteIndex(schemas)
+    resource = schemas.lookup(paths['remaining'])
+    if resource is None:
+        raise _undefined_resource_error(paths['path_info'])
+    return resource
+
+
+def _undefined_resource_error(path):
+    return UndefinedSchemaError(
+        "The requested resource '{}' was not found in spec.".format(path))
 
 
 def get_spec(data, schemas):
@@ -189,16 +755,92 @@ def get_spec(data, schemas):
 
     :param namedtuple data: generated by `parse_data`
 
-    :param dict schemas: the global specification containing all schemas
+    :param dict schemas: the global specification containing all schemas, or
+        the `RouteIndex` built from it
 
-    :rtype dict: the matched method's jsonschema definition
+    :rtype dict: the matched method's jsonschema definition, already
+        compiled into a `CompiledMethod` when looked up in a `RouteIndex`
 
     """
+    if isinstance(schemas, RouteIndex):
+        return schemas.get_method(data)
     paths = _get_path_segments(data.path)
     resource = _find_resource(schemas, paths)
     return _get_method_spec_from_resource(resource, data)
 
 
+def compile_method(spec, body_schemas=None):
+    """
+    Parses the body schemas of a method's spec ahead of validation.
+
+    Request schemas are kept as defined, response schemas are relaxed with
+    `_remove_required`. Query parameter schemas are copied without RAML's
+    `required` field, which is not valid JSONSchema. The result must not be
+    modified since its schemas are shared between methods and requests.
+
+    :param dict spec: the method's definition from the specification
+
+    :param dict body_schemas: optional cache of schemas already compiled,
+        keyed by raw schema string, to share between methods
+
+    :rtype CompiledMethod:
+
+    """
+    if body_schemas is None:
+        body_schemas = {}
+    responses = {}
+    for code, value in (spec.get('responses') or {}).items():
+        responses[str(code)] = _compile_body(value, body_schemas, True)
+
+    query_parameters = None
+    query_params = None
+    required_params = ()
+    if 'queryParameters' in spec:
+        query_parameters = {}
+        query_params = {}
+        for key, qp_schema in spec['queryParameters'].items():
+            if qp_schema.get('required') in (True, 'true'):
+                required_params += (key,)
+            query_parameters[key] = dict(
+                (prop, value) for (prop, value) in qp_schema.items()
+                if prop != 'required')
+            query_params[key] = _compile_query_param(query_parameters[key])
+        query_parameters = MappingProxyType(query_parameters)
+        query_params = MappingProxyType(query_params)
+
+    return CompiledMethod(
+        query_parameters=query_parameters,
+        required_params=required_params,
+        request_schema=_compile_body(spec, body_schemas, False),
+        responses=MappingProxyType(responses),
+        query_params=query_params,
+    )
+
+
+def _compile_query_param(qp_schema):
+    param_type = qp_schema.get('type')
+    parse = _parse_value
+    if isinstance(param_type, str):
+        parse = query_parsers.get(param_type, _parse_value)
+    return QueryParam(json.dumps(qp_schema, sort_keys=True), parse)
+
+
+def _compile_body(value, body_schemas, is_response):
+    try:
+        raw_schema = value['body']['application/json']['schema']
+    except (KeyError, TypeError):
+        return None
+    if not raw_schema:
+        return None
+    key = ('response', raw_schema) if is_response else raw_schema
+    if key not in body_schemas:
+        instance_schema = json.loads(raw_schema)
+        if is_response:
+            _remove_required(instance_schema)
+        body_schemas[key] = BodySchema(key, instance_schema)
+    return body_schemas[key]
+
+
 def _parse_from_string(a_string):
     try:
         field = json.loads(a_string)
@@ -211,37 +853,134 @@ def _parse_from_string(a_string):
     return field
 
 
-def _do_param_validation(param, schema):
-    err_msg = ""
+json_constants = {'true': True, 'false': False, 'null': None}
+json_number = re.compile(r'-?(?:0|[1-9][0-9]*)(\.[0-9]+)?([eE][+-]?[0-9]+)?\Z')
+
+
+def _is_plain(a_string):
+    """ Whether `json.loads` certainly fails for a string, numbers aside """
+    return not (
+        not a_string or a_string[0] in '[{"' or a_string[0].isspace() or
+        a_string[-1].isspace() or a_string in ('NaN', 'Infinity', '-Infinity'))
+
+
+def _parse_value(a_string):
+    """ `_parse_from_string`, without trying `json.loads` on plain strings """
+    if a_string in json_constants:
+        return json_constants[a_string]
+    match = json_number.match(a_string)
+    if match:
+        if match.group(1) or match.group(2):
+            return float(a_string)
+        return int(a_string)
+    if not _is_plain(a_string):
+        return _parse_from_string(a_string)
+    if ',' in a_string:
+        return [_parse_value(item) for item in a_string.split(',')]
+    return a_string
+
+
+def _parse_string(a_string):
+    """ Parses the value of a string parameter, numbers stay as written """
+    if ',' in a_string and _is_plain(a_string):
+        return [_parse_string(item) for item in a_string.split(',')]
+    if a_string in json_constants or json_number.match(a_string):
+        return a_string
+    return _parse_value(a_string)
+
+
+def _parse_date(a_string):
+    # RFC 2616 dates contain a comma, only a value that isn't one whole date
+    #   is a list
+    if ',' in a_string and not is_date(a_string):
+        return a_string.split(',')
+    return a_string
+
+
+# parsers of the query parameter types, others are parsed as JSON if they can
+query_parsers = {
+    'string': _parse_string,
+    'date': _parse_date,
+}
+
+
+def _parse_query(query_data, query_params):
+    parsed = {}
+    for (key, values) in query_data.items():
+        param = query_params.get(key)
+        parse = _parse_value if param is None else param.parse
+        if len(values) == 1:
+            # remove the enclosing list from non-list types
+            parsed[key] = parse(values[0])
+        else:
+            parsed[key] = [parse(value) for value in values]
+    return parsed
+
+
+def parse_query_data(data, spec):
+    """
+    Parses the query values left raw by `parse_data` into the types of the
+    method's query parameters.
+
+    :param namedtuple data: generated by `parse_data`
+
+    :param CompiledMethod spec: the method of the request
+
+    :rtype Data: with the parsed query values
+
+    """
+    if data.request is None or not isinstance(
+            data.request.query_data, RawQuery):
+        return data
+    query_data = _parse_query(
+        data.request.query_data, spec.query_params or {})
+    return data._replace(
+        request=data.request._replace(query_data=query_data))
+
+
+def _do_param_validation(param, schema, limit=None, path=(), key=None):
+    """
+    Validates a query (or uri) parameter.
+
+    :param tuple path: the path of the parameter in its `ErrorRecord`s
+
+    :param str key: the registry key of the schema, if known
+
+    :rtype list: the `ErrorRecord`s found
+
+    """
+    if limit is None:
+        limit = _ErrorLimit()
     if isinstance(param, dict):
         param = json.dumps(param)
     # if the parameter is a list, validate each element against the schema
     elif isinstance(param, list):
-        for item in param:
-            err_msg = "".join(
-                [err_msg, _do_param_validation(item, schema)]
-            )
-        return err_msg
+        errors = []
+        for index, item in enumerate(param):
+            if limit.reached:
+                break
+            errors.extend(_do_param_validation(
+                item, schema, limit, path + (index,), key))
+        return errors
     # sometimes a number should be a string
     elif isinstance(param, (int, float)) and schema['type'] == 'string':
         param = str(param)
 
     if schema['type'] == 'date':
-        try:
-            validate_date(param)
-        except ValueError as e:
-            if "Unknown string format" in str(e):
-                err_msg = (" - Request query param '{}' does not conform"
-                           " to any known date format.\n".format(param))
+        if not is_date(param):
+            limit.count()
+            if isinstance(param, str) and recognize_date(param) is False:
+                message = "'{}' is not a valid date".format(param)
             else:
-                raise e
-        return err_msg
+                message = ("'{}' does not conform to any known date "
+                           "format".format(param))
+            return [ErrorRecord(
+                'query', path, 'date', message, ('type',), ())]
+        return []
 
-    try:
-        _validate(param, schema)
-    except Exception as e:
-        err_msg = str(e)
-    return err_msg
+    errors = _collect_errors(
+        param, schema, key=key, limit=limit, location='query')
+    return [error._replace(path=path + error.path) for error in errors]
 
 
 def _get_pretty_path(col_dq):
@@ -254,101 +993,177 @@ def _get_pretty_path(col_dq):
     return path_string
 
 
-def _validate(data, schema):
-    # custom validation for clean and comprehensive error output
-    err_msg = ""
-    validator = Draft4Validator(schema)
-    errors = sorted(validator.iter_errors(data), key=lambda x: x.path)
+def _collect_errors(data, schema, key=None, limit=None, location='request'):
+    """
+    Validates data against a schema.
+
+    :rtype list: the `ErrorRecord`s found, ordered by path
+
+    """
+    if limit is None:
+        limit = _ErrorLimit()
+    validator = validators.get(schema, key)
+    errors = limit.take(validator.iter_errors(data))
+    errors = sorted(errors, key=lambda x: x.path)
+    records = []
     for error in errors:
-        err_msg = "".join([err_msg, " - ",
-                           _get_pretty_path(error.absolute_path),
-                           ": ", error.message, "\n"])
-        suberrors = sorted(error.context, key=lambda e: e.schema_path)
-        for suberror in suberrors:
-            err_msg = ("".join([
-                err_msg, "     > Schema path: ",
-                str(list(suberror.schema_path)),
-                " Error: ", suberror.message, "\n"
-            ]))
+        context = ()
+        if limit.max_errors is None:
+            # with a limit only a verdict is wanted, skip the `anyOf`/`oneOf`
+            # details
+            suberrors = sorted(error.context, key=lambda e: e.schema_path)
+            context = tuple(
+                (tuple(suberror.schema_path), suberror.message)
+                for suberror in suberrors)
+        records.append(ErrorRecord(
+            location, tuple(error.absolute_path), error.validator,
+            error.message, tuple(error.absolute_schema_path), context))
+    return records
+
+
+def _validate(data, schema, key=None, limit=None):
+    # custom validation for clean and comprehensive error output
+    errors = _collect_errors(data, schema, key, limit)
     if errors:
-        raise ValidationError(err_msg)
+        raise ValidationError(
+            "".join(error.render() for error in errors))
+
 
+_echo_encoder = json.JSONEncoder(default=repr)
 
-def validate_request_against_schema(data, spec):
+
+def _echo(value, echo_size):
+    """
+    Renders the value as JSON, cut after `echo_size` characters without
+    encoding the rest of it.
+    """
+    chunks = []
+    size = 0
+    for chunk in _echo_encoder.iterencode(value):
+        chunks.append(chunk)
+        size += len(chunk)
+        if size > echo_size:
+            return "".join(chunks)[:echo_size] + "... (truncated)"
+    return "".join(chunks)
+
+
+def _render_request_errors(errors, data, echo_size):
+    query_errors = [e for e in errors if e.location == 'query']
+    body_errors = [e for e in errors if e.location != 'query']
+    parts = []
+    if query_errors:
+        parts.append("\n\nRequest query param validation errors...\n\n")
+        parts.extend(error.render() for error in query_errors)
+    if body_errors:
+        parts.append("\nFound during request validation...\n\n")
+        parts.extend(error.render() for error in body_errors)
+    if echo_size and data is not None:
+        detail = {
+            "method": data.method,
+            "path": data.path,
+            "query": data.request.query_data,
+            "request": data.request.request_data,
+        }
+        parts.extend([
+            "\nRequest detail:\n\n", _echo(detail, echo_size), "\n"])
+    return "".join(parts)
+
+
+def _render_response_errors(errors, data, echo_size):
+    parts = ["Found during response validation:\n"]
+    parts.extend(error.render() for error in errors)
+    if echo_size and data is not None:
+        request = {
+            "query": data.request.query_data if data.request else None,
+            "request": data.request.request_data if data.request else None,
+        }
+        parts.extend([
+            "\nRequest:\n\n", _echo(request, echo_size),
+            "\n\nResponse:\n\n",
+            "STATUS CODE: ", str(data.response.status_code),
+            "\nCONTENT: ", _echo(data.response.response_data, echo_size),
+            "\n"])
+    return "".join(parts)
+
+
+def validate_request_against_schema(data, spec, max_errors=None):
     """
     Validates the query parameters and body data of a test client request.
 
     :param namedtuple data: the instance data to be validated
 
-    :param dict spec: the relevant jsonschema definition for the instance
+    :param spec: the relevant jsonschema definition for the instance, as
+        returned by `get_spec`
+    :type spec: dict or CompiledMethod
+
+    :param int max_errors: stop validating once this many errors are found,
+        without details of `anyOf`/`oneOf` sub errors. None for all errors.
 
     :rtype None
 
     :raises: :class: `.JSONSchemaValidationError`
 
     """
+    if not isinstance(spec, CompiledMethod):
+        spec = compile_method(spec)
+    data = parse_query_data(data, spec)
     req_data = data.request.request_data
     req_params = data.request.query_data
-    err_msg = ""
+    body_schema = spec.request_schema
+    query_parameters = spec.query_parameters
+    query_params = spec.query_params
+    limit = _ErrorLimit(max_errors)
+    errors = []
 
     # validate query parameters
-    if req_params and 'queryParameters' in spec:
-
-        for key in spec['queryParameters']:
-            if 'required' in spec['queryParameters'][key]:
-                # We delete RAML's `required` field otherwise it won't
-                # validate using JSONSchema
-                del spec['queryParameters'][key]['required']
-                qp_schema = spec['queryParameters'][key]
-                # validate required fields in place since they're ready
-                try:
-                    err_msg = "".join([
-                        err_msg,
-                        _do_param_validation(req_params[key], qp_schema)
-                    ])
-                except KeyError as e:
-                    err_msg = "".join([
-                        err_msg,
-                        " - Missing required query param: '", key, "'\n"
-                    ])
-                else:
-                    # delete the field so it is not validated twice
-                    del req_params[key]
+    if req_params and query_parameters is not None:
+
+        for key in spec.required_params:
+            if limit.reached:
+                break
+            # validate required fields first
+            if key in req_params:
+                errors.extend(_do_param_validation(
+                    req_params[key], query_parameters[key], limit, (key,),
+                    query_params[key].key))
+            else:
+                errors.append(ErrorRecord(
+                    'query', (key,), 'required',
+                    'Missing required query param', ('required',), ()))
+                limit.count()
         for param in req_params:
+            if limit.reached:
+                break
+            if param in spec.required_params:
+                # already validated above
+                continue
             try:
-                qp_schema = spec['queryParameters'][param]
-            except KeyError as e:
-                err_msg = "".join([err_msg, " - Query parameter '", str(e),
-                                   "' undefined in specification.\n"])
+                qp_schema = query_parameters[param]
+            except KeyError:
+                errors.append(ErrorRecord(
+                    'query', (param,), 'queryParameters',
+                    'Undefined in specification', ('queryParameters',), ()))
+                limit.count()
             else:
-                err_msg = "".join([
-                    err_msg,
-                    _do_param_validation(req_params[param], qp_schema)
-                ])
+                errors.extend(_do_param_validation(
+                    req_params[param], qp_schema, limit, (param,),
+                    query_params[param].key))
     elif req_params:
-        err_msg = " - `queryParameters` must be defined in specification\n"
-
-    if err_msg:
-        err_msg = "".join([
-            "\n\nRequest query param validation errors...\n\n", err_msg])
+        errors.append(ErrorRecord(
+            'query', (), 'queryParameters',
+            '`queryParameters` must be defined in specification',
+            ('queryParameters',), ()))
+        limit.count()
 
     # validate request body
-    if req_data and 'body' in spec:
-        raw_instance_sch = spec['body']['application/json']['schema']
-        instance_schema = json.loads(raw_instance_sch)
-        try:
-            _validate(req_data, instance_schema)
-        except Exception as e:
-            err_msg = "".join([
-                err_msg, "\nFound during request validation...\n\n",
-                str(e)])
+    if req_data and body_schema and not limit.reached:
+        errors.extend(_collect_errors(
+            req_data, body_schema.schema, key=body_schema.key, limit=limit))
 
     # Finally raise all validation errors at once
-    if err_msg:
-        err_msg = "".join([
-            err_msg, "\nRequest detail:\n\n'",
-            str(json.loads(json.dumps(data))), "\n"])
-        raise JSONSchemaValidationError(err_msg)
+    if errors:
+        raise JSONSchemaValidationError(
+            errors, data, 'request', limit.collected)
 
 
 def _remove_required(spec, parent_prop=None, keep=False):
@@ -371,52 +1186,44 @@ def _remove_required(spec, parent_prop=None, keep=False):
                 _remove_required(spec[prop], prop)
 
 
-def validate_response_against_schema(data, spec):
+def validate_response_against_schema(data, spec, max_errors=None):
     """
     Validates the instance data from the response.
 
     :param namedtuple data: the instance data to be validated
 
-    :param dict spec: the relevant jsonschema definition for the instance
+    :param spec: the relevant jsonschema definition for the instance, as
+        returned by `get_spec`
+    :type spec: dict or CompiledMethod
+
+    :param int max_errors: stop validating once this many errors are found,
+        without details of `anyOf`/`oneOf` sub errors. None for all errors.
 
     :raises: :class:`.UndefinedSchemaError`
     :raises: :class:`.JSONSchemaValidationError`
 
     """
+    if not isinstance(spec, CompiledMethod):
+        spec = compile_method(spec)
     res_status_code = str(data.response.status_code)
     # Now match the response status code with the schema for the code
-    for code, value in spec['responses'].items():
-        if code == res_status_code:
-            if 'body' in value:
-                json_response = value['body']['application/json']
-                if not json_response:
-                    return
-                raw_instance_schema = (
-                    json_response['schema'])
-                instance_schema = json.loads(raw_instance_schema)
-                _remove_required(instance_schema)
-                res_data = data.response.response_data
-                try:
-                    _validate(res_data, instance_schema)
-                except Exception as e:
-                    msg = "".join([
-                        "Found during response validation:\n",
-                        str(e),
-                        "\nRequest:\n\n'", str(data.request),
-                        "\n\nResponse:\n\n",
-                        "STATUS CODE: ", str(data.response.status_code),
-                        "\nCONTENT: ",
-                        str(json.loads(json.dumps(data.response.response_data))),
-                        "\n"])
-                    raise JSONSchemaValidationError(msg)
-                return
-            else:
-                return
-    raise UndefinedSchemaError(
-        "The status code '{}' for method '{}' and path '{}' is not defined by"
-        " the specification.".format(
-            res_status_code,
-            str(data.method),
-            str(data.path)
+    try:
+        body_schema = spec.responses[res_status_code]
+    except KeyError:
+        raise UndefinedSchemaError(
+            "The status code '{}' for method '{}' and path '{}' is not defined"
+            " by the specification.".format(
+                res_status_code,
+                str(data.method),
+                str(data.path)
+            )
         )
-    )
+    if not body_schema:
+        return
+    res_data = data.response.response_data
+    limit = _ErrorLimit(max_errors)
+    errors = _collect_errors(res_data, body_schema.schema, key=body_schema.key,
+                             limit=limit, location='response')
+    if errors:
+        raise JSONSchemaValidationError(
+            errors, data, 'response', limit.collected)
@@ -0,0 +1,367 @@
+"""Compiles JSON schemas into specialized Python validation functions.
+
+Every (sub)schema becomes a generated generator function with its keyword
+checks inlined, yielding the same `ValidationError`s, in the same order and
+with the same paths and messages, as `Draft4Validator.iter_errors`.
+Schemas using keywords not supported here are not compiled, callers fall
+back to `Draft4Validator` for them.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import numbers
+import re
+
+from jsonschema import _utils
+from jsonschema.exceptions import ValidationError
+from jsonschema.validators import Draft4Validator
+
+type_checks = {
+    'array': 'isinstance(instance, list)',
+    'boolean': 'isinstance(instance, bool)',
+    'integer': '(isinstance(instance, int) and '
+               'not isinstance(instance, bool))',
+    'null': 'instance is None',
+    'number': '(isinstance(instance, Number) and '
+              'not isinstance(instance, bool))',
+    'object': 'isinstance(instance, dict)',
+    'string': 'isinstance(instance, str)',
+}
+
+# jsonschema ignores keywords it has no validator for, and `format` without
+# a format checker
+ignored_keywords = frozenset(['format'])
+
+
+class UnsupportedSchema(Exception):
+    """Raised for schemas the code generator can't compile."""
+    pass
+
+
+class CompiledValidator(object):
+    """Stands in for `Draft4Validator` with a generated `iter_errors`."""
+
+    def __init__(self, schema, iter_errors, source):
+        self.schema = schema
+        self.iter_errors = iter_errors
+        self.source = source
+
+    def is_valid(self, instance):
+        return next(self.iter_errors(instance), None) is None
+
+
+def compile_schema(schema):
+    """
+    Generates a validator for the schema.
+
+    :param dict schema: a draft 4 JSON schema
+
+    :rtype CompiledValidator: or None when the schema uses keywords that
+        are not supported
+
+    """
+    compiler = _Compiler()
+    try:
+        name = compiler.function(schema)
+    except UnsupportedSchema:
+        return None
+    source = "\n".join(compiler.lines)
+    namespace = compiler.namespace
+    exec(compile(source, "<pedantic.codegen>", "exec"), namespace)
+    return CompiledValidator(schema, namespace[name], source)
+
+
+def _error(message, validator, validator_value, instance, schema,
+           context=()):
+    return ValidationError(
+        message,
+        validator=validator,
+        validator_value=validator_value,
+        instance=instance,
+        schema=schema,
+        schema_path=(validator,),
+        context=context,
+    )
+
+
+class _Compiler(object):
+
+    def __init__(self):
+        self.lines = []
+        self.namespace = {
+            'Number': numbers.Number,
+            '_error': _error,
+            '_extras_msg': _utils.extras_msg,
+        }
+        self.functions = {}
+
+    def constant(self, value):
+        name = '_c{}'.format(len(self.namespace))
+        self.namespace[name] = value
+        return name
+
+    def function(self, schema):
+        """ Generates the function for a (sub)schema, returns its name """
+        if id(schema) in self.functions:
+            return self.functions[id(schema)]
+        if not isinstance(schema, dict) or '$ref' in schema:
+            raise UnsupportedSchema(schema)
+        name = '_s{}'.format(len(self.functions))
+        self.functions[id(schema)] = name
+
+        body = []
+        for (keyword, value) in schema.items():
+            if keyword in ignored_keywords:
+                continue
+            if keyword not in Draft4Validator.VALIDATORS:
+                continue
+            emit = getattr(self, '_' + keyword, None)
+            if emit is None:
+                raise UnsupportedSchema(keyword)
+            body.extend(emit(value, schema))
+
+        self.lines.append('def {}(instance):'.format(name))
+        self.lines.append('    schema = {}'.format(self.constant(schema)))
+        self.lines.extend('    ' + line for line in body)
+        # make it a generator even when no check applies
+        self.lines.extend(['    return', '    yield', ''])
+        return name
+
+    def _type(self, value, schema):
+        types = _utils.ensure_list(value)
+        if not isinstance(types, list) or not types:
+            raise UnsupportedSchema(types)
+        for type in types:
+            if type not in type_checks:
+                raise UnsupportedSchema(type)
+        message = '%r is not of type ' + ', '.join(
+            repr(type).replace('%', '%%') for type in types)
+        return [
+            'if not ({}):'.format(' or '.join(
+                type_checks[type] for type in types)),
+            '    yield _error({} % (instance,), "type", {}, instance, '
+            'schema)'.format(self.constant(message), self.constant(value)),
+        ]
+
+    def _properties(self, properties, schema):
+        if not isinstance(properties, dict):
+            raise UnsupportedSchema(properties)
+        lines = ['if isinstance(instance, dict):']
+        for (prop, subschema) in properties.items():
+            lines.extend([
+                '    if {!r} in instance:'.format(prop),
+                '        for error in {}(instance[{!r}]):'.format(
+                    self.function(subschema), prop),
+                '            error.path.appendleft({!r})'.format(prop),
+                '            error.schema_path.extendleft(({!r}, '
+                '"properties"))'.format(prop),
+                '            yield error',
+            ])
+        if not properties:
+            lines.append('    pass')
+        return lines
+
+    def _required(self, required, schema):
+        if not isinstance(required, list):
+            raise UnsupportedSchema(required)
+        required_value = self.constant(required)
+        lines = ['if isinstance(instance, dict):']
+        for prop in required:
+            lines.extend([
+                '    if {!r} not in instance:'.format(prop),
+                '        yield _error({}, "required", {}, instance, '
+                'schema)'.format(
+                    self.constant('%r is a required property' % (prop,)),
+                    required_value),
+            ])
+        if not required:
+            lines.append('    pass')
+        return lines
+
+    def _additionalProperties(self, aP, schema):
+        if 'patternProperties' in schema:
+            raise UnsupportedSchema('patternProperties')
+        if aP is True:
+            return []
+        properties = self.constant(schema.get('properties', {}))
+        lines = [
+            'if isinstance(instance, dict):',
+            '    extras = set(prop for prop in instance '
+            'if prop not in {})'.format(properties),
+        ]
+        if isinstance(aP, dict):
+            lines.extend([
+                '    for extra in extras:',
+                '        for error in {}(instance[extra]):'.format(
+                    self.function(aP)),
+                '            error.path.appendleft(extra)',
+                '            error.schema_path.appendleft('
+                '"additionalProperties")',
+                '            yield error',
+            ])
+        elif aP is False:
+            lines.extend([
+                '    if extras:',
+                '        yield _error("Additional properties are not allowed '
+                '(%s %s unexpected)" % _extras_msg(extras), '
+                '"additionalProperties", False, instance, schema)',
+            ])
+        else:
+            raise UnsupportedSchema(aP)
+        return lines
+
+    def _items(self, items, schema):
+        lines = ['if isinstance(instance, list):']
+        if isinstance(items, dict):
+            lines.extend([
+                '    for index, item in enumerate(instance):',
+                '        for error in {}(item):'.format(self.function(items)),
+                '            error.path.appendleft(index)',
+                '            error.schema_path.appendleft("items")',
+                '            yield error',
+            ])
+        elif isinstance(items, list):
+            for (index, subschema) in enumerate(items):
+                lines.extend([
+                    '    if len(instance) > {}:'.format(index),
+                    '        for error in {}(instance[{}]):'.format(
+                        self.function(subschema), index),
+                    '            error.path.appendleft({})'.format(index),
+                    '            error.schema_path.extendleft(({}, '
+                    '"items"))'.format(index),
+                    '            yield error',
+                ])
+            if not items:
+                lines.append('    pass')
+        else:
+            raise UnsupportedSchema(items)
+        return lines
+
+    def _length(self, keyword, type, limit, op, message):
+        if not isinstance(limit, numbers.Number):
+            raise UnsupportedSchema(limit)
+        limit = self.constant(limit)
+        return [
+            'if {} and len(instance) {} {}:'.format(
+                type_checks[type], op, limit),
+            '    yield _error({!r} % (instance,), {!r}, {}, instance, '
+            'schema)'.format(message, keyword, limit),
+        ]
+
+    def _minItems(self, limit, schema):
+        return self._length('minItems', 'array', limit, '<',
+                            '%r is too short')
+
+    def _maxItems(self, limit, schema):
+        return self._length('maxItems', 'array', limit, '>', '%r is too long')
+
+    def _minLength(self, limit, schema):
+        return self._length('minLength', 'string', limit, '<',
+                            '%r is too short')
+
+    def _maxLength(self, limit, schema):
+        return self._length('maxLength', 'string', limit, '>',
+                            '%r is too long')
+
+    def _pattern(self, pattern, schema):
+        try:
+            compiled = re.compile(pattern)
+        except (re.error, TypeError):
+            # jsonschema only fails once an instance reaches the schema
+            raise UnsupportedSchema(pattern)
+        message = '%r does not match ' + repr(pattern).replace('%', '%%')
+        return [
+            'if isinstance(instance, str) and not {}.search(instance):'.format(
+                self.constant(compiled)),
+            '    yield _error({} % (instance,), "pattern", {}, instance, '
+            'schema)'.format(self.constant(message), self.constant(pattern)),
+        ]
+
+    def _bound(self, keyword, limit, exclusive, ops, words):
+        if not isinstance(limit, numbers.Number) or isinstance(limit, bool):
+            raise UnsupportedSchema(limit)
+        op, cmp = (ops[1], words[1]) if exclusive else (ops[0], words[0])
+        limit = self.constant(limit)
+        return [
+            'if {} and instance {} {}:'.format(
+                type_checks['number'], op, limit),
+            '    yield _error("%r is {} the {} of %r" % (instance, {}), '
+            '{!r}, {}, instance, schema)'.format(
+                cmp, keyword, limit, keyword, limit),
+        ]
+
+    def _minimum(self, minimum, schema):
+        return self._bound(
+            'minimum', minimum, schema.get('exclusiveMinimum', False),
+            ('<', '<='), ('less than', 'less than or equal to'))
+
+    def _maximum(self, maximum, schema):
+        return self._bound(
+            'maximum', maximum, schema.get('exclusiveMaximum', False),
+            ('>', '>='), ('greater than', 'greater than or equal to'))
+
+    def _enum(self, enums, schema):
+        enums = self.constant(enums)
+        return [
+            'if instance not in {}:'.format(enums),
+            '    yield _error("%r is not one of %r" % (instance, {0}), '
+            '"enum", {0}, instance, schema)'.format(enums),
+        ]
+
+    def _subschemas(self, subschemas):
+        if not isinstance(subschemas, list):
+            raise UnsupportedSchema(subschemas)
+        return '({},)'.format(', '.join(
+            self.function(subschema) for subschema in subschemas))
+
+    def _allOf(self, allOf, schema):
+        return [
+            'for index, validate in enumerate({}):'.format(
+                self._subschemas(allOf)),
+            '    for error in validate(instance):',
+            '        error.schema_path.extendleft((index, "allOf"))',
+            '        yield error',
+        ]
+
+    def _anyOf(self, anyOf, schema):
+        return [
+            'all_errors = []',
+            'for index, validate in enumerate({}):'.format(
+                self._subschemas(anyOf)),
+            '    errors = list(validate(instance))',
+            '    if not errors:',
+            '        break',
+            '    for error in errors:',
+            '        error.schema_path.appendleft(index)',
+            '    all_errors.extend(errors)',
+            'else:',
+            '    yield _error("%r is not valid under any of the given '
+            'schemas" % (instance,), "anyOf", {}, instance, schema, '
+            'all_errors)'.format(self.constant(anyOf)),
+        ]
+
+    def _oneOf(self, oneOf, schema):
+        one_of = self.constant(oneOf)
+        return [
+            'subschemas = enumerate({})'.format(self._subschemas(oneOf)),
+            'all_errors = []',
+            'for index, validate in subschemas:',
+            '    errors = list(validate(instance))',
+            '    if not errors:',
+            '        first_valid = {}[index]'.format(one_of),
+            '        break',
+            '    for error in errors:',
+            '        error.schema_path.appendleft(index)',
+            '    all_errors.extend(errors)',
+            'else:',
+            '    yield _error("%r is not valid under any of the given '
+            'schemas" % (instance,), "oneOf", {}, instance, schema, '
+            'all_errors)'.format(one_of),
+            'more_valid = [{}[index] for index, validate in subschemas '
+            'if next(validate(instance), None) is None]'.format(one_of),
+            'if more_valid:',
+            '    more_valid.append(first_valid)',
+            '    reprs = ", ".join(repr(valid) for valid in more_valid)',
+            '    yield _error("%r is valid under each of %s" % (instance, '
+            'reprs), "oneOf", {}, instance, schema)'.format(one_of),
+        ]
@@ -0,0 +1,110 @@
+"""Recognizes the date formats of RAML 0.8 `date` parameters.
+
+RAML 0.8 dates are RFC 2616 dates, ISO 8601 dates are accepted as well.
+Those forms are matched by regular expressions, anything else is left to
+`dateutil`, which accepts many more formats but is much slower. Results are
+remembered, as fixtures tend to repeat the same few dates.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import re
+from datetime import datetime
+
+from dateutil.parser import parse as parse_date
+
+MAX_MEMO = 4096  # values remembered, the memo is emptied once full
+
+_DAYS = 'Mon|Tue|Wed|Thu|Fri|Sat|Sun'
+_WEEKDAYS = 'Monday|Tuesday|Wednesday|Thursday|Friday|Saturday|Sunday'
+_MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+           'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+_MONTH = '|'.join(_MONTHS)
+
+# each yields the year, month, day, hour, minute and second groups, by name
+_FORMATS = (
+    # RFC 1123, e.g. Sun, 06 Nov 1994 08:49:37 GMT
+    re.compile(r'(?:{}), (?P<day>\d\d) (?P<month>{}) (?P<year>\d{{4}}) '
+               r'(?P<hour>\d\d):(?P<minute>\d\d):(?P<second>\d\d) GMT\Z'
+               .format(_DAYS, _MONTH)),
+    # RFC 850, e.g. Sunday, 06-Nov-94 08:49:37 GMT
+    re.compile(r'(?:{}), (?P<day>\d\d)-(?P<month>{})-(?P<year>\d\d) '
+               r'(?P<hour>\d\d):(?P<minute>\d\d):(?P<second>\d\d) GMT\Z'
+               .format(_WEEKDAYS, _MONTH)),
+    # asctime, e.g. Sun Nov  6 08:49:37 1994
+    re.compile(r'(?:{}) (?P<month>{}) (?P<day>[ \d]\d) '
+               r'(?P<hour>\d\d):(?P<minute>\d\d):(?P<second>\d\d) '
+               r'(?P<year>\d{{4}})\Z'.format(_DAYS, _MONTH)),
+    # ISO 8601, e.g. 1994-11-06 or 1994-11-06T08:49:37.250+01:00
+    re.compile(r'(?P<year>\d{4})-(?P<month>\d\d)-(?P<day>\d\d)'
+               r'(?:T(?P<hour>\d\d):(?P<minute>\d\d)'
+               r'(?::(?P<second>\d\d)(?:\.\d{1,6})?)?'
+               r'(?:Z|[+-](?:[01]\d|2[0-3]):?[0-5]\d)?)?\Z'),
+)
+
+_memo = {}
+
+
+def recognize(value):
+    """
+    Whether the string is a valid date in one of the RFC 2616 or ISO 8601
+    forms, False when it's in one but out of range (e.g. a 30th of February),
+    None if it is in none of them.
+    """
+    for pattern in _FORMATS:
+        match = pattern.match(value)
+        if match is not None:
+            break
+    else:
+        return None
+    fields = match.groupdict()
+    month = fields['month']
+    year = int(fields['year'])
+    if len(fields['year']) == 2:
+        # as close as dateutil picks, only leap years matter here
+        year += 2000
+    try:
+        datetime(
+            year,
+            _MONTHS.index(month) + 1 if month in _MONTHS else int(month),
+            int(fields['day']),
+            int(fields['hour'] or 0),
+            int(fields['minute'] or 0),
+            int(fields['second'] or 0))
+    except ValueError:
+        return False
+    return True
+
+
+def is_date(value):
+    """
+    Whether `dateutil` parses the value as a date, dates out of range (e.g.
+    a 30th of February) aren't.
+    """
+    try:
+        return _memo[value]
+    except (KeyError, TypeError):
+        pass
+    if not isinstance(value, str):
+        return _parse(value)
+
+    valid = recognize(value)
+    if valid is None:
+        valid = _parse(value)
+    if len(_memo) >= MAX_MEMO:
+        _memo.clear()
+    _memo[value] = valid
+    return valid
+
+
+def _parse(value):
+    try:
+        parse_date(value)
+    except (ValueError, OverflowError):
+        return False
+    return True
+
+
+def clear():
+    """ Forgets the dates seen so far """
+    _memo.clear()
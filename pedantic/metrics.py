@@ -0,0 +1,163 @@
+"""Counters and histograms exposed in the Prometheus text format.
+
+Recording is a dict lookup and a few integer additions under a lock, cheap
+enough to leave on for every fixture. Values are kept per process, each
+worker forked by `--workers` reports its own.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import threading
+from bisect import bisect_left
+try:
+    from time import perf_counter as timer
+except ImportError:
+    from time import time as timer
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# in seconds, validations take from tens of microseconds to a second
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+class Counter(object):
+    """A count per value of its label.
+
+    :param str name: the metric name, e.g. ``pedantic_fixtures_total``
+
+    :param str documentation: its ``HELP`` line
+
+    :param str label: the label name
+
+    :param values: the label values known up front, reported even when 0
+
+    """
+
+    def __init__(self, name, documentation, label, values=()):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self._counts = dict((value, 0) for value in values)
+        self._lock = threading.Lock()
+
+    def inc(self, value, amount=1):
+        with self._lock:
+            self._counts[value] = self._counts.get(value, 0) + amount
+
+    def get(self, value):
+        return self._counts.get(value, 0)
+
+    def expose(self):
+        lines = [
+            "# HELP {} {}".format(self.name, self.documentation),
+            "# TYPE {} counter".format(self.name),
+        ]
+        with self._lock:
+            counts = sorted(self._counts.items())
+        for (value, count) in counts:
+            lines.append("{}{{{}}} {}".format(
+                self.name, _label(self.label, value), count))
+        return lines
+
+
+class Histogram(object):
+    """Cumulative buckets of observed durations per value of its label.
+
+    :param str name: the metric name, e.g. ``pedantic_phase_seconds``
+
+    :param str documentation: its ``HELP`` line
+
+    :param str label: the label name
+
+    :param values: the label values, observing any other is an error
+
+    :param tuple buckets: the upper bounds of the buckets, sorted
+
+    """
+
+    def __init__(self, name, documentation, label, values,
+                 buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self.buckets = tuple(buckets)
+        # per value: the count of each bucket (not cumulative, the last one
+        # is +Inf) followed by the sum of observations
+        self._series = dict(
+            (value, [0] * (len(self.buckets) + 1) + [0.0]) for value in values)
+        self._lock = threading.Lock()
+
+    def observe(self, value, seconds):
+        series = self._series[value]
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series[index] += 1
+            series[-1] += seconds
+
+    def count(self, value):
+        return sum(self._series[value][:-1])
+
+    def expose(self):
+        lines = [
+            "# HELP {} {}".format(self.name, self.documentation),
+            "# TYPE {} histogram".format(self.name),
+        ]
+        for value in sorted(self._series):
+            with self._lock:
+                series = list(self._series[value])
+            label = _label(self.label, value)
+            cumulative = 0
+            bounds = [repr(float(bound)) for bound in self.buckets] + ["+Inf"]
+            for (bound, count) in zip(bounds, series):
+                cumulative += count
+                lines.append('{}_bucket{{{},le="{}"}} {}'.format(
+                    self.name, label, bound, cumulative))
+            lines.append("{}_sum{{{}}} {!r}".format(
+                self.name, label, series[-1]))
+            lines.append("{}_count{{{}}} {}".format(
+                self.name, label, cumulative))
+        return lines
+
+
+class Gauge(object):
+    """Values read when exposed.
+
+    :param str name: the metric name
+
+    :param str documentation: its ``HELP`` line
+
+    :param str label: the label name
+
+    :param callable read: returns (label value, value) pairs
+
+    """
+
+    def __init__(self, name, documentation, label, read):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self.read = read
+
+    def expose(self):
+        lines = [
+            "# HELP {} {}".format(self.name, self.documentation),
+            "# TYPE {} gauge".format(self.name),
+        ]
+        for (value, gauge) in sorted(self.read()):
+            lines.append("{}{{{}}} {}".format(
+                self.name, _label(self.label, value), gauge))
+        return lines
+
+
+def expose(metrics):
+    """ Renders the metrics in the Prometheus text format """
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.expose())
+    return "\n".join(lines) + "\n"
+
+
+def _label(name, value):
+    value = ("{}".format(value).replace("\\", "\\\\").replace('"', '\\"')
+             .replace("\n", "\\n"))
+    return '{}="{}"'.format(name, value)
@@ -0,0 +1,94 @@
+"""Profiles the next fixtures validated by a running service.
+
+See `validator_service.profile`. One fixture is profiled at a time, those
+validated concurrently by other threads run unprofiled and don't count.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import cProfile
+import pstats
+import threading
+try:
+    from io import StringIO
+except ImportError:
+    from StringIO import StringIO
+
+MAX_FIXTURES = 10000
+SORT_KEYS = ('cumulative', 'tottime', 'ncalls', 'pcalls')
+DEFAULT_LIMIT = 50
+
+
+class Profiler(object):
+    """Aggregates cProfile stats over a number of calls."""
+
+    def __init__(self):
+        self.remaining = 0
+        self.profiled = 0
+        self._stats = None
+        self._lock = threading.Lock()
+        self._running = threading.Lock()
+
+    def start(self, count):
+        """
+        Profiles the next calls to `run`, discarding the previous stats.
+
+        :param int count: how many, at most `MAX_FIXTURES`
+
+        :raises: :class:`ValueError` for an invalid count
+
+        """
+        if not 0 < count <= MAX_FIXTURES:
+            raise ValueError(count)
+        with self._lock:
+            self.remaining = count
+            self.profiled = 0
+            self._stats = None
+
+    def run(self, function, *args, **kwargs):
+        """ Calls the function, profiled if the profiler was started """
+        if not self.remaining or not self._running.acquire(False):
+            return function(*args, **kwargs)
+        try:
+            if not self.remaining:
+                # the last profiled call finished meanwhile
+                return function(*args, **kwargs)
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                profile.disable()
+                self._add(profile)
+        finally:
+            self._running.release()
+
+    def _add(self, profile):
+        with self._lock:
+            if self._stats is None:
+                self._stats = pstats.Stats(profile, stream=StringIO())
+            else:
+                self._stats.add(profile)
+            self.remaining -= 1
+            self.profiled += 1
+
+    def report(self, sort='cumulative', limit=DEFAULT_LIMIT):
+        """
+        Returns the aggregated stats, as printed by `pstats`.
+
+        :param str sort: one of `SORT_KEYS`
+
+        :param int limit: the number of functions listed
+
+        :rtype str: the stats, None if nothing was profiled yet
+
+        """
+        if sort not in SORT_KEYS:
+            raise ValueError(sort)
+        with self._lock:
+            if self._stats is None:
+                return None
+            stream = StringIO()
+            self._stats.stream = stream
+            self._stats.sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
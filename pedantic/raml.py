@@ -0,0 +1,360 @@
+"""In process loader of RAML 0.8 specs.
+
+Covers the subset Pedantic relies on: `!include`, `schemas`,
+`resourceTypes` and `traits` (with parameters and optional properties),
+uri and query parameters, and JSON body schemas. The result has the
+structure output by the `raml-parser` node package (see
+`cli/raml_parser.js`), which remains the fallback for specs this loader
+can't read.
+
+Requires PyYAML.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import json
+import os
+import re
+from copy import deepcopy
+try:
+    from urllib.parse import urljoin, urlparse
+    from urllib.request import urlopen
+except ImportError:
+    from urlparse import urljoin, urlparse
+    from urllib2 import urlopen
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+HEADER = '#%RAML 0.8'
+METHODS = ('get', 'post', 'put', 'delete', 'patch', 'head', 'options',
+           'trace', 'connect')
+YAML_EXTENSIONS = ('.raml', '.yaml', '.yml')
+
+parameter = re.compile(r'<<\s*([^|>\s]+)\s*(?:\|\s*!(\w+)\s*)?>>')
+
+
+class RamlError(Exception):
+    """Raised for RAML the loader can't read or doesn't support."""
+    pass
+
+
+def load(location):
+    """
+    Loads a RAML 0.8 spec and everything it includes.
+
+    :param str location: path or URL of the spec
+
+    :rtype dict: the spec, as output by `cli/raml_parser.js`
+
+    :raises: :class:`.RamlError`
+
+    """
+    if yaml is None:
+        raise RamlError("PyYAML is not installed")
+    text = _read(location)
+    if not text.startswith(HEADER):
+        raise RamlError("{} is not a RAML 0.8 spec".format(location))
+    raw = _parse(text, location)
+    try:
+        return _Expander(raw).api()
+    except (AttributeError, KeyError, TypeError, ValueError) as e:
+        # a node of an unexpected type, e.g. a scalar instead of a mapping
+        raise RamlError("Malformed spec {}: {!r}".format(location, e))
+
+
+def _read(location):
+    try:
+        if urlparse(location).scheme in ('http', 'https', 'file'):
+            response = urlopen(location)
+            try:
+                return response.read().decode('utf8')
+            finally:
+                response.close()
+        with open(location, 'rb') as f:
+            return f.read().decode('utf8')
+    except (IOError, OSError, ValueError) as e:
+        raise RamlError("Can't read {}: {}".format(location, e))
+
+
+def _resolve(base, name):
+    if urlparse(name).scheme:
+        return name
+    if urlparse(base).scheme:
+        return urljoin(base, name)
+    return os.path.join(os.path.dirname(base), name)
+
+
+if yaml is not None:
+    class _Loader(getattr(yaml, 'CSafeLoader', yaml.SafeLoader)):
+        """Safe YAML loader resolving `!include` relative to `location`."""
+        location = None
+
+    def _construct_include(loader, node):
+        location = _resolve(loader.location, loader.construct_scalar(node))
+        text = _read(location)
+        if location.lower().endswith(YAML_EXTENSIONS):
+            return _parse(text, location)
+        return text
+
+    def _construct_timestamp(loader, node):
+        # keep dates as written, like the node parser does
+        return loader.construct_scalar(node)
+
+    _Loader.add_constructor('!include', _construct_include)
+    _Loader.add_constructor(
+        'tag:yaml.org,2002:timestamp', _construct_timestamp)
+
+
+def _parse(text, location):
+    loader = _Loader(text)
+    loader.location = location
+    try:
+        return loader.get_single_data()
+    except yaml.YAMLError as e:
+        raise RamlError("Invalid YAML in {}: {}".format(location, e))
+    finally:
+        loader.dispose()
+
+
+def _jsonable(value):
+    """ Turns the keys of mappings into strings, as JSON would """
+    if isinstance(value, dict):
+        return dict(
+            (key if isinstance(key, str) else json.dumps(key),
+             _jsonable(item))
+            for (key, item) in value.items())
+    if isinstance(value, list):
+        return [_jsonable(item) for item in value]
+    return value
+
+
+def _named(definitions):
+    """ Merges a list of single item mappings, e.g. `traits` """
+    if isinstance(definitions, dict):
+        return dict(definitions)
+    merged = {}
+    for definition in definitions or ():
+        if not isinstance(definition, dict):
+            raise RamlError("Invalid definition: {!r}".format(definition))
+        merged.update(definition)
+    return merged
+
+
+def _reference(ref):
+    """ Splits a `type` or `is` reference into its name and parameters """
+    if isinstance(ref, str):
+        return ref, {}
+    if isinstance(ref, dict) and len(ref) == 1:
+        (name, params), = ref.items()
+        return name, dict(params or {})
+    raise RamlError("Invalid reference: {!r}".format(ref))
+
+
+def _merge(target, source):
+    """
+    Applies a resource type or trait, the target's own values win.
+    Properties ending with `?` are only applied to existing ones.
+    """
+    merged = dict(target)
+    for (key, value) in source.items():
+        optional = isinstance(key, str) and key.endswith('?')
+        if optional:
+            key = key[:-1]
+        if key not in merged:
+            if not optional:
+                merged[key] = value
+        elif key == 'is':
+            merged[key] = list(value or ()) + list(merged[key] or ())
+        elif isinstance(merged[key], dict) and isinstance(value, dict):
+            merged[key] = _merge(merged[key], value)
+        elif merged[key] is None and isinstance(value, dict):
+            merged[key] = _merge({}, value)
+    return merged
+
+
+def _transform(value, function):
+    if function is None:
+        return value
+    if function == 'singularize':
+        if value.endswith('ies'):
+            return value[:-3] + 'y'
+        return value[:-1] if value.endswith('s') else value
+    if function == 'pluralize':
+        if value.endswith('y'):
+            return value[:-1] + 'ies'
+        return value if value.endswith('s') else value + 's'
+    raise RamlError("Unknown parameter function `!{}`".format(function))
+
+
+def _substitute(value, params):
+    """ Replaces `<<param>>`s in the keys and values of a definition """
+    if isinstance(value, dict):
+        return dict(
+            (_substitute(key, params), _substitute(item, params))
+            for (key, item) in value.items())
+    if isinstance(value, list):
+        return [_substitute(item, params) for item in value]
+    if not isinstance(value, str):
+        return value
+
+    def replace(match):
+        (name, function) = match.groups()
+        try:
+            return _transform(str(params[name]), function)
+        except KeyError:
+            raise RamlError("Missing parameter `{}`".format(name))
+    return parameter.sub(replace, value)
+
+
+def _resource_path_name(uri):
+    for segment in reversed(uri.split('/')):
+        if segment and '{' not in segment:
+            return segment
+    return ''
+
+
+class _Expander(object):
+    """Expands the raw YAML of a spec into the node parser's structure."""
+
+    def __init__(self, raw):
+        if not isinstance(raw, dict):
+            raise RamlError("The spec must be a mapping")
+        self.raw = raw
+        self.media_type = raw.get('mediaType')
+        self.schemas = _named(raw.get('schemas'))
+        self.resource_types = _named(raw.get('resourceTypes'))
+        self.traits = _named(raw.get('traits'))
+
+    def api(self):
+        api = {}
+        resources = []
+        for (key, value) in self.raw.items():
+            if isinstance(key, str) and key.startswith('/'):
+                resources.append(self.resource(key, value, ''))
+            elif key != 'documentation':
+                # documentation isn't needed for validation
+                api[key] = value
+        if resources:
+            api['resources'] = resources
+        return _jsonable(api)
+
+    def resource(self, relative_uri, node, parent_uri):
+        uri = parent_uri + relative_uri
+        node = dict(node or {})
+        if node.get('type'):
+            node = self.apply_type(node, node['type'], uri)
+        resource = {
+            'relativeUri': relative_uri,
+            'relativeUriPathSegments': [
+                segment for segment in relative_uri.split('/') if segment],
+        }
+        methods = []
+        resources = []
+        for (key, value) in node.items():
+            if isinstance(key, str) and key.startswith('/'):
+                resources.append(self.resource(key, value, uri))
+            elif key in METHODS:
+                methods.append(
+                    self.method(key, value, node.get('is'), uri))
+            elif key in ('uriParameters', 'baseUriParameters'):
+                resource[key] = self.parameters(value, required=True)
+            else:
+                resource[key] = value
+        if methods:
+            resource['methods'] = methods
+        if resources:
+            resource['resources'] = resources
+        return resource
+
+    def apply_type(self, node, ref, uri, seen=()):
+        (name, params) = _reference(ref)
+        if name in seen:
+            raise RamlError("Recursive resource type `{}`".format(name))
+        try:
+            definition = self.resource_types[name]
+        except KeyError:
+            raise RamlError("Undefined resource type `{}`".format(name))
+        params.update(
+            resourcePath=uri, resourcePathName=_resource_path_name(uri))
+        definition = _substitute(deepcopy(definition or {}), params)
+        if definition.get('type'):
+            definition = self.apply_type(
+                definition, definition['type'], uri, seen + (name,))
+        return _merge(node, definition)
+
+    def method(self, name, node, resource_traits, uri):
+        node = dict(node or {})
+        refs = list(resource_traits or ()) + list(node.get('is') or ())
+        for ref in refs:
+            (trait, params) = _reference(ref)
+            try:
+                definition = self.traits[trait]
+            except KeyError:
+                raise RamlError("Undefined trait `{}`".format(trait))
+            params.update(
+                methodName=name, resourcePath=uri,
+                resourcePathName=_resource_path_name(uri))
+            node = _merge(node, _substitute(deepcopy(definition or {}),
+                                            params))
+        method = {'method': name}
+        for (key, value) in node.items():
+            if key in ('queryParameters', 'headers'):
+                method[key] = self.parameters(value)
+            elif key == 'body':
+                method[key] = self.body(value)
+            elif key == 'responses':
+                method[key] = dict(
+                    (code, self.response(response))
+                    for (code, response) in (value or {}).items())
+            else:
+                method[key] = value
+        return method
+
+    def parameters(self, params, required=False):
+        named = {}
+        for (name, definition) in (params or {}).items():
+            definition = dict(definition or {})
+            definition.setdefault('displayName', name)
+            definition.setdefault('type', 'string')
+            if required:
+                definition.setdefault('required', True)
+            named[name] = definition
+        return named
+
+    def response(self, response):
+        if not response:
+            return response
+        response = dict(response)
+        if 'body' in response:
+            response['body'] = self.body(response['body'])
+        if 'headers' in response:
+            response['headers'] = self.parameters(response['headers'])
+        return response
+
+    def body(self, body):
+        if not body:
+            return body
+        if self.media_type and not any('/' in key for key in body):
+            # the default media type may be omitted
+            body = {self.media_type: body}
+        expanded = {}
+        for (media_type, definition) in body.items():
+            definition = dict(definition or {})
+            if 'schema' in definition:
+                definition['schema'] = self.schema(definition['schema'])
+            if 'formParameters' in definition:
+                definition['formParameters'] = self.parameters(
+                    definition['formParameters'])
+            expanded[media_type] = definition
+        return expanded
+
+    def schema(self, schema):
+        if isinstance(schema, str) and schema.strip() in self.schemas:
+            schema = self.schemas[schema.strip()]
+        if schema is not None and not isinstance(schema, str):
+            # an included YAML schema
+            schema = json.dumps(schema)
+        return schema
@@ -0,0 +1,165 @@
+"""Reloads the spec and whitelist of a running service when they change.
+
+A background thread polls their URLs with conditional requests
+(`If-None-Match`/`If-Modified-Since`), compiles new versions and swaps
+them in with `validator_service.set_proxy_settings`.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import os
+import threading
+try:
+    from urllib.error import HTTPError
+    from urllib.request import Request, urlopen
+    from urllib.parse import urlparse
+    from urllib.request import pathname2url
+except ImportError:
+    from urllib2 import HTTPError, Request, urlopen
+    from urlparse import urlparse
+    from urllib import pathname2url
+
+from . import validator_service as val
+
+import logging
+log = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 60  # in seconds
+TIMEOUT = 30  # in seconds
+
+
+class Source(object):
+    """A document fetched with conditional requests.
+
+    :param str url: its URL, or a local path
+
+    """
+
+    def __init__(self, url):
+        self.url = url
+        if not urlparse(url).scheme:
+            url = "file:" + pathname2url(os.path.abspath(url))
+        self._url = url
+        self.etag = None
+        self.last_modified = None
+        self.content = None
+
+    def fetch(self):
+        """
+        Fetches the document unless it is known to be unchanged.
+
+        :rtype str: its new content, or None if unchanged
+
+        """
+        request = Request(self._url)
+        if self.etag:
+            request.add_header("If-None-Match", self.etag)
+        if self.last_modified:
+            request.add_header("If-Modified-Since", self.last_modified)
+        try:
+            response = urlopen(request, timeout=TIMEOUT)
+        except HTTPError as e:
+            if e.code == 304:
+                return None
+            raise
+        try:
+            content = response.read().decode("utf8")
+            self.etag = response.headers.get("ETag")
+            self.last_modified = response.headers.get("Last-Modified")
+        finally:
+            response.close()
+        # not every origin (e.g. `file:` URLs) answers conditional requests
+        if content == self.content:
+            return None
+        self.content = content
+        return content
+
+    def forget(self):
+        """ Makes the next `fetch` return the document in any case """
+        self.etag = self.last_modified = self.content = None
+
+
+class Reloader(threading.Thread):
+    """Polls the spec and whitelist, swapping in new versions.
+
+    :param str spec_url: URL or path of the spec
+
+    :param str whitelist_url: optional URL or path of the whitelist
+
+    :param float interval: seconds between polls
+
+    :param callable load: called with `spec_url` once it changed, returns
+        the spec as taken by `set_proxy_settings`. By default the fetched
+        content is used as is, i.e. the spec must be JSON.
+
+    :param str artifact_dir: see `set_proxy_settings`
+
+    :param str key: the spec reloaded when several are served, see
+        `set_proxy_settings`
+
+    Only the root document of the spec is polled, a change limited to the
+    files it includes is picked up with the root's next change.
+    """
+
+    def __init__(self, spec_url, whitelist_url=None,
+                 interval=DEFAULT_INTERVAL, load=None, artifact_dir=None,
+                 key=val.DEFAULT_SPEC):
+        super(Reloader, self).__init__(name="pedantic-reloader")
+        self.daemon = True
+        self.spec = Source(spec_url)
+        self.whitelist = Source(whitelist_url) if whitelist_url else None
+        self.interval = interval
+        self.load = load
+        self.artifact_dir = artifact_dir
+        self.key = key
+        self.reloads = 0
+        self._stopped = threading.Event()
+
+    def prime(self):
+        """ Records the versions currently loaded, without swapping them """
+        self.spec.fetch()
+        if self.whitelist:
+            self.whitelist.fetch()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.reload()
+            except Exception:
+                # keep serving the current version, try again next time
+                log.exception("Failed to reload the spec or whitelist")
+
+    def stop(self):
+        self._stopped.set()
+
+    def reload(self):
+        """
+        Checks for new versions once.
+
+        :rtype bool: whether a new version was swapped in
+
+        """
+        if val._find_spec(val.settings, self.key) is None:
+            # e.g. it failed to load when the service started, a new
+            #   whitelist alone has no spec to go with
+            log.warning("No spec loaded as `%s`, fetching it again", self.key)
+            self.spec.forget()
+        try:
+            spec = self.spec.fetch()
+            whitelist = self.whitelist.fetch() if self.whitelist else None
+            if spec is None and whitelist is None:
+                return False
+            if spec is not None and self.load is not None:
+                spec = self.load(self.spec.url)
+            val.set_proxy_settings(
+                spec, whitelist, self.artifact_dir, key=self.key)
+        except Exception:
+            # so the next poll tries the new version again
+            self.spec.forget()
+            if self.whitelist:
+                self.whitelist.forget()
+            raise
+        self.reloads += 1
+        log.info("Reloaded %s of `%s`", "the spec" if spec is not None
+                 else "the whitelist", self.key)
+        return True
@@ -2,8 +2,10 @@
 
 from __future__ import absolute_import, unicode_literals
 import json
+import threading
+from collections import namedtuple
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from jsonschema.exceptions import ValidationError
 
 from .check_against_schema import (
@@ -12,23 +14,327 @@ from .check_against_schema import (
     is_whitelisted,
     get_spec,
     parse_data,
+    parse_query_data,
+    validators,
+    RouteIndex,
+    SchemaInterner,
+    Whitelist,
     JSONSchemaValidationError,
     UndefinedSchemaError,
+    DEFAULT_ECHO_SIZE,
 )
+from .artifacts import artifact_key, load_artifact, save_artifact
+from .metrics import CONTENT_TYPE, Counter, Gauge, Histogram, expose, timer
+from .profiler import DEFAULT_LIMIT, MAX_FIXTURES, SORT_KEYS, Profiler
+from .verdict_cache import VerdictCache
+
+
+class ErrorText(object):
+    """The ``error`` text of a fixture that failed validation.
+
+    Rendered the first time it is needed, usually once the verdict is
+    serialized, and kept from then on. It pickles as a plain string.
+
+    :param list failures: the `JSONSchemaValidationError`s raised
+
+    :param int echo_size: see `set_echo_size`
+
+    """
+    __slots__ = ('_failures', '_echo_size', '_text')
+
+    def __init__(self, failures, echo_size):
+        self._failures = failures
+        self._echo_size = echo_size
+        self._text = None
+
+    def __str__(self):
+        failures = self._failures
+        if failures is not None:
+            self._text = "\n\n".join(
+                e.render(self._echo_size) for e in failures)
+            # the fixture isn't needed anymore
+            self._failures = None
+        return self._text
+
+    def __reduce__(self):
+        return str, (str(self),)
+
+
+def json_default(value):
+    """ The `default` of `json.dumps` for verdicts, see `ErrorText` """
+    if isinstance(value, ErrorText):
+        return str(value)
+    raise TypeError("{!r} is not JSON serializable".format(value))
+
+
+def rendered(value):
+    """ The verdict, or list of verdicts, with its `ErrorText` rendered """
+    if isinstance(value, list):
+        return [rendered(item) for item in value]
+    if isinstance(value.get("error"), ErrorText):
+        value = dict(value, error=str(value["error"]))
+    return value
+
 
 app = Flask(__name__)
 
-schema = None
-whitelist = None
+DEFAULT_SPEC = "default"
+
+# A spec and whitelist served, see `set_proxy_settings`
+LoadedSpec = namedtuple('LoadedSpec', 'key prefix route_index whitelist')
+# Everything loaded, replaced as a whole so a validation started against one
+# version finishes against it
+Settings = namedtuple('Settings', 'specs version')
+
+settings = Settings((), 0)
+settings_lock = threading.Lock()
+default_max_errors = None
+echo_size = DEFAULT_ECHO_SIZE
+server_timing = False
+verdicts = VerdictCache()
+profiler = Profiler()
+# phase durations of the request handled by the thread, see `collect_timings`
+_timings = threading.local()
+
+outcomes = Counter(
+    "pedantic_fixtures_total", "Fixtures validated, by outcome.", "outcome",
+    ("ok", "whitelisted", "undefined", "invalid", "malformed", "error"))
+phases = Histogram(
+    "pedantic_phase_seconds", "Time spent validating fixtures, by phase.",
+    "phase", ("parse", "route", "request", "response", "render", "serialize"))
+spec_resources = Gauge(
+    "pedantic_spec_resources", "Resources of each loaded spec.", "spec",
+    lambda: [(spec.key, spec.route_index.size) for spec in settings.specs])
+spec_body_schemas = Gauge(
+    "pedantic_spec_body_schemas", "Distinct body schemas of each loaded spec.",
+    "spec", lambda: [(spec.key, len(spec.route_index.body_schemas))
+                     for spec in settings.specs])
+spec_whitelist_entries = Gauge(
+    "pedantic_spec_whitelist_entries", "Whitelist entries of each loaded spec.",
+    "spec", lambda: [(spec.key, len(spec.whitelist or ()))
+                     for spec in settings.specs])
+METRICS = (outcomes, phases, spec_resources, spec_body_schemas,
+           spec_whitelist_entries)
+
+
+def observe(phase, seconds):
+    """ Records the duration of a validation phase """
+    phases.observe(phase, seconds)
+    timings = getattr(_timings, "current", None)
+    if timings is not None:
+        timings[phase] = timings.get(phase, 0.0) + seconds
+
+
+def collect_timings(function, *args, **kwargs):
+    """
+    Calls the function, collecting the durations of the phases it observes.
+
+    :rtype tuple: its result and the durations by phase, see
+        `server_timing_header`
+
+    """
+    _timings.current = timings = {}
+    try:
+        return function(*args, **kwargs), timings
+    finally:
+        _timings.current = None
+
+
+def server_timing_header(timings):
+    """ Formats phase durations in seconds as a `Server-Timing` header """
+    return ", ".join(
+        "{};dur={:.3f}".format(phase, seconds * 1000)
+        for (phase, seconds) in sorted(timings.items()))
+
+
+def set_proxy_settings(schema_arg, whitelist_arg, artifact_dir=None,
+                       key=DEFAULT_SPEC, prefix=None):
+    """
+    Loads a spec and its whitelist to validate fixtures against.
+
+    :param schema_arg: the spec as JSON, as output by the RAML parser, or
+        already parsed
+    :type schema_arg: str or dict
+
+    :param str whitelist_arg: the whitelist as JSON, or None
+
+    :param str artifact_dir: optional directory caching the compiled spec,
+        see `artifacts`
+
+    :param str key: names the spec when several are served, fixtures choose
+        theirs with their ``spec`` field or the ``spec`` query argument
+
+    :param str prefix: otherwise fixtures are validated against the spec
+        with the longest prefix of their path, by default ""
+
+    The spec or whitelist may be None to keep the one currently loaded
+    under the key, `UndefinedSchemaError` is raised if no spec is. The new settings are compiled before being swapped in,
+    validations in progress finish against the previous ones.
+
+    """
+    global settings
+
+    with settings_lock:
+        current = settings
+        previous = _find_spec(current, key)
+        if schema_arg is None and previous is None:
+            raise UndefinedSchemaError("Unknown spec `{}`.".format(key))
+        if schema_arg is None:
+            route_index = previous.route_index
+        else:
+            route_index = load_spec(schema_arg, artifact_dir)
+            # share identical schemas with the other specs
+            interner = SchemaInterner()
+            for other in current.specs:
+                if other.key != key:
+                    for other_schema in other.route_index.schemas():
+                        interner.intern(other_schema)
+            route_index.share_schemas(interner)
+            # build the body validators up front rather than on first use
+            for body in route_index.body_schemas:
+                validators.get(body.schema, body.key)
+        whitelist = previous.whitelist if previous else None
+        if whitelist_arg:
+            whitelist = Whitelist(json.loads(whitelist_arg))
+        if prefix is None:
+            prefix = previous.prefix if previous else ""
+
+        loaded = LoadedSpec(key, prefix, route_index, whitelist)
+        specs = tuple(
+            loaded if spec.key == key else spec for spec in current.specs)
+        if previous is None:
+            specs += (loaded,)
+        settings = Settings(specs, current.version + 1)
+    # verdicts of the previous spec no longer apply
+    verdicts.clear()
+
+
+def remove_spec(key):
+    """ Stops serving the spec loaded under the key """
+    global settings
+
+    with settings_lock:
+        current = settings
+        specs = tuple(spec for spec in current.specs if spec.key != key)
+        settings = Settings(specs, current.version + 1)
+    verdicts.clear()
+
+
+def _find_spec(current, key):
+    for spec in current.specs:
+        if spec.key == key:
+            return spec
+    return None
+
+
+def route_fixture(current, path, key=None):
+    """
+    Chooses the spec a fixture is validated against.
+
+    :param Settings current: the loaded settings
+
+    :param str path: the fixture's path
+
+    :param str key: the spec the fixture asks for, if any
+
+    :rtype LoadedSpec:
+
+    :raises: :class:`.UndefinedSchemaError`
+
+    """
+    if key is not None:
+        spec = _find_spec(current, key)
+        if spec is None:
+            raise UndefinedSchemaError("Unknown spec `{}`.".format(key))
+        return spec
+    best = None
+    for spec in current.specs:
+        if path.startswith(spec.prefix) and (
+                best is None or len(spec.prefix) > len(best.prefix)):
+            best = spec
+    if best is None:
+        raise UndefinedSchemaError(
+            "No spec is served for the path '{}'.".format(path))
+    return best
+
+
+def load_spec(schema_arg, artifact_dir=None):
+    """
+    Parses the spec and builds its route index, or loads it from the
+    compiled artifact of an identical spec.
+
+    The index doesn't keep the spec itself, it is released once compiled.
+
+    :param schema_arg: the spec as JSON, or already parsed (see `raml.load`)
+    :type schema_arg: str or dict
+
+    :rtype RouteIndex:
+
+    """
+    if artifact_dir is None:
+        return RouteIndex(_parse_spec(schema_arg), keep_resources=False)
+
+    # keyed by the text as received, so it isn't even parsed when unchanged
+    if isinstance(schema_arg, dict):
+        key = artifact_key(json.dumps(schema_arg, sort_keys=True))
+    else:
+        key = artifact_key(schema_arg)
+    compiled = load_artifact(artifact_dir, key)
+    if compiled is None:
+        compiled = RouteIndex(_parse_spec(schema_arg), keep_resources=False)
+        save_artifact(artifact_dir, key, compiled)
+    return compiled
+
+
+def _parse_spec(schema_arg):
+    if isinstance(schema_arg, dict):
+        return schema_arg
+    return json.loads(schema_arg)
+
+
+def set_default_max_errors(max_errors):
+    """ Caps the errors collected per fixture unless a request asks otherwise """
+    global default_max_errors
+
+    default_max_errors = max_errors
 
 
-def set_proxy_settings(schema_arg, whitelist_arg):
-    global schema
-    global whitelist
+def set_echo_size(size):
+    """ Caps how much of a failing fixture is echoed back, 0 to disable """
+    global echo_size
 
-    schema = json.loads(schema_arg)
-    if whitelist_arg:
-        whitelist = json.loads(whitelist_arg)
+    echo_size = size
+
+
+def set_server_timing(enabled):
+    """ Adds the duration of each phase to responses, see `observe` """
+    global server_timing
+
+    server_timing = enabled
+
+
+def max_errors_option(args):
+    """
+    Reads the `first_error` or `max_errors` option of a validation request.
+
+    :param args: the query string arguments of the request
+
+    :rtype int: the errors to collect per fixture, None for the default
+
+    :raises: :class:`ValueError` for an invalid `max_errors`
+
+    """
+    if args.get("first_error", "").lower() in ("1", "true"):
+        return 1
+    if args.get("max_errors") is None:
+        return None
+    max_errors = int(args.get("max_errors"))
+    if max_errors < 1:
+        raise ValueError(max_errors)
+    return max_errors
+
+
+MAX_ERRORS_ERROR = "Pedantic error - `max_errors` must be a positive integer."
 
 
 @app.route("/", methods=["POST"])
@@ -95,6 +401,42 @@ def validator():
               "error": "The requested resource '/some/path/' was not found in spec."
             }
 
+        **Invalid fixture response**:
+
+        ``error`` describes the violations found, followed by up to
+        ``--echo`` characters of the fixture. ``errors`` lists them one by
+        one, with the JSON pointer of the offending value within the query
+        parameters, request or response body.
+
+        .. sourcecode:: http
+
+            HTTP/1.0 400 BAD REQUEST
+            Content-Type: application/json
+
+            {
+              "error": "\nFound during request validation...\n\n - .x: 1 is not of type 'string'\n...",
+              "errors": [
+                {
+                  "location": "request",
+                  "pointer": "/x",
+                  "keyword": "type",
+                  "message": "1 is not of type 'string'",
+                  "schema_path": ["properties", "x", "type"]
+                }
+              ]
+            }
+
+        **Options**:
+
+        Add ``?first_error=1`` to only report the first violation found, or
+        ``?max_errors=N`` to stop after ``N`` violations. Either skips the
+        details of ``anyOf``/``oneOf`` sub errors. Both also apply to
+        ``/batch`` and ``/stream``.
+
+        When several specs are served, a fixture is validated against the
+        one named by its ``spec`` field, or else by ``?spec=KEY``, or else
+        the one whose path prefix is the longest match of ``path_info``.
+
         **Whitelisted response**:
 
         .. sourcecode:: http
@@ -118,55 +460,489 @@ def validator():
         error = {"error": msg}
         return jsonify(error), 400
 
-    the_json = request.get_json()
     try:
-        data = parse_data(the_json)
+        max_errors = max_errors_option(request.args)
+    except ValueError:
+        return jsonify({"error": MAX_ERRORS_ERROR}), 400
+
+    value, status = check_fixture(
+        request.get_json(), max_errors=max_errors,
+        spec=request.args.get("spec"))
+    return serialize(value), status
+
+
+@app.route("/batch", methods=["POST"])
+def batch_validator():
+    """
+    .. http:POST:: /batch
+
+        Receives a JSON array of fixtures, each in the format accepted by
+        ``POST /``, and validates them in order. Spec lookups are shared by
+        all fixtures of the batch.
+
+        **Example**:
+
+        .. code-block:: bash
+
+            curl -X POST -i http://localhost:5000/batch --data '[
+                {"method": "POST", "path_info": "/api/v5/test/", "request": {"x": "data"}},
+                {"method": "POST", "path_info": "/some/path/", "request": {}}
+            ]' -H "Content-Type: application/json"
+
+        **Response**:
+
+        One result per fixture, in the order of the request. Each result is
+        the body ``POST /`` would return plus its ``status``.
+
+        .. sourcecode:: http
+
+            HTTP/1.0 200 OK
+            Content-Type: application/json
+
+            [
+              {"message": "All is well with the world (and your fixture).", "status": 200},
+              {"error": "The requested resource '/some/path/' was not found in spec.", "status": 400}
+            ]
+    """
+
+    if "application/json" not in request.headers.get("Content-Type"):
+        msg = "Transport header `Content-Type` must be `application/json`."
+        error = {"error": msg}
+        return jsonify(error), 400
+
+    try:
+        max_errors = max_errors_option(request.args)
+    except ValueError:
+        return jsonify({"error": MAX_ERRORS_ERROR}), 400
+
+    fixtures = request.get_json()
+    if not isinstance(fixtures, list):
+        error = {"error": "Pedantic error - batch payload must be a JSON array."}
+        return jsonify(error), 400
+
+    results = check_batch(fixtures, max_errors, request.args.get("spec"))
+    return serialize(results), 200
+
+
+@app.route("/stream", methods=["POST"])
+def stream_validator():
+    """
+    .. http:POST:: /stream
+
+        Receives newline delimited JSON fixtures, each in the format accepted
+        by ``POST /``, and streams back one result line per fixture as soon
+        as it is validated. Neither side has to hold the whole fixture set
+        in memory.
+
+        **Example**:
+
+        .. code-block:: bash
+
+            cat fixtures.ndjson | curl -X POST -N http://localhost:5000/stream \\
+                --data-binary @- -H "Content-Type: application/x-ndjson" \\
+                -H "Transfer-Encoding: chunked"
+
+        **Response**:
+
+        Each line is the body ``POST /`` would return plus its ``status``.
+
+        .. sourcecode:: http
+
+            HTTP/1.0 200 OK
+            Content-Type: application/x-ndjson
+
+            {"message": "All is well with the world (and your fixture).", "status": 200}
+            {"error": "The requested resource '/some/path/' was not found in spec.", "status": 400}
+    """
+
+    if "application/x-ndjson" not in request.headers.get("Content-Type"):
+        msg = "Transport header `Content-Type` must be `application/x-ndjson`."
+        error = {"error": msg}
+        return jsonify(error), 400
+
+    try:
+        max_errors = max_errors_option(request.args)
+    except ValueError:
+        return jsonify({"error": MAX_ERRORS_ERROR}), 400
+
+    spec = request.args.get("spec")
+
+    def results():
+        for line in iter(request.stream.readline, b""):
+            if line.strip():
+                yield check_line(line, max_errors, spec)
+
+    return Response(
+        stream_with_context(results()), mimetype="application/x-ndjson"
+    )
+
+
+def check_batch(fixtures, max_errors=None, spec=None):
+    """
+    Validates a list of fixtures, sharing spec lookups between them.
+
+    :param list fixtures: fixtures in the ``pedantic_api.json`` format
+
+    :param int max_errors: see `check_fixture`
+
+    :param str spec: see `check_fixture`
+
+    :rtype list: the response body of each fixture, with its ``status``
+
+    """
+    specs = {}
+    results = []
+    current = settings
+    for the_json in fixtures:
+        value, status = check_fixture(
+            the_json, specs, max_errors, current, spec)
+        value["status"] = status
+        results.append(value)
+    return results
+
+
+def check_line(line, max_errors=None, spec=None):
+    """
+    Validates one line of newline delimited JSON.
+
+    :param bytes line: a fixture in the ``pedantic_api.json`` format
+
+    :param int max_errors: see `check_fixture`
+
+    :param str spec: see `check_fixture`
+
+    :rtype str: the result line, the response body with its ``status``
+
+    """
+    try:
+        the_json = json.loads(line.decode("utf8"))
+    except ValueError as e:
+        value = {"error": "Pedantic error - invalid JSON: {}".format(e)}
+        status = 400
+    else:
+        # the lines after this one must still get their verdicts
+        try:
+            value, status = check_fixture(
+                the_json, max_errors=max_errors, spec=spec)
+        except Exception as e:
+            value, status = _unexpected_error(e)
+    value["status"] = status
+    started = timer()
+    line = json.dumps(value, default=json_default) + "\n"
+    observe("serialize", timer() - started)
+    return line
+
+
+def serialize(value):
+    """ `jsonify`, timed as the ``serialize`` phase """
+    started = timer()
+    response = jsonify(rendered(value))
+    observe("serialize", timer() - started)
+    return response
+
+
+def check_fixture(the_json, specs=None, max_errors=None, current=None,
+                  spec=None):
+    """
+    Validates a single fixture in the ``pedantic_api.json`` format.
+
+    :param dict the_json: the fixture
+
+    :param dict specs: optional memo of the specs already looked up, keyed by
+        spec, path and method, to share between several fixtures
+
+    :param int max_errors: stop validating after this many errors, defaults
+        to the server wide setting (see `set_default_max_errors`)
+
+    :param Settings current: the settings to validate against, defaults to
+        the ones loaded when called
+
+    :param str spec: key of the spec to validate against unless the fixture
+        names one, see `route_fixture`
+
+    :rtype tuple: the response body and its HTTP status code
+
+    """
+    if max_errors is None:
+        max_errors = default_max_errors
+    if current is None:
+        current = settings
+
+    if not verdicts.max_size:
+        value, status = _run_check(the_json, specs, max_errors, current, spec)
+        outcomes.inc(_outcome(value, status))
+        return value, status
+    # hash before `parse_data` fills in the missing fields
+    key = verdicts.key(
+        the_json, current.version, max_errors, echo_size, spec)
+    cached = verdicts.get(key)
+    if cached is not None:
+        outcomes.inc(_outcome(*cached))
+        return cached
+    value, status = _run_check(the_json, specs, max_errors, current, spec)
+    if status != 500:
+        verdicts.set(key, value, status)
+    outcomes.inc(_outcome(value, status))
+    return value, status
+
+
+def _run_check(the_json, specs, max_errors, current, spec_key):
+    # an unexpected error fails this fixture only, not the whole batch
+    try:
+        return profiler.run(
+            _check_fixture, the_json, specs, max_errors, current, spec_key)
+    except Exception as e:
+        return _unexpected_error(e)
+
+
+def _unexpected_error(e):
+    """ The verdict of a fixture whose validation raised unexpectedly """
+    app.logger.exception("Failed to validate a fixture")
+    return {"error": "Pedantic error - {}".format(e)}, 500
+
+
+def _check_fixture(the_json, specs, max_errors, current, spec_key):
+    started = timer()
+    try:
+        # the query values are parsed once the types of the method's query
+        #   parameters are known
+        data = parse_data(the_json, parse_query=False)
     except ValidationError as e:
         err_msg = "Pedantic error{}".format(str(e))
         msg = {"error": err_msg, "data": the_json}
-        return jsonify(msg), 400
+        return msg, 400
+    finally:
+        parsed = timer()
+        observe("parse", parsed - started)
+
+    try:
+        loaded = route_fixture(
+            current, data.path, the_json.get("spec") or spec_key)
+    except UndefinedSchemaError as e:
+        return {"error": str(e)}, 400
 
     # Get the specific schema under test
     try:
-        spec = get_spec(data, schema)
+        spec = _get_spec(data, specs, loaded)
+        data = parse_query_data(data, spec)
     except UndefinedSchemaError as e:
-        if whitelist:
-            if is_whitelisted(data, whitelist):
+        if loaded.whitelist:
+            if is_whitelisted(data, loaded.whitelist):
                 msg = (
                     "Requested endpoint `{}` is whitelisted against "
                     "validation.".format(data.path)
                 )
                 value = {"warning": msg}
-                return jsonify(value), 200
+                return value, 200
         msg = {"error": str(e)}
-        return jsonify(msg), 400
+        return msg, 400
     except Exception as e:
         msg = {"error": str(e)}
-        return jsonify(msg), 500
+        return msg, 500
+    finally:
+        routed = timer()
+        observe("route", routed - parsed)
 
     # Validate the request and/or response
-    errors = ""
+    failures = []
     if data.request:
         try:
-            validate_request_against_schema(data, spec)
+            validate_request_against_schema(data, spec, max_errors)
         except JSONSchemaValidationError as e:
-            errors = "{}\n\n".format(str(e))
-
-    if data.response:
+            failures.append(e)
+            if max_errors is not None:
+                max_errors -= e.error_count
+        finally:
+            validated = timer()
+            observe("request", validated - routed)
+            routed = validated
+
+    if data.response and (max_errors is None or max_errors > 0):
         try:
-            validate_response_against_schema(data, spec)
+            validate_response_against_schema(data, spec, max_errors)
         except JSONSchemaValidationError as e:
-            errors += str(e)
+            failures.append(e)
+        finally:
+            validated = timer()
+            observe("response", validated - routed)
+            routed = validated
 
     # Return the results
-    if not errors:
+    if not failures:
         msg = {"message": "All is well with the world (and your fixture)."}
-        return jsonify(msg), 200
+        return msg, 200
     else:
-        msg = {"error": errors}
-        return jsonify(msg), 400
+        # the text is rendered when the verdict is serialized, if ever
+        msg = {
+            "error": ErrorText(failures, echo_size),
+            "errors": [
+                error.as_dict() for e in failures for error in e.errors],
+        }
+        observe("render", timer() - routed)
+        return msg, 400
+
+
+def _outcome(value, status):
+    if status == 500:
+        return "error"
+    if "warning" in value:
+        return "whitelisted"
+    if status == 200:
+        return "ok"
+    if "errors" in value:
+        return "invalid"
+    if "data" in value:
+        # the fixture itself doesn't follow ``pedantic_api.json``
+        return "malformed"
+    return "undefined"
+
+
+def _get_spec(data, specs, loaded):
+    if specs is None:
+        return get_spec(data, loaded.route_index)
+    key = (loaded.key, data.path, data.method)
+    if key not in specs:
+        try:
+            specs[key] = get_spec(data, loaded.route_index)
+        except UndefinedSchemaError as e:
+            specs[key] = e
+    if isinstance(specs[key], UndefinedSchemaError):
+        raise specs[key]
+    return specs[key]
+
+
+@app.before_request
+def start_timings():
+    _timings.current = {} if server_timing else None
+
+
+@app.after_request
+def add_server_timing(response):
+    timings = getattr(_timings, "current", None)
+    if timings:
+        response.headers["Server-Timing"] = server_timing_header(timings)
+    # a streamed body is validated after the response started
+    _timings.current = None
+    return response
 
 
 @app.route("/", methods=["GET"])
 def healthcheck():
     return "OK", 200
+
+
+@app.route("/stats", methods=["GET"])
+def stats():
+    """
+    .. http:GET:: /stats
+
+        Reports internal cache counters, e.g. how often a compiled schema
+        validator was reused (``hits``) or had to be built (``misses``), and
+        how often a fixture's verdict was answered from the verdict cache.
+    """
+    value = {"validators": validators.stats(), "verdicts": verdicts.stats()}
+    return jsonify(value), 200
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    .. http:GET:: /metrics
+
+        Reports metrics in the Prometheus text format:
+
+        - ``pedantic_fixtures_total``: fixtures validated by ``outcome``,
+          one of ``ok``, ``whitelisted``, ``undefined`` (no matching
+          resource or method), ``invalid``, ``malformed`` (not a
+          ``pedantic_api.json`` fixture) and ``error``
+        - ``pedantic_phase_seconds``: histograms of the time spent per
+          ``phase``: ``parse`` (the fixture envelope), ``route`` (the spec
+          lookup), ``request`` and ``response`` validation, ``render``
+          (error messages) and ``serialize`` (the response body)
+        - ``pedantic_spec_resources``, ``pedantic_spec_body_schemas`` and
+          ``pedantic_spec_whitelist_entries``: the size of each loaded
+          ``spec``
+
+        Fixtures answered from the verdict cache are counted but not timed.
+        With ``--workers``, each worker reports its own values.
+    """
+    return Response(expose(METRICS), content_type=CONTENT_TYPE)
+
+
+PROFILE_ERROR = (
+    "Pedantic error - `fixtures` must be an integer from 1 to {}, `sort` one "
+    "of {} and `limit` a positive integer.".format(
+        MAX_FIXTURES, ", ".join(SORT_KEYS)))
+
+
+@app.route("/profile", methods=["POST"])
+def start_profile():
+    """
+    .. http:POST:: /profile
+
+        Profiles the next ``?fixtures=N`` fixtures validated (10 by default)
+        with cProfile, discarding the stats of the previous run. Fixtures
+        are profiled one at a time, those validated meanwhile by other
+        threads are not. Fixtures answered from the verdict cache are not
+        profiled either.
+
+        .. sourcecode:: http
+
+            HTTP/1.0 202 ACCEPTED
+            Content-Type: application/json
+
+            {"remaining": 10}
+    """
+    value, status = start_profiling(request.args)
+    return jsonify(value), status
+
+
+@app.route("/profile", methods=["GET"])
+def profile():
+    """
+    .. http:GET:: /profile
+
+        Reports the stats aggregated over the fixtures profiled so far,
+        sorted by ``?sort=`` (``cumulative`` by default, or ``tottime``,
+        ``ncalls``, ``pcalls``) and limited to ``?limit=N`` functions (50 by
+        default).
+
+        .. sourcecode:: http
+
+            HTTP/1.0 200 OK
+            Content-Type: application/json
+
+            {
+              "profiled": 10,
+              "remaining": 0,
+              "stats": "   12034 function calls (11720 primitive calls) in 0.021 seconds\n..."
+            }
+    """
+    value, status = profile_report(request.args)
+    return jsonify(value), status
+
+
+def start_profiling(args):
+    """ Handles `POST /profile`, returns the response body and status """
+    try:
+        profiler.start(int(args.get("fixtures", 10)))
+    except ValueError:
+        return {"error": PROFILE_ERROR}, 400
+    return {"remaining": profiler.remaining}, 202
+
+
+def profile_report(args):
+    """ Handles `GET /profile`, returns the response body and status """
+    try:
+        limit = int(args.get("limit", DEFAULT_LIMIT))
+        if limit < 1:
+            raise ValueError(limit)
+        stats = profiler.report(args.get("sort", "cumulative"), limit)
+    except ValueError:
+        return {"error": PROFILE_ERROR}, 400
+    value = {
+        "profiled": profiler.profiled,
+        "remaining": profiler.remaining,
+        "stats": stats,
+    }
+    return value, 200
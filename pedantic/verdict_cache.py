@@ -0,0 +1,91 @@
+"""Memory bounded LRU cache of fixture validation results."""
+
+from __future__ import absolute_import, unicode_literals
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+DEFAULT_SIZE = 4096
+
+
+class VerdictCache(object):
+    """Remembers the response of recently validated fixtures.
+
+    Entries are keyed by a hash of the fixture's canonical JSON together
+    with the version of the spec it was validated against, so byte
+    identical fixtures are answered without validating them again.
+
+    :param int max_size: the number of verdicts kept, 0 disables the cache
+
+    """
+
+    def __init__(self, max_size=DEFAULT_SIZE):
+        self.max_size = max_size
+        self._verdicts = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, the_json, *context):
+        """
+        Returns the cache key of a fixture.
+
+        :param dict the_json: the fixture as received
+
+        :param context: anything else the verdict depends on, eg the spec
+            version and validation options
+
+        """
+        canonical = json.dumps(
+            [context, the_json], sort_keys=True, separators=(",", ":"))
+        return hashlib.sha1(canonical.encode("utf8")).hexdigest()
+
+    def get(self, key):
+        """ Returns a copy of the cached (body, status) pair, or None """
+        with self._lock:
+            try:
+                value, status = self._verdicts[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._verdicts.move_to_end(key)
+            self.hits += 1
+        return dict(value), status
+
+    def set(self, key, value, status):
+        if not self.max_size:
+            return
+        with self._lock:
+            self._verdicts[key] = (dict(value), status)
+            self._verdicts.move_to_end(key)
+            while len(self._verdicts) > self.max_size:
+                self._verdicts.popitem(last=False)
+                self.evictions += 1
+
+    def resize(self, max_size):
+        with self._lock:
+            self.max_size = max_size
+            while len(self._verdicts) > max_size:
+                self._verdicts.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._verdicts.clear()
+
+    def __len__(self):
+        return len(self._verdicts)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._verdicts),
+            "max_size": self.max_size,
+            "hit_rate": float(self.hits) / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,144 @@
+from __future__ import absolute_import, unicode_literals
+import asyncio
+import unittest
+import json
+from copy import deepcopy
+
+from pedantic import asgi_service
+from pedantic import validator_service as val
+
+from .test_validator import SCHEMAS, WHITELIST
+
+
+def call(method, path, body=b"", content_type="application/json", chunks=None,
+         query_string=b"", headers=None):
+    """Runs one request through the ASGI app, returns (status, body)."""
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": query_string,
+        "headers": [(b"content-type", content_type.encode("latin-1"))],
+    }
+    if chunks is None:
+        chunks = [body]
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": idx < len(chunks) - 1}
+        for idx, chunk in enumerate(chunks)
+    ]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    # no asyncio.run before Python 3.7
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(asgi_service.app(scope, receive, send))
+    status = sent[0]["status"]
+    if headers is not None:
+        headers.update(sent[0]["headers"])
+    body = b"".join(m.get("body", b"") for m in sent[1:])
+    return status, body.decode("utf8")
+
+
+class TestAsgiPedantic(unittest.TestCase):
+    def setUp(self):
+        val.set_proxy_settings(deepcopy(SCHEMAS), deepcopy(WHITELIST))
+        asgi_service.configure(workers=2)
+
+    def test_healthcheck(self):
+        self.assertEqual(call("GET", "/"), (200, "OK"))
+
+    def test_validator_returns_error_missing_content_type(self):
+        status, body = call("POST", "/", b"no content type", "text/html")
+        self.assertIn("Content-Type", json.loads(body)["error"])
+        self.assertEqual(status, 400)
+
+    def test_validator_matches_flask_service(self):
+        fixtures = [
+            {},
+            {"method": "POST", "path_info": "/api/v5/test/", "request": {"x": "data"}},
+            {"method": "POST", "path_info": "/api/v5/test/", "request": {"x": 1}},
+            {"method": "POST", "path_info": "/whitelisted/path",
+             "status_code": 200, "response": {"some": "thing"}},
+        ]
+        client = val.app.test_client()
+        for fixture in fixtures:
+            data = json.dumps(fixture)
+            expected = client.post("/", data=data, content_type="application/json")
+            status, body = call("POST", "/", data.encode("utf8"))
+            self.assertEqual(status, expected.status_code)
+            self.assertEqual(json.loads(body), expected.get_json())
+
+    def test_unknown_routes_match_flask_service(self):
+        client = val.app.test_client()
+        for (method, path) in [("GET", "/nope"), ("PUT", "/"), ("POST", "/stats"),
+                               ("GET", "/batch"), ("DELETE", "/profile")]:
+            expected = client.open(path, method=method)
+            headers = {}
+            status, _ = call(method, path, headers=headers)
+            self.assertEqual(status, expected.status_code, (method, path))
+            if status == 405:
+                self.assertEqual(
+                    set(headers[b"allow"].decode("latin-1").split(", ")),
+                    set(expected.headers["Allow"].split(", ")) - {"HEAD", "OPTIONS"},
+                )
+
+    def test_validator_invalid_json(self):
+        status, body = call("POST", "/", b"{nope")
+        self.assertIn("invalid JSON", json.loads(body)["error"])
+        self.assertEqual(status, 400)
+
+    def test_batch(self):
+        fixtures = [
+            {"method": "POST", "path_info": "/api/v5/test/", "request": {"x": "data"}},
+            {"method": "POST", "path_info": "/not/in/spec", "request": {}},
+        ]
+        status, body = call("POST", "/batch", json.dumps(fixtures).encode("utf8"))
+        self.assertEqual(status, 200)
+        self.assertEqual([r["status"] for r in json.loads(body)], [200, 400])
+
+    def test_stream_split_across_chunks(self):
+        line = json.dumps(
+            {"method": "POST", "path_info": "/api/v5/test/", "request": {"x": "data"}}
+        ).encode("utf8")
+        chunks = [line[:10], line[10:] + b"\n" + line[:5], line[5:]]
+        status, body = call(
+            "POST", "/stream", content_type="application/x-ndjson", chunks=chunks
+        )
+        results = [json.loads(result) for result in body.splitlines()]
+        self.assertEqual(status, 200)
+        self.assertEqual([r["status"] for r in results], [200, 200])
+
+    def test_server_timing(self):
+        fixture = {"method": "POST", "path_info": "/api/v5/test/", "request": {"x": 1}}
+        headers = {}
+        call("POST", "/", json.dumps(fixture).encode("utf8"), headers=headers)
+        self.assertNotIn(b"server-timing", headers)
+
+        val.set_server_timing(True)
+        self.addCleanup(val.set_server_timing, False)
+        val.verdicts.clear()
+        call("POST", "/", json.dumps(fixture).encode("utf8"), headers=headers)
+        phases = [
+            timing.split(b";")[0] for timing in headers[b"server-timing"].split(b", ")
+        ]
+        self.assertEqual(
+            phases, [b"parse", b"render", b"request", b"route", b"serialize"]
+        )
+
+    def test_profile(self):
+        self.assertEqual(
+            call("POST", "/profile", query_string=b"fixtures=0")[0], 400
+        )
+        self.assertEqual(call("POST", "/profile", query_string=b"fixtures=1")[0], 202)
+        val.verdicts.clear()
+        fixture = {"method": "POST", "path_info": "/api/v5/test/", "request": {"x": "a"}}
+        call("POST", "/", json.dumps(fixture).encode("utf8"))
+        status, body = call("GET", "/profile", query_string=b"limit=5")
+        value = json.loads(body)
+        self.assertEqual((value["profiled"], value["remaining"]), (1, 0))
+        self.assertIn("_check_fixture", value["stats"])
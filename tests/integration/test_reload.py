@@ -0,0 +1,133 @@
+from __future__ import absolute_import, unicode_literals
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from functools import partial
+try:
+    from http.server import HTTPServer, SimpleHTTPRequestHandler
+except ImportError:
+    from BaseHTTPServer import HTTPServer
+    from SimpleHTTPServer import SimpleHTTPRequestHandler
+
+from pedantic import validator_service as val
+from pedantic.reloader import Reloader
+
+from .test_validator import SCHEMAS, WHITELIST
+
+FIXTURE = {
+    "method": "POST",
+    "path_info": "/api/v5/test/",
+    "query_string": "required_param=a",
+    "request": {"x": "data"},
+}
+
+
+class Handler(SimpleHTTPRequestHandler):
+    """Serves the origin's directory, recording conditional requests."""
+
+    conditional = []
+
+    def do_GET(self):
+        if self.headers.get("If-Modified-Since"):
+            self.conditional.append(self.path)
+        SimpleHTTPRequestHandler.do_GET(self)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestReload(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.write("spec.json", SCHEMAS)
+        self.write("whitelist.json", WHITELIST)
+
+        Handler.conditional = []
+        handler = partial(Handler, directory=self.directory)
+        self.server = HTTPServer(("127.0.0.1", 0), handler)
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        origin = "http://127.0.0.1:{}/".format(self.server.server_port)
+        self.reloader = Reloader(
+            origin + "spec.json", origin + "whitelist.json", interval=0.05
+        )
+        self.assertTrue(self.reloader.reload())
+
+    def write(self, name, content, mtime=None):
+        path = os.path.join(self.directory, name)
+        with open(path, "w") as f:
+            f.write(content)
+        if mtime is not None:
+            # Last-Modified has a resolution of a second
+            os.utime(path, (mtime, mtime))
+
+    def remove_test_resource(self):
+        spec = json.loads(SCHEMAS)
+        del spec["resources"][0]
+        self.write("spec.json", json.dumps(spec), time.time() + 10)
+
+    def test_unchanged_origin_is_not_reloaded(self):
+        version = val.settings.version
+        self.assertFalse(self.reloader.reload())
+        self.assertEqual(val.settings.version, version)
+        self.assertEqual(
+            sorted(Handler.conditional), ["/spec.json", "/whitelist.json"]
+        )
+
+    def test_changed_spec_is_swapped_in(self):
+        self.assertEqual(val.check_fixture(dict(FIXTURE))[1], 200)
+        before = val.settings
+        self.remove_test_resource()
+        self.assertTrue(self.reloader.reload())
+        self.assertIsNot(val.settings, before)
+        self.assertIs(val.settings.specs[0].whitelist, before.specs[0].whitelist)
+        value, status = val.check_fixture(dict(FIXTURE))
+        self.assertEqual(status, 400)
+        self.assertIn("not found", value["error"])
+
+    def test_validation_in_progress_keeps_its_version(self):
+        before = val.settings
+        self.remove_test_resource()
+        self.reloader.reload()
+        value, status = val.check_fixture(dict(FIXTURE), current=before)
+        self.assertEqual(status, 200)
+
+    def test_failed_reload_keeps_current_version(self):
+        before = val.settings
+        self.write("spec.json", "{not json", time.time() + 10)
+        with self.assertRaises(ValueError):
+            self.reloader.reload()
+        self.assertIs(val.settings, before)
+
+        self.remove_test_resource()
+        self.assertTrue(self.reloader.reload())
+
+    def test_whitelist_change_reloads_spec_never_loaded(self):
+        val.remove_spec(val.DEFAULT_SPEC)
+        self.addCleanup(val.set_proxy_settings, SCHEMAS, WHITELIST)
+        self.write("whitelist.json", "[]", time.time() + 10)
+        with self.assertLogs("pedantic.reloader", "WARNING"):
+            self.assertTrue(self.reloader.reload())
+        self.assertEqual(val.check_fixture(dict(FIXTURE))[1], 200)
+
+    def test_whitelist_alone_needs_a_spec(self):
+        with self.assertRaises(val.UndefinedSchemaError):
+            val.set_proxy_settings(None, WHITELIST, key="missing")
+
+    def test_thread_polls_origin(self):
+        self.reloader.start()
+        self.addCleanup(self.reloader.stop)
+        self.remove_test_resource()
+        deadline = time.time() + 5
+        while not self.reloader.reloads > 1 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(val.check_fixture(dict(FIXTURE))[1], 400)
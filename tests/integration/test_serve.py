@@ -0,0 +1,107 @@
+from __future__ import absolute_import, unicode_literals
+
+import json
+import os
+import signal
+import socket
+import sys
+import time
+import unittest
+from copy import deepcopy
+from http.client import HTTPConnection
+
+from cli import pedantic as cli
+from pedantic import validator_service as val
+
+with open(os.path.join(sys.path[0], "example_schema.json"), "r") as f:
+    SCHEMAS = f.read()
+
+TIMEOUT = 10  # in seconds
+
+
+def free_port():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def children(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(child) for child in f.read().split()]
+
+
+def is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+@unittest.skipUnless(os.path.exists("/proc/self/task"), "requires Linux /proc")
+class ServeWorkersTestCase(unittest.TestCase):
+    def setUp(self):
+        val.set_proxy_settings(deepcopy(SCHEMAS), None)
+        self.port = free_port()
+        self.master = os.fork()
+        if self.master == 0:
+            try:
+                with open(os.devnull, "w") as devnull:
+                    os.dup2(devnull.fileno(), sys.stdout.fileno())
+                    os.dup2(devnull.fileno(), sys.stderr.fileno())
+                cli.serve(self.port, 2)
+            finally:
+                os._exit(0)
+        self.addCleanup(self.kill_master)
+
+    def kill_master(self):
+        if is_running(self.master):
+            os.kill(self.master, signal.SIGKILL)
+            os.waitpid(self.master, 0)
+
+    def wait_for(self, condition):
+        deadline = time.time() + TIMEOUT
+        while not condition():
+            if time.time() > deadline:
+                self.fail("timed out")
+            time.sleep(0.05)
+
+    def post(self, fixture):
+        connection = HTTPConnection("127.0.0.1", self.port, timeout=TIMEOUT)
+        try:
+            connection.request(
+                "POST", "/", json.dumps(fixture), {"Content-Type": "application/json"}
+            )
+            response = connection.getresponse()
+            return response.status, json.loads(response.read().decode("utf8"))
+        finally:
+            connection.close()
+
+    def test_workers_serve_and_are_reaped_on_sigterm(self):
+        self.wait_for(lambda: len(children(self.master)) == 2)
+        workers = children(self.master)
+
+        def serving():
+            try:
+                return self.post(
+                    {"method": "POST", "path_info": "/api/v5/test/", "request": {"x": "data"}}
+                )
+            except OSError:
+                return None
+
+        self.wait_for(serving)
+        status, body = serving()
+        self.assertEqual(status, 200)
+        self.assertIn("All is well", body["message"])
+
+        os.kill(self.master, signal.SIGTERM)
+        deadline = time.time() + TIMEOUT
+        while os.waitpid(self.master, os.WNOHANG) == (0, 0):
+            if time.time() > deadline:
+                self.fail("the master didn't exit")
+            time.sleep(0.05)
+        # reaped by the master, not left as zombies
+        for pid in workers:
+            self.assertFalse(is_running(pid))
@@ -3,9 +3,12 @@ import unittest
 import os
 import sys
 import json
+import pickle
 from copy import deepcopy
+from unittest import mock
 
 from pedantic import validator_service as val  # shared across tests
+from pedantic.check_against_schema import validate_request_against_schema
 
 schema_file = "example_schema.json"
 with open(os.path.join(sys.path[0], schema_file), "r") as f:
@@ -19,6 +22,12 @@ with open(os.path.join(sys.path[0], whitelist_file), "r") as f:
 WHITELIST = read_data
 
 
+def _fail_on_boom(data, *args):
+    if data.request.request_data == {"x": "boom"}:
+        raise RuntimeError("boom")
+    return validate_request_against_schema(data, *args)
+
+
 def setup_validator():
     val.app.config["TESTING"] = True
     app = val.app.test_client()
@@ -154,3 +163,419 @@ class TestPedantic(unittest.TestCase):
         data = json.loads(resp.data.decode("utf8"))["message"]
         self.assertIn("All is well", data)
         self.assertEqual(resp.status_code, 200)
+
+    def test_stats_reports_validator_reuse(self):
+        fixture = json.dumps(
+            {
+                "method": "POST",
+                "path_info": "/api/v5/test/",
+                "request": {"x": "data"},
+            }
+        )
+        self.app.post("/", data=fixture, content_type="application/json")
+        before = json.loads(self.app.get("/stats").data.decode("utf8"))
+        # a different body, so the verdict cache cannot answer it
+        fixture = fixture.replace('"data"', '"other data"')
+        self.app.post("/", data=fixture, content_type="application/json")
+        after = json.loads(self.app.get("/stats").data.decode("utf8"))
+        self.assertEqual(
+            after["validators"]["misses"], before["validators"]["misses"]
+        )
+        self.assertGreater(after["validators"]["hits"], before["validators"]["hits"])
+
+    def test_batch_returns_results_in_order(self):
+        fixtures = [
+            {"method": "POST", "path_info": "/api/v5/test/", "request": {"x": "data"}},
+            {"method": "POST", "path_info": "/not/in/spec", "request": {}},
+            {"method": "POST", "path_info": "/api/v5/test/", "request": {"x": 1}},
+            {"method": "POST", "path_info": "/whitelisted/path",
+             "status_code": 200, "response": {"some": "thing"}},
+            {"path_info": "/api/v5/test/"},
+        ]
+        resp = self.app.post(
+            "/batch", data=json.dumps(fixtures), content_type="application/json"
+        )
+        results = json.loads(resp.data.decode("utf8"))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([r["status"] for r in results], [200, 400, 400, 200, 400])
+        self.assertIn("All is well", results[0]["message"])
+        self.assertIn("not found", results[1]["error"])
+        self.assertIn("request validation", results[2]["error"])
+        self.assertIn("whitelisted", results[3]["warning"])
+        self.assertIn("Pedantic error", results[4]["error"])
+
+    def test_batch_reports_unexpected_errors_per_fixture(self):
+        fixtures = [
+            {"method": "POST", "path_info": "/api/v5/test/", "request": {"x": "boom"}},
+            {"method": "POST", "path_info": "/api/v5/test/",
+             "query_string": "required_param=abc&date_param=2020-02-30",
+             "request": {"x": "data"}},
+            {"method": "POST", "path_info": "/api/v5/test/", "request": {"x": "data"}},
+        ]
+        with mock.patch.object(
+            val, "validate_request_against_schema", side_effect=_fail_on_boom
+        ):
+            resp = self.app.post(
+                "/batch", data=json.dumps(fixtures), content_type="application/json"
+            )
+        results = json.loads(resp.data.decode("utf8"))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([r["status"] for r in results], [500, 400, 200])
+        self.assertIn("Pedantic error - boom", results[0]["error"])
+        self.assertIn("'2020-02-30' is not a valid date", results[1]["error"])
+
+    def test_validator_accepts_date_lists(self):
+        fixture = {
+            "method": "POST",
+            "path_info": "/api/v5/test/",
+            "query_string": "required_param=abc&date_param=2020-01-01,2020-01-02",
+            "request": {"x": "data"},
+        }
+        resp = self.app.post(
+            "/", data=json.dumps(fixture), content_type="application/json"
+        )
+        self.assertEqual(resp.status_code, 200)
+
+    def test_batch_requires_array(self):
+        resp = self.app.post(
+            "/batch", data=json.dumps({}), content_type="application/json"
+        )
+        data = json.loads(resp.data.decode("utf8"))["error"]
+        self.assertIn("array", data)
+        self.assertEqual(resp.status_code, 400)
+
+    def test_stream_returns_one_line_per_fixture(self):
+        fixtures = [
+            {"method": "POST", "path_info": "/api/v5/test/", "request": {"x": "data"}},
+            {"method": "POST", "path_info": "/not/in/spec", "request": {}},
+        ]
+        body = "\n".join(json.dumps(fixture) for fixture in fixtures)
+        body += "\n\n{not json\n"
+        resp = self.app.post(
+            "/stream", data=body, content_type="application/x-ndjson"
+        )
+        lines = resp.data.decode("utf8").splitlines()
+        results = [json.loads(line) for line in lines]
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.mimetype, "application/x-ndjson")
+        self.assertEqual([r["status"] for r in results], [200, 400, 400])
+        self.assertIn("All is well", results[0]["message"])
+        self.assertIn("not found", results[1]["error"])
+        self.assertIn("invalid JSON", results[2]["error"])
+
+    def test_stream_reports_unexpected_errors_per_line(self):
+        fixtures = [
+            {"method": "POST", "path_info": "/api/v5/test/", "request": {"x": "boom"}},
+            {"method": "POST", "path_info": "/api/v5/test/", "request": {"x": "data"}},
+        ]
+        body = "\n".join(json.dumps(fixture) for fixture in fixtures)
+        with mock.patch.object(
+            val, "validate_request_against_schema", side_effect=_fail_on_boom
+        ):
+            resp = self.app.post(
+                "/stream", data=body, content_type="application/x-ndjson"
+            )
+        results = [json.loads(line) for line in resp.data.decode("utf8").splitlines()]
+        self.assertEqual([r["status"] for r in results], [500, 200])
+        self.assertIn("Pedantic error - boom", results[0]["error"])
+
+    def test_stream_requires_ndjson_content_type(self):
+        resp = self.app.post("/stream", data="{}", content_type="application/json")
+        data = json.loads(resp.data.decode("utf8"))["error"]
+        self.assertIn("application/x-ndjson", data)
+        self.assertEqual(resp.status_code, 400)
+
+    def test_validator_first_error(self):
+        fixture = json.dumps(
+            {
+                "method": "POST",
+                "path_info": "/api/v5/test/",
+                "query_string": "optional_param=x&undefined=1",
+                "status_code": 200,
+                "request": {"x": 1},
+                "response": {"data": "a string"},
+            }
+        )
+        resp = self.app.post(
+            "/?first_error=1", data=fixture, content_type="application/json"
+        )
+        data = json.loads(resp.data.decode("utf8"))["error"]
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(data.count("\n - "), 1)
+        self.assertNotIn("response validation", data)
+
+        resp = self.app.post("/", data=fixture, content_type="application/json")
+        data = json.loads(resp.data.decode("utf8"))["error"]
+        self.assertGreater(data.count("\n - "), 2)
+
+    def test_validator_lists_structured_errors(self):
+        fixture = json.dumps(
+            {
+                "method": "POST",
+                "path_info": "/api/v5/test/",
+                "query_string": "required_param=a&optional_param=x",
+                "status_code": 200,
+                "request": {"x": 1},
+                "response": {"data": "a string"},
+            }
+        )
+        resp = self.app.post("/", data=fixture, content_type="application/json")
+        errors = json.loads(resp.data.decode("utf8"))["errors"]
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(
+            [(e["location"], e["pointer"]) for e in errors],
+            [("query", "/optional_param"), ("request", "/x"),
+             ("response", "/data")],
+        )
+        self.assertEqual(errors[1]["keyword"], "type")
+        self.assertEqual(errors[1]["schema_path"], ["properties", "x", "type"])
+
+    def test_validator_caps_echoed_fixture(self):
+        fixture = json.dumps(
+            {
+                "method": "POST",
+                "path_info": "/api/v5/test/",
+                "status_code": 200,
+                "response": {"data": "a string", "padding": ["x"] * 1000},
+            }
+        )
+        resp = self.app.post("/", data=fixture, content_type="application/json")
+        data = json.loads(resp.data.decode("utf8"))["error"]
+        self.assertIn("CONTENT", data)
+        self.assertIn("... (truncated)", data)
+        self.assertLess(len(data), 4096)
+
+        val.set_echo_size(0)
+        self.addCleanup(val.set_echo_size, val.DEFAULT_ECHO_SIZE)
+        resp = self.app.post("/", data=fixture, content_type="application/json")
+        data = json.loads(resp.data.decode("utf8"))["error"]
+        self.assertNotIn("CONTENT", data)
+        self.assertIn("response validation", data)
+
+    def test_validator_server_wide_max_errors(self):
+        fixture = json.dumps(
+            {
+                "method": "POST",
+                "path_info": "/api/v5/test/",
+                "status_code": 200,
+                "request": {"x": 1},
+                "response": {"data": "a string"},
+            }
+        )
+        val.set_default_max_errors(1)
+        self.addCleanup(val.set_default_max_errors, None)
+        resp = self.app.post("/", data=fixture, content_type="application/json")
+        data = json.loads(resp.data.decode("utf8"))["error"]
+        self.assertEqual(data.count("\n - "), 1)
+
+    def test_validator_invalid_max_errors(self):
+        resp = self.app.post(
+            "/?max_errors=0", data=json.dumps({}), content_type="application/json"
+        )
+        data = json.loads(resp.data.decode("utf8"))["error"]
+        self.assertIn("max_errors", data)
+        self.assertEqual(resp.status_code, 400)
+
+    def test_repeated_fixture_is_answered_from_verdict_cache(self):
+        fixture = json.dumps(
+            {
+                "method": "POST",
+                "path_info": "/api/v5/test/",
+                "request": {"x": 1},
+            }
+        )
+        first = self.app.post("/", data=fixture, content_type="application/json")
+        before = val.verdicts.stats()
+        second = self.app.post("/", data=fixture, content_type="application/json")
+        self.assertEqual(val.verdicts.stats()["hits"], before["hits"] + 1)
+        self.assertEqual(second.status_code, first.status_code)
+        self.assertEqual(second.get_json(), first.get_json())
+
+    def test_error_text_is_rendered_when_serialized(self):
+        fixture = {"method": "POST", "path_info": "/api/v5/test/", "request": {"x": 1}}
+        with mock.patch.object(
+            val.JSONSchemaValidationError, "render", autospec=True,
+            return_value="rendered",
+        ) as render:
+            value, status = val.check_fixture(dict(fixture))
+            self.assertEqual(status, 400)
+            self.assertEqual(render.call_count, 0)
+            self.assertEqual(val.rendered(value)["error"], "rendered")
+            self.assertEqual(pickle.loads(pickle.dumps(value))["error"], "rendered")
+            self.assertEqual(render.call_count, 1)
+
+    def test_loading_a_spec_clears_verdict_cache(self):
+        fixture = {"method": "POST", "path_info": "/api/v5/test/", "request": {"x": "a"}}
+        val.check_fixture(dict(fixture))
+        self.assertEqual(len(val.verdicts), 1)
+        val.set_proxy_settings(deepcopy(SCHEMAS), deepcopy(WHITELIST))
+        self.assertEqual(len(val.verdicts), 0)
+
+
+USERS_SPEC = {
+    "resources": [
+        {
+            "relativeUri": "/users/{user_id}",
+            "uriParameters": {"user_id": {"type": "string"}},
+            "methods": [
+                {
+                    "method": "put",
+                    "body": {
+                        "application/json": {
+                            "schema": json.dumps(
+                                {"properties": {"name": {"type": "string"}}}
+                            )
+                        }
+                    },
+                }
+            ],
+        }
+    ]
+}
+
+USERS_WHITELIST = json.dumps([{"path": "/users/me", "method": "GET", "code": 200}])
+
+
+class TestMultipleSpecs(unittest.TestCase):
+    def setUp(self):
+        self.app = setup_validator()
+        val.set_proxy_settings(deepcopy(SCHEMAS), deepcopy(WHITELIST))
+        val.set_proxy_settings(
+            deepcopy(USERS_SPEC), USERS_WHITELIST, key="users", prefix="/users/"
+        )
+        self.addCleanup(val.remove_spec, "users")
+
+    def post(self, fixture, query=""):
+        resp = self.app.post(
+            "/" + query, data=json.dumps(fixture), content_type="application/json"
+        )
+        return resp.get_json(), resp.status_code
+
+    def test_fixture_is_routed_by_prefix(self):
+        fixture = {"method": "PUT", "path_info": "/users/1", "request": {"name": 1}}
+        value, status = self.post(fixture)
+        self.assertEqual(status, 400)
+        self.assertEqual(value["errors"][0]["pointer"], "/name")
+        fixture = {"method": "POST", "path_info": "/api/v5/test/", "request": {"x": 1}}
+        value, status = self.post(fixture)
+        self.assertEqual(value["errors"][0]["pointer"], "/x")
+
+    def test_fixture_is_routed_by_key(self):
+        fixture = {"method": "PUT", "path_info": "/users/1", "request": {"name": "a"}}
+        self.assertEqual(self.post(fixture, "?spec=users")[1], 200)
+        value, status = self.post(fixture, "?spec=default")
+        self.assertEqual(status, 400)
+        self.assertIn("not found", value["error"])
+        fixture["spec"] = "users"
+        self.assertEqual(self.post(fixture, "?spec=default")[1], 200)
+
+    def test_unknown_spec(self):
+        fixture = {"method": "PUT", "path_info": "/users/1", "request": {}, "spec": "nope"}
+        value, status = self.post(fixture)
+        self.assertEqual(status, 400)
+        self.assertIn("Unknown spec", value["error"])
+
+    def test_whitelists_are_per_spec(self):
+        fixture = {"method": "GET", "path_info": "/users/me", "status_code": 200, "response": {"a": 1}}
+        self.assertIn("warning", self.post(fixture)[0])
+        fixture = {"method": "POST", "path_info": "/whitelisted/path", "status_code": 200,
+                   "response": {"a": 1}, "spec": "users"}
+        value, status = self.post(fixture)
+        self.assertEqual(status, 400)
+        self.assertIn("not found", value["error"])
+
+    def test_batch_shares_lookups_per_spec(self):
+        fixtures = [
+            {"method": "PUT", "path_info": "/users/1", "request": {"name": "a"}},
+            {"method": "PUT", "path_info": "/users/1", "request": {"name": "a"},
+             "spec": "default"},
+        ]
+        statuses = [result["status"] for result in val.check_batch(fixtures)]
+        self.assertEqual(statuses, [200, 400])
+
+    def test_reloading_one_spec_keeps_the_others(self):
+        before = val.settings.specs
+        val.set_proxy_settings(deepcopy(USERS_SPEC), None, key="users")
+        (default, users) = val.settings.specs
+        self.assertIs(default, before[0])
+        self.assertEqual(users.prefix, "/users/")
+        self.assertIs(users.whitelist, before[1].whitelist)
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.app = setup_validator()
+        val.set_proxy_settings(deepcopy(SCHEMAS), deepcopy(WHITELIST))
+
+    def test_metrics_count_outcomes_and_time_phases(self):
+        before = dict(
+            (outcome, val.outcomes.get(outcome))
+            for outcome in ("ok", "invalid", "undefined", "whitelisted"))
+        requests = val.phases.count("request")
+        serialized = val.phases.count("serialize")
+        fixtures = [
+            {"method": "POST", "path_info": "/api/v5/test/", "request": {"x": "a"}},
+            {"method": "POST", "path_info": "/api/v5/test/", "request": {"x": 1}},
+            {"method": "POST", "path_info": "/nowhere", "request": {}},
+            {"method": "POST", "path_info": "/whitelisted/path", "status_code": 200,
+             "response": {"some": "thing"}},
+        ]
+        self.app.post("/batch", data=json.dumps(fixtures), content_type="application/json")
+        for outcome in before:
+            self.assertEqual(val.outcomes.get(outcome), before[outcome] + 1)
+        self.assertEqual(val.phases.count("request"), requests + 2)
+        self.assertEqual(val.phases.count("serialize"), serialized + 1)
+
+        resp = self.app.get("/metrics")
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.content_type.startswith("text/plain"))
+        text = resp.data.decode("utf8")
+        self.assertIn('pedantic_phase_seconds_bucket{phase="route",le="+Inf"}', text)
+        self.assertIn('pedantic_spec_resources{spec="default"} 4', text)
+        self.assertIn('pedantic_spec_whitelist_entries{spec="default"} 1', text)
+
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        self.app = setup_validator()
+        val.set_proxy_settings(deepcopy(SCHEMAS), deepcopy(WHITELIST))
+        self.fixture = json.dumps(
+            {"method": "POST", "path_info": "/api/v5/test/", "request": {"x": "a"}}
+        )
+
+    def test_server_timing_is_opt_in(self):
+        resp = self.app.post("/", data=self.fixture, content_type="application/json")
+        self.assertNotIn("Server-Timing", resp.headers)
+
+        val.set_server_timing(True)
+        self.addCleanup(val.set_server_timing, False)
+        val.verdicts.clear()
+        resp = self.app.post("/", data=self.fixture, content_type="application/json")
+        timings = dict(
+            timing.split(";dur=") for timing in resp.headers["Server-Timing"].split(", ")
+        )
+        self.assertEqual(
+            sorted(timings), ["parse", "request", "route", "serialize"]
+        )
+        self.assertTrue(all(float(ms) >= 0 for ms in timings.values()))
+
+    def test_profile_next_fixtures(self):
+        resp = self.app.post("/profile?fixtures=2")
+        self.assertEqual(resp.status_code, 202)
+        self.assertEqual(resp.get_json(), {"remaining": 2})
+        self.assertIsNone(self.app.get("/profile").get_json()["stats"])
+
+        # distinct fixtures, so none is answered from the verdict cache
+        fixtures = [
+            dict(json.loads(self.fixture), query_string="required_param={}".format(idx))
+            for idx in range(3)
+        ]
+        self.app.post("/batch", data=json.dumps(fixtures), content_type="application/json")
+        value = self.app.get("/profile?sort=tottime&limit=10").get_json()
+        self.assertEqual((value["profiled"], value["remaining"]), (2, 0))
+        self.assertIn("function calls", value["stats"])
+
+    def test_profile_invalid_options(self):
+        self.assertEqual(self.app.post("/profile?fixtures=x").status_code, 400)
+        self.assertEqual(self.app.get("/profile?sort=name").status_code, 400)
+        self.assertEqual(self.app.get("/profile?limit=0").status_code, 400)
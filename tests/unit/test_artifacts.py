@@ -0,0 +1,146 @@
+from __future__ import absolute_import, unicode_literals
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from pedantic import artifacts
+from pedantic import validator_service as val
+from pedantic.artifacts import (
+    ARTIFACT_PREFIX,
+    MAX_ARTIFACT_AGE,
+    UnsafeDirectoryError,
+    artifact_key,
+    artifact_path,
+    load_artifact,
+    prepare_directory,
+    prune_artifacts,
+    save_artifact,
+)
+from pedantic.check_against_schema import CompiledMethod, Data, RouteIndex
+
+with open(os.path.join(sys.path[0], 'example_schema.json'), 'r') as f:
+    SPEC_TEXT = f.read()
+
+
+class ArtifactsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.key = artifact_key(SPEC_TEXT)
+
+    def test_key_depends_on_content(self):
+        self.assertEqual(self.key, artifact_key(SPEC_TEXT))
+        self.assertNotEqual(self.key, artifact_key(SPEC_TEXT + ' '))
+
+    def test_key_depends_on_compiling_code(self):
+        with mock.patch.object(artifacts, '_CODE_DIGEST', 'changed'):
+            self.assertNotEqual(self.key, artifact_key(SPEC_TEXT))
+
+    def test_round_trip_keeps_compiled_route_index(self):
+        schema = json.loads(SPEC_TEXT)
+        save_artifact(self.directory, self.key, RouteIndex(schema))
+        route_index = load_artifact(self.directory, self.key)
+
+        data = Data('/api/v5/test/', 'post', None, None)
+        method = route_index.get_method(data)
+        self.assertIsInstance(method, CompiledMethod)
+        # the compiled methods still share the index's body schemas
+        self.assertTrue(any(
+            body is method.request_schema
+            for body in route_index.body_schemas))
+        with self.assertRaises(TypeError):
+            method.responses['201'] = None
+        self.assertEqual(os.listdir(self.directory),
+                         [os.path.basename(
+                             artifact_path(self.directory, self.key))])
+
+    def test_load_missing_or_corrupt_artifact(self):
+        self.assertIsNone(load_artifact(self.directory, self.key))
+        with open(artifact_path(self.directory, self.key), 'wb') as f:
+            f.write(b'not a pickle')
+        self.assertIsNone(load_artifact(self.directory, self.key))
+
+    def test_save_to_missing_directory_is_ignored(self):
+        missing = os.path.join(self.directory, 'missing')
+        save_artifact(missing, self.key, 1)
+        self.assertIsNone(load_artifact(missing, self.key))
+
+    def test_prepare_directory_creates_private_directory(self):
+        directory = os.path.join(self.directory, 'artifacts')
+        self.assertEqual(prepare_directory(directory), directory)
+        self.assertEqual(os.stat(directory).st_mode & 0o777, 0o700)
+        os.chmod(directory, 0o777)
+        prepare_directory(directory)
+        self.assertEqual(os.stat(directory).st_mode & 0o777, 0o700)
+
+    def test_prepare_directory_refuses_files_and_links(self):
+        path = os.path.join(self.directory, 'file')
+        open(path, 'w').close()
+        with self.assertRaises(OSError):
+            prepare_directory(path)
+        link = os.path.join(self.directory, 'link')
+        os.symlink(tempfile.mkdtemp(dir=self.directory), link)
+        with self.assertRaises(UnsafeDirectoryError):
+            prepare_directory(link)
+
+    @unittest.skipUnless(os.getuid() == 0, 'changing owners requires root')
+    def test_artifacts_of_other_users_are_refused(self):
+        directory = os.path.join(self.directory, 'artifacts')
+        os.mkdir(directory)
+        os.chown(directory, 12345, -1)
+        with self.assertRaises(UnsafeDirectoryError):
+            prepare_directory(directory)
+
+        save_artifact(self.directory, self.key, 'value')
+        os.chown(artifact_path(self.directory, self.key), 12345, -1)
+        self.assertIsNone(load_artifact(self.directory, self.key))
+
+    def test_save_prunes_stale_artifacts(self):
+        other_format = os.path.join(
+            self.directory, ARTIFACT_PREFIX + 'abc.pickle')
+        unused = artifact_path(self.directory, 'unused')
+        recent = artifact_path(self.directory, 'recent')
+        unrelated = os.path.join(self.directory, 'spec.json')
+        for path in (other_format, unused, recent, unrelated):
+            open(path, 'w').close()
+        old = time.time() - MAX_ARTIFACT_AGE - 60
+        os.utime(unused, (old, old))
+        save_artifact(self.directory, self.key, 'value')
+        self.assertEqual(sorted(os.listdir(self.directory)), sorted(
+            os.path.basename(path) for path in (
+                artifact_path(self.directory, self.key), recent, unrelated)))
+
+    def test_load_keeps_artifact_from_pruning(self):
+        save_artifact(self.directory, self.key, 'value')
+        path = artifact_path(self.directory, self.key)
+        old = time.time() - MAX_ARTIFACT_AGE - 60
+        os.utime(path, (old, old))
+        self.assertEqual(load_artifact(self.directory, self.key), 'value')
+        prune_artifacts(self.directory)
+        self.assertTrue(os.path.exists(path))
+
+    def test_load_spec_reuses_artifact(self):
+        route_index = val.load_spec(SPEC_TEXT, self.directory)
+        self.assertEqual(route_index.size, 4)
+        # the loaded index doesn't hold on to the spec
+        self.assertIs(route_index.lookup(['/api', '/v5', '/test', '/']), True)
+        save_artifact(self.directory, self.key, 'cached')
+        self.assertEqual(val.load_spec(SPEC_TEXT, self.directory), 'cached')
+        # a parsed spec is keyed by its canonical form
+        schema = json.loads(SPEC_TEXT)
+        key = artifact_key(json.dumps(schema, sort_keys=True))
+        save_artifact(self.directory, key, 'parsed')
+        self.assertEqual(val.load_spec(schema, self.directory), 'parsed')
+        reformatted = json.dumps(schema, indent=4)
+        self.assertEqual(val.load_spec(reformatted, self.directory).size, 4)
+
+    def test_load_spec_skips_parsing_unchanged_spec(self):
+        save_artifact(self.directory, artifact_key('{not json'), 'cached')
+        self.assertEqual(val.load_spec('{not json', self.directory), 'cached')
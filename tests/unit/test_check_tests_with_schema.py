@@ -7,18 +7,36 @@ import json
 import os
 import sys
 from jsonschema.exceptions import ValidationError
+from jsonschema.validators import Draft4Validator
 
+from pedantic.codegen import CompiledValidator
 from pedantic.check_against_schema import (
     Data,
     Request,
     Response,
     is_whitelisted,
+    Whitelist,
     _find_resource,
     _get_path_segments,
     _remove_required,
+    _is_envelope,
+    _validate,
+    _echo,
+    ErrorRecord,
+    LOCAL_SCHEMA,
+    ValidatorRegistry,
+    RouteIndex,
+    SchemaInterner,
+    segment_matches,
+    CompiledMethod,
+    compile_method,
     validate_request_against_schema,
     validate_response_against_schema,
     parse_data,
+    parse_query_data,
+    RawQuery,
+    _parse_from_string,
+    _parse_value,
     get_spec,
     JSONSchemaValidationError,
     UndefinedSchemaError,
@@ -43,10 +61,10 @@ class ValidatorTestBase(unittest.TestCase):
         self.raw_schema = deepcopy(SCHEMAS)
 
 
-class RequestValidatorTestCase(ValidatorTestBase):
+class RequestTestBase(ValidatorTestBase):
 
     def setUp(self):
-        super(RequestValidatorTestCase, self).setUp()
+        super(RequestTestBase, self).setUp()
         self.req_path_info = '/api/v5/test/'
         self.method = 'post'
         self.request_data = {'x': 'data'}
@@ -60,6 +78,8 @@ class RequestValidatorTestCase(ValidatorTestBase):
         )
         self.spec = get_spec(self.parsed_data, self.raw_schema)
 
+
+class RequestValidatorTestCase(RequestTestBase):
     def test_validate_request_against_schema_quiet_on_valid_instance(self):
         """
         validate_request_against_schema() quietly completes on valid instance
@@ -100,6 +120,22 @@ class RequestValidatorTestCase(ValidatorTestBase):
         )
         validate_request_against_schema(req_info, self.spec)
 
+    def test_validate_request_against_schema_parses_raw_query(self):
+        """
+        validate_request_against_schema() parses a raw query by param type
+        """
+        self.query_data = RawQuery({
+            'required_param': ['true'],
+            'optional_param': ['1', '2'],
+        })
+        req_info = Data(
+            path=self.req_path_info,
+            method=self.method,
+            request=Request(self.request_data, self.query_data),
+            response=self.dummy_response,
+        )
+        validate_request_against_schema(req_info, self.spec)
+
     def test_validate_request_against_schema_many_errors_has_nice_output(self):
         """
         validate_request_against_schema() raises multiple types of (sub)errors
@@ -129,6 +165,44 @@ class RequestValidatorTestCase(ValidatorTestBase):
         else:
             self.fail("Did not raise JSONSchemaValidationError.")
 
+    def test_validate_request_against_schema_max_errors(self):
+        """
+        validate_request_against_schema() stops after max_errors errors
+        """
+        self.request_data = {'x': 1, 'y': [{}, 3, "foo"]}
+        self.query_data = {
+            'optional_param': 'not a number',
+            'date_param': 'not a date',
+            'not_defined_param': 'dummy'
+        }
+        req_info = Data(
+            path=self.req_path_info,
+            method=self.method,
+            request=Request(self.request_data, self.query_data),
+            response=self.dummy_response,
+        )
+        for max_errors in (1, 2, 4):
+            with self.assertRaises(JSONSchemaValidationError) as ctx:
+                validate_request_against_schema(req_info, self.spec,
+                                                max_errors=max_errors)
+            message = str(ctx.exception)
+            self.assertEqual(message.count('\n - '), max_errors)
+            self.assertEqual(ctx.exception.error_count, max_errors)
+            self.assertNotIn('>', message)
+
+    def test_validate_response_against_schema_first_error(self):
+        """
+        validate_response_against_schema() stops at the first error
+        """
+        self.spec['responses']['200']['body']['application/json'][
+            'schema'] = json.dumps({'items': {'type': 'string'}})
+        req_info = self.parsed_data._replace(
+            response=Response(response_data=[1, 2, 3], status_code=200))
+        with self.assertRaises(JSONSchemaValidationError) as ctx:
+            validate_response_against_schema(req_info, self.spec,
+                                             max_errors=1)
+        self.assertEqual(str(ctx.exception).count('\n - '), 1)
+
     def test_validate_request_against_schema_invalid_date_list_param(self):
         """
         validate_request_against_schema() raises on invalid date list param
@@ -212,6 +286,19 @@ class RequestValidatorTestCase(ValidatorTestBase):
         with self.assertRaises(JSONSchemaValidationError):
             validate_request_against_schema(req_info, self.spec)
 
+    def test_validate_request_against_schema_does_not_modify_spec(self):
+        """
+        validate_request_against_schema() leaves the shared spec untouched
+        """
+        expected = deepcopy(self.spec)
+        validate_request_against_schema(self.parsed_data, self.spec)
+        self.assertEqual(self.spec, expected)
+        # required params are still enforced on later requests
+        req_info = self.parsed_data._replace(
+            request=Request(self.request_data, {'optional_param': 1}))
+        with self.assertRaises(JSONSchemaValidationError):
+            validate_request_against_schema(req_info, self.spec)
+
     def test_validate_request_against_schema_queryParameters_missing(
             self):
         """
@@ -277,8 +364,57 @@ class ResponseValidatorTestCase(ValidatorTestBase):
             validate_response_against_schema(self.parsed_data, spec)
 
 
+class CompileMethodTestCase(unittest.TestCase):
+
+    def setUp(self):
+        body = json.dumps({
+            'required': ['x'],
+            'properties': {'x': {'type': 'string'}},
+        })
+        self.spec = {
+            'method': 'post',
+            'body': {'application/json': {'schema': body}},
+            'responses': {
+                '200': {'body': {'application/json': {'schema': body}}},
+                '204': None,
+            },
+        }
+
+    def test_compile_method_keeps_request_schema(self):
+        compiled = compile_method(self.spec)
+        self.assertEqual(compiled.request_schema.schema['required'], ['x'])
+
+    def test_compile_method_relaxes_response_schema(self):
+        compiled = compile_method(self.spec)
+        self.assertNotIn('required', compiled.responses['200'].schema)
+        self.assertIsNone(compiled.responses['204'])
+
+    def test_compile_method_shares_body_schemas(self):
+        body_schemas = {}
+        first = compile_method(self.spec, body_schemas)
+        second = compile_method(deepcopy(self.spec), body_schemas)
+        self.assertIs(first.request_schema, second.request_schema)
+        self.assertIs(first.responses['200'], second.responses['200'])
+
+    def test_compile_method_responses_are_read_only(self):
+        compiled = compile_method(self.spec)
+        with self.assertRaises(TypeError):
+            compiled.responses['201'] = None
+
+
 class GetSpecTestCase(RequestValidatorTestCase):
 
+    def test_get_spec_from_route_index_is_compiled(self):
+        spec = get_spec(self.parsed_data, RouteIndex(self.raw_schema))
+        self.assertIsInstance(spec, CompiledMethod)
+        self.assertEqual(spec.required_params, ('required_param',))
+        validate_request_against_schema(self.parsed_data, spec)
+
+    def test_get_spec_from_route_index_raises_when_method_not_found(self):
+        request_info = self.parsed_data._replace(method='YAR')
+        with self.assertRaises(UndefinedSchemaError):
+            get_spec(request_info, RouteIndex(self.raw_schema))
+
     def test__find_schema_deep_endpoint_past_uri_param(self):
         path_segments = {
             'remaining': ['/api', '/v5', '/test', '/fake_id:12', '/extended'],
@@ -390,6 +526,111 @@ class GetSpecTestCase(RequestValidatorTestCase):
             get_spec(request_info, self.raw_schema)
 
 
+class RouteIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.schema = {
+            'resources': [
+                {
+                    'relativeUri': '/user/{user_id}',
+                    'uriParameters': {
+                        'user_id': {'type': 'string', 'pattern': '^user:'},
+                    },
+                    'resources': [{'relativeUri': '/posts'}],
+                },
+                {'relativeUri': '/user/me'},
+                {
+                    'relativeUri': '/user/{any_id}',
+                    'uriParameters': {'any_id': {'type': 'string'}},
+                    'resources': [{'relativeUri': '/likes'}],
+                },
+            ]
+        }
+        self.index = RouteIndex(self.schema)
+
+    def test_lookup_prefers_literal_segments(self):
+        resource = self.index.lookup(['/user', '/me'])
+        self.assertIs(resource, self.schema['resources'][1])
+
+    def test_lookup_validates_uri_parameters(self):
+        resource = self.index.lookup(['/user', '/user:1', '/posts'])
+        self.assertIs(resource, self.schema['resources'][0]['resources'][0])
+
+    def test_lookup_tries_sibling_uri_parameters(self):
+        resource = self.index.lookup(['/user', '/user:1', '/likes'])
+        self.assertIs(resource, self.schema['resources'][2]['resources'][0])
+
+    def test_lookup_remembers_uri_parameter_matches(self):
+        segment_matches.clear()
+        self.index.lookup(['/user', '/user:1', '/likes'])
+        key = json.dumps(
+            self.schema['resources'][0]['uriParameters']['user_id'],
+            sort_keys=True)
+        self.assertIs(segment_matches[key, '/user:1'], True)
+        segment_matches[key, '/user:1'] = False
+        # the cached mismatch is used rather than the schema
+        resource = self.index.lookup(['/user', '/user:1', '/posts'])
+        self.assertIsNone(resource)
+        segment_matches.clear()
+
+    def test_lookup_returns_none_for_partial_path(self):
+        self.assertIsNone(self.index.lookup(['/user']))
+
+    def test_size_counts_resources(self):
+        self.assertEqual(self.index.size, 5)
+
+
+class SchemaInternerTestCase(unittest.TestCase):
+
+    def test_equal_values_are_shared(self):
+        interner = SchemaInterner()
+        first = interner.intern({'type': 'object', 'required': ['a']})
+        second = interner.intern({'type': 'object', 'required': ['a']})
+        self.assertIs(first, second)
+        nested = interner.intern({'items': {'type': 'object',
+                                            'required': ['a']}})
+        self.assertIs(nested['items'], first)
+
+    def test_different_values_are_not_shared(self):
+        interner = SchemaInterner()
+        self.assertIsNot(interner.intern({'maximum': 1}),
+                         interner.intern({'maximum': True}))
+        self.assertIsNot(interner.intern([1]), interner.intern([1.0]))
+
+    def test_intern_is_idempotent(self):
+        interner = SchemaInterner()
+        schema = {'properties': {'a': {'type': 'string'}}}
+        shared = interner.intern(schema)
+        self.assertIs(shared, schema)
+        self.assertIs(interner.intern(shared), shared)
+
+    def test_share_schemas_between_indexes(self):
+        resource = {
+            'relativeUri': '/user/{user_id}',
+            'uriParameters': {'user_id': {'type': 'string'}},
+            'methods': [{
+                'method': 'post',
+                'queryParameters': {'page': {'type': 'integer'}},
+                'body': {'application/json': {
+                    'schema': '{"properties": {"a": {"type": "string"}}}'}},
+            }],
+        }
+        indexes = [RouteIndex({'resources': [deepcopy(resource)]})
+                   for _ in range(2)]
+        interner = SchemaInterner()
+        for index in indexes:
+            index.share_schemas(interner)
+        (first, second) = [list(index.schemas()) for index in indexes]
+        self.assertEqual(len(first), 3)
+        for (schema, other) in zip(first, second):
+            self.assertIs(schema, other)
+
+        data = Data('/user/1', 'post', None, None)
+        method = indexes[1].get_method(data)
+        self.assertIs(method.request_schema, indexes[1].body_schemas[0])
+        self.assertIs(method.query_parameters['page'], first[1])
+
+
 class GetPathSegmentsTestCase(unittest.TestCase):
 
     def test__get_path_segments_with_four_segments(self):
@@ -456,6 +697,68 @@ class ParserTestCase(unittest.TestCase):
         self.assertEqual(data.request.query_data, expected)
         self.assertIsInstance(data.request.query_data['list_item'], list)
 
+    def test_parse_value_parses_as_parse_from_string(self):
+        strings = [
+            '', 'a', 'true', 'false', 'null', 'True', '0', '-0', '01', '12',
+            '-3', '1.5', '1.', '.5', '1e3', '1E-2', '-1.5e+2', '1e999', 'NaN',
+            'Infinity', '-Infinity', '"quoted"', '[1, 2]', '{"a": 1}', ' 1',
+            '1 ', 'a,b', '1,true,x', ',', 'a,,b', '[1,2', '{a', '-', 'x y',
+        ]
+        for string in strings:
+            self.assertEqual(
+                repr(_parse_value(string)), repr(_parse_from_string(string)),
+                string)
+
+    def test_parse_data_leaves_query_raw(self):
+        data = parse_data(self.request_w_query_string, parse_query=False)
+        self.assertIsInstance(data.request.query_data, RawQuery)
+        self.assertEqual(data.request.query_data['a_number'], ['1'])
+
+    def test_parse_query_data_parses_declared_types(self):
+        self.request_w_query_string['query_string'] = (
+            'name=true&code=1e3&since=Sun%2C%2006%20Nov%201994&n=1&tags=a%2C1')
+        data = parse_data(self.request_w_query_string, parse_query=False)
+        spec = compile_method({
+            'method': 'post',
+            'queryParameters': {
+                'name': {'type': 'string'},
+                'code': {'type': 'string'},
+                'since': {'type': 'date'},
+                'n': {'type': 'integer'},
+                'tags': {'type': 'string'},
+            },
+        })
+        data = parse_query_data(data, spec)
+        self.assertEqual(data.request.query_data, {
+            'name': 'true',
+            'code': '1e3',
+            'since': 'Sun, 06 Nov 1994',
+            'n': 1,
+            'tags': ['a', '1'],
+        })
+        # parsed values are left as they are
+        self.assertIs(parse_query_data(data, spec), data)
+
+    def test_parse_query_data_splits_date_lists(self):
+        self.request_w_query_string['query_string'] = (
+            'since=2020-01-01,2020-01-02')
+        data = parse_data(self.request_w_query_string, parse_query=False)
+        spec = compile_method({
+            'method': 'post',
+            'queryParameters': {'since': {'type': 'date'}},
+        })
+        data = parse_query_data(data, spec)
+        self.assertEqual(data.request.query_data,
+                         {'since': ['2020-01-01', '2020-01-02']})
+
+    def test_parse_query_data_parses_undeclared_params(self):
+        data = parse_data(
+            deepcopy(self.request_w_query_string), parse_query=False)
+        data = parse_query_data(data, compile_method({'method': 'post'}))
+        self.assertEqual(
+            data.request.query_data,
+            parse_data(deepcopy(self.request_w_query_string)).request.query_data)
+
     def test_parse_request_raises_when_missing_required_path_field(self):
         # Asserts on Falsy
         self.request_w_query_string['path_info'] = None
@@ -494,6 +797,99 @@ class ParserTestCase(unittest.TestCase):
             parse_data(self.request_w_query_string)
 
 
+class EnvelopeTestCase(unittest.TestCase):
+
+    def test__is_envelope_agrees_with_schema(self):
+        """
+        _is_envelope() accepts exactly what pedantic_api.json accepts
+        """
+        valid = {'path_info': '/a', 'method': 'GET', 'request': {}}
+        cases = [
+            valid,
+            {'path_info': '', 'method': 'GET', 'response': {},
+             'status_code': 200.5},
+            dict(valid, query_string='a=1', response={}, status_code=200),
+            dict(valid, status_code=True),
+            dict(valid, status_code='200'),
+            dict(valid, request=[]),
+            dict(valid, path_info=None),
+            dict(valid, method=1),
+            dict(valid, query_string=None),
+            dict(valid, unknown=1),
+            {'path_info': '/a', 'request': {}},
+            {'path_info': '/a', 'method': 'GET'},
+            {'path_info': '/a', 'method': 'GET', 'response': {}},
+            [],
+            None,
+        ]
+        for case in cases:
+            try:
+                _validate(case, LOCAL_SCHEMA)
+            except ValidationError:
+                expected = False
+            else:
+                expected = True
+            self.assertEqual(_is_envelope(case), expected, case)
+
+
+class ErrorRecordTestCase(RequestTestBase):
+
+    def test_validation_error_lists_records(self):
+        """
+        JSONSchemaValidationError.errors holds one record per violation
+        """
+        req_info = self.parsed_data._replace(request=Request(
+            {'x': 1, 'y': ['foo']}, {'required_param': 'a', 'nope': '1'}))
+        with self.assertRaises(JSONSchemaValidationError) as ctx:
+            validate_request_against_schema(req_info, self.spec)
+        errors = ctx.exception.errors
+        self.assertEqual(
+            [(e.location, e.pointer, e.keyword) for e in errors],
+            [('query', '/nope', 'queryParameters'),
+             ('request', '/x', 'type'),
+             ('request', '/y/0', 'anyOf')])
+        self.assertEqual(len(errors[2].context), 2)
+
+    def test_render_echoes_fixture_on_demand(self):
+        req_info = self.parsed_data._replace(
+            request=Request({'x': 1}, None))
+        with self.assertRaises(JSONSchemaValidationError) as ctx:
+            validate_request_against_schema(req_info, self.spec)
+        self.assertIn('Request detail', ctx.exception.render())
+        self.assertNotIn('Request detail', ctx.exception.render(0))
+        self.assertIn(" - .x: 1 is not of type 'string'",
+                      ctx.exception.render(0))
+
+    def test_query_errors_keep_their_text(self):
+        req_info = self.parsed_data._replace(request=Request(None, {
+            'optional_param': [1, 'not a number'],
+            'date_param': 'not a date',
+            'nope': '1'}))
+        with self.assertRaises(JSONSchemaValidationError) as ctx:
+            validate_request_against_schema(req_info, self.spec)
+        self.assertEqual(
+            ctx.exception.render(0),
+            "\n\nRequest query param validation errors...\n\n"
+            " - Missing required query param: 'required_param'\n"
+            " - : 'not a number' is not of type 'number'\n"
+            " - Request query param 'not a date' does not conform to any"
+            " known date format.\n"
+            " - Query parameter ''nope'' undefined in specification.\n")
+        self.assertEqual(
+            [e.pointer for e in ctx.exception.errors],
+            ['/required_param', '/optional_param/1', '/date_param', '/nope'])
+
+    def test_pointer_escapes_path(self):
+        record = ErrorRecord(
+            'request', ('a/b', 'c~d', 0), 'type', 'message', (), ())
+        self.assertEqual(record.pointer, '/a~1b/c~0d/0')
+
+    def test_echo_is_capped(self):
+        self.assertEqual(_echo({'a': [1, 2]}, 100), '{"a": [1, 2]}')
+        self.assertEqual(_echo(list(range(10000)), 10),
+                         '[0, 1, 2, ... (truncated)')
+
+
 class WhiteListTestCase(unittest.TestCase):
 
     def setUp(self):
@@ -559,6 +955,53 @@ class WhiteListTestCase(unittest.TestCase):
         self.assertTrue(is_whitelisted(self.request, whitelist))
 
 
+class CompiledWhitelistTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.entries = [
+            {'path': '^/any/'},
+            {'path': '^/method/', 'method': 'POST'},
+            {'path': '^/code/', 'method': 'PUT', 'code': 200},
+            {'path': r'^/(a)\1/'},
+            {'path': '^/(?P<x>one)/'},
+            {'path': '^/(?P<x>two)/'},
+        ]
+        self.whitelist = Whitelist(self.entries)
+
+    def match(self, path, method=None, code=None):
+        response = Response(response_data={}, status_code=code)
+        info = Data(path=path, method=method, request=None, response=response)
+        return self.whitelist.match(info)
+
+    def test_match_agrees_with_entries(self):
+        cases = [
+            ('/any/x', 'GET', None),
+            ('/method/x', 'POST', None),
+            ('/method/x', 'GET', None),
+            ('/method/x', None, None),
+            ('/code/x', 'PUT', 200),
+            ('/code/x', 'PUT', 201),
+            ('/code/x', 'POST', 200),
+            ('/code/x', 'PUT', None),
+            ('/aa/', 'GET', None),
+            ('/ab/', 'GET', None),
+            ('/one/', 'GET', None),
+            ('/two/', 'GET', None),
+            ('/none/', 'GET', None),
+        ]
+        expected = [True, True, False, True, True, False, False, False,
+                    True, False, True, True, False]
+        self.assertEqual([self.match(*case) for case in cases], expected)
+
+    def test_len_counts_entries(self):
+        self.assertEqual(len(self.whitelist), len(self.entries))
+        self.assertFalse(Whitelist([]))
+
+    def test_is_whitelisted_accepts_compiled_whitelist(self):
+        info = Data(path='/any/', method='GET', request=None, response=None)
+        self.assertTrue(is_whitelisted(info, self.whitelist))
+
+
 class RemoveRequiredTestCase(unittest.TestCase):
 
     def test__remove_required(self):
@@ -639,3 +1082,55 @@ class RemoveRequiredTestCase(unittest.TestCase):
             }
 
         self.assertDictEqual(data, expected_data)
+
+
+class ValidatorRegistryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = ValidatorRegistry()
+
+    def test_get_reuses_validator_for_equal_schema(self):
+        """
+        ValidatorRegistry.get() builds one validator per distinct schema
+        """
+        first = self.registry.get({'type': 'string', 'maxLength': 2})
+        second = self.registry.get({'maxLength': 2, 'type': 'string'})
+        self.assertIs(first, second)
+        self.assertEqual(self.registry.stats(), {
+            'engine': 'jsonschema', 'hits': 1, 'misses': 1, 'fallbacks': 0,
+            'size': 1})
+
+    def test_get_builds_new_validator_for_other_schema(self):
+        first = self.registry.get({'type': 'string'})
+        second = self.registry.get({'type': 'number'})
+        self.assertIsNot(first, second)
+        self.assertEqual(self.registry.misses, 2)
+
+    def test_get_uses_explicit_key(self):
+        first = self.registry.get({'type': 'string'}, key='raw')
+        second = self.registry.get({'type': 'string'}, key='raw')
+        self.assertIs(first, second)
+        self.assertEqual(self.registry.hits, 1)
+
+    def test_clear_resets_counters(self):
+        self.registry.get({'type': 'string'})
+        self.registry.clear()
+        self.assertEqual(self.registry.stats(), {
+            'engine': 'jsonschema', 'hits': 0, 'misses': 0, 'fallbacks': 0,
+            'size': 0})
+
+    def test_codegen_engine_compiles_schemas(self):
+        self.registry.set_engine('codegen')
+        validator = self.registry.get({'type': 'string'})
+        self.assertIsInstance(validator, CompiledValidator)
+        self.assertEqual(self.registry.fallbacks, 0)
+
+    def test_codegen_engine_falls_back_to_draft4(self):
+        self.registry.set_engine('codegen')
+        validator = self.registry.get({'patternProperties': {'^x': {}}})
+        self.assertIsInstance(validator, Draft4Validator)
+        self.assertEqual(self.registry.fallbacks, 1)
+
+    def test_set_engine_rejects_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            self.registry.set_engine('fast')
@@ -0,0 +1,97 @@
+from __future__ import absolute_import, unicode_literals
+
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from copy import deepcopy
+
+from cli import pedantic as cli
+from pedantic import validator_service as val
+
+with open(os.path.join(sys.path[0], 'example_schema.json'), 'r') as f:
+    SCHEMAS = f.read()
+
+VALID = {'method': 'POST', 'path_info': '/api/v5/test/',
+         'request': {'x': 'data'}}
+INVALID = {'method': 'POST', 'path_info': '/api/v5/test/',
+           'request': {'x': 1}}
+
+
+class CheckTestCase(unittest.TestCase):
+
+    def setUp(self):
+        val.set_proxy_settings(deepcopy(SCHEMAS), None)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write(content if isinstance(content, str) else
+                    json.dumps(content))
+        return path
+
+    def check(self, *patterns):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            status = cli.check(list(patterns))
+        return status, output.getvalue()
+
+    def test_find_fixtures_walks_directories_in_order(self):
+        second = self.write('b/second.json', VALID)
+        first = self.write('a/first.json', VALID)
+        self.write('a/notes.txt', 'not a fixture')
+        self.assertEqual(cli.find_fixtures([self.directory]), [first, second])
+
+    def test_find_fixtures_expands_globs(self):
+        nested = self.write('a/b/nested.fixture.json', VALID)
+        top = self.write('top.fixture.json', VALID)
+        self.write('other.json', VALID)
+        pattern = os.path.join(self.directory, '**', '*.fixture.json')
+        self.assertEqual(sorted(cli.find_fixtures([pattern])),
+                         sorted([nested, top]))
+
+    def test_check_file_validates_each_fixture_of_a_list(self):
+        path = self.write('list.json', [VALID, INVALID])
+        self.assertEqual(cli.check_file(path)[0], path)
+        results = cli.check_file(path)[1]
+        self.assertEqual([(name, status) for (name, _, status) in results],
+                         [(path + '[0]', 200), (path + '[1]', 400)])
+
+    def test_check_file_reports_unreadable_files(self):
+        invalid = self.write('invalid.json', '{not json')
+        missing = os.path.join(self.directory, 'missing.json')
+        for path in (invalid, missing):
+            ((name, value, status),) = cli.check_file(path)[1]
+            self.assertEqual((name, status), (path, 400))
+            self.assertIn('Pedantic error', value['error'])
+
+    def test_check_exits_zero_when_all_pass(self):
+        self.write('one.json', VALID)
+        self.write('many.json', [VALID, VALID])
+        status, output = self.check(self.directory)
+        self.assertEqual(status, 0)
+        self.assertIn('3 fixtures in 2 files: 3 ok', output)
+
+    def test_check_exits_one_on_failures(self):
+        self.write('one.json', VALID)
+        self.write('bad.json', [VALID, INVALID])
+        self.write('broken.json', '{not json')
+        status, output = self.check(self.directory)
+        self.assertEqual(status, 1)
+        self.assertIn('4 fixtures in 3 files: 2 ok, 0 whitelisted, 2 failed',
+                      output)
+        self.assertIn('FAIL {} (400)'.format(
+            os.path.join(self.directory, 'bad.json[1]')), output)
+
+    def test_check_exits_one_without_fixtures(self):
+        status, output = self.check(os.path.join(self.directory, '*.json'))
+        self.assertEqual(status, 1)
+        self.assertIn('No fixture files found', output)
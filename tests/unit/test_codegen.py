@@ -0,0 +1,122 @@
+from __future__ import absolute_import, unicode_literals
+
+import json
+import os
+import sys
+import unittest
+
+from jsonschema.validators import Draft4Validator
+
+from pedantic.check_against_schema import _get_pretty_path
+from pedantic.codegen import compile_schema
+
+with open(os.path.join(sys.path[0], 'example_schema.json'), 'r') as f:
+    EXAMPLE_SPEC = json.load(f)
+
+
+def _summary(errors):
+    return [
+        (
+            _get_pretty_path(error.path),
+            list(error.schema_path),
+            error.message,
+            error.validator,
+            [(list(e.schema_path), e.message) for e in error.context],
+        )
+        for error in errors
+    ]
+
+
+def _body_schemas(resource):
+    for method in resource.get('methods', ()):
+        bodies = [method] + list((method.get('responses') or {}).values())
+        for body in bodies:
+            try:
+                yield json.loads(body['body']['application/json']['schema'])
+            except (KeyError, TypeError):
+                pass
+    for child in resource.get('resources', ()):
+        for schema in _body_schemas(child):
+            yield schema
+
+
+class CompileSchemaTestCase(unittest.TestCase):
+
+    schemas = [
+        {
+            'type': 'object',
+            'required': ['a', 'b'],
+            'additionalProperties': False,
+            'properties': {
+                'a': {'type': ['string', 'null'], 'pattern': '^a%',
+                      'minLength': 2, 'maxLength': 4},
+                'b': {'enum': [1, 2, 'x']},
+                'c': {'type': 'array', 'minItems': 1, 'maxItems': 2,
+                      'items': {'type': 'integer', 'minimum': 0}},
+                'd': {'type': 'array',
+                      'items': [{'type': 'string'}, {'type': 'number'}]},
+            },
+        },
+        {
+            'properties': {
+                'x': {'anyOf': [{'type': 'string', 'maxLength': 2},
+                                {'type': 'integer', 'minimum': 5}]},
+                'y': {'oneOf': [{'type': 'object', 'required': ['q']},
+                                {'type': 'object'},
+                                {'type': 'null'}]},
+                'z': {'allOf': [{'minimum': 1, 'exclusiveMinimum': True},
+                                {'maximum': 10, 'exclusiveMaximum': True}]},
+            },
+            'additionalProperties': {'type': 'boolean'},
+        },
+    ]
+
+    instances = [
+        {},
+        {'a': 'a%bc', 'b': 1, 'c': [1], 'd': ['x', 1, None]},
+        {'a': 'b', 'b': 3, 'c': [], 'd': [1, 'x'], 'e': 1, 'f': 2},
+        {'a': None, 'b': True, 'c': [-1, 1.5, True], 'd': []},
+        {'x': 'abc', 'y': {}, 'z': 1, 'w': 'no'},
+        {'x': 7, 'y': {'q': 1}, 'z': 10, 'w': False},
+        {'x': None, 'y': 'no', 'z': 0.5},
+        [], 'string', 3, 2.5, None, True,
+    ]
+
+    def assertSameErrors(self, schema, instance):
+        expected = _summary(Draft4Validator(schema).iter_errors(instance))
+        compiled = compile_schema(schema)
+        self.assertIsNotNone(compiled)
+        actual = _summary(compiled.iter_errors(instance))
+        self.assertEqual(actual, expected)
+
+    def test_compiled_schema_yields_same_errors_as_draft4(self):
+        for schema in self.schemas:
+            for instance in self.instances:
+                self.assertSameErrors(schema, instance)
+
+    def test_compiled_example_schemas_yield_same_errors_as_draft4(self):
+        for schema in _body_schemas(EXAMPLE_SPEC):
+            for instance in self.instances:
+                self.assertSameErrors(schema, instance)
+
+    def test_is_valid(self):
+        compiled = compile_schema({'type': 'string'})
+        self.assertTrue(compiled.is_valid('x'))
+        self.assertFalse(compiled.is_valid(1))
+
+    def test_unsupported_keywords_are_not_compiled(self):
+        self.assertIsNone(compile_schema({'$ref': '#/definitions/a'}))
+        self.assertIsNone(compile_schema({'properties': {'a': {'not': {}}}}))
+        self.assertIsNone(compile_schema({
+            'patternProperties': {'^a': {}},
+            'additionalProperties': False,
+        }))
+
+    def test_invalid_patterns_are_not_compiled(self):
+        self.assertIsNone(compile_schema({
+            'properties': {'a': {'type': 'string', 'pattern': '(unclosed'}},
+        }))
+
+    def test_unknown_keywords_are_ignored(self):
+        compiled = compile_schema({'displayName': 'x', 'format': 'email'})
+        self.assertEqual(list(compiled.iter_errors('nope')), [])
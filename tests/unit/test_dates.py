@@ -0,0 +1,67 @@
+from __future__ import absolute_import, unicode_literals
+
+import unittest
+
+from dateutil.parser import parse as parse_date
+
+from pedantic import dates
+
+
+class DatesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        dates.clear()
+
+    def tearDown(self):
+        dates.clear()
+
+    def test_recognizes_rfc_2616_and_iso_8601_dates(self):
+        for value in [
+            'Sun, 06 Nov 1994 08:49:37 GMT',
+            'Sunday, 06-Nov-94 08:49:37 GMT',
+            'Sun Nov  6 08:49:37 1994',
+            'Sun Nov 16 08:49:37 1994',
+            '1994-11-06',
+            '1994-11-06T08:49',
+            '1994-11-06T08:49:37.250Z',
+            '1994-11-06T08:49:37+01:00',
+            '2024-02-29',
+        ]:
+            self.assertTrue(dates.recognize(value), value)
+            # dateutil agrees
+            parse_date(value)
+
+    def test_leaves_other_strings_to_dateutil(self):
+        for value in ['Nov 6 1994', '06/11/1994', 'not a date', '']:
+            self.assertIsNone(dates.recognize(value), value)
+
+    def test_rejects_dates_out_of_range(self):
+        for value in ['1994-02-30', '1994-11-06T24:00:00',
+                      'Sun, 31 Nov 1994 08:49:37 GMT', '2023-02-29']:
+            self.assertIs(dates.recognize(value), False, value)
+
+    def test_is_date(self):
+        self.assertTrue(dates.is_date('Sun, 06 Nov 1994 08:49:37 GMT'))
+        self.assertTrue(dates.is_date('Nov 6 1994'))
+        self.assertFalse(dates.is_date('not a date'))
+
+    def test_dates_out_of_range_are_not_dates(self):
+        self.assertFalse(dates.is_date('1994-02-30'))
+        self.assertFalse(dates.is_date('Feb 30 1994'))
+
+    def test_is_date_remembers_values(self):
+        dates.is_date('not a date')
+        dates.is_date('1994-11-06')
+        self.assertEqual(
+            dates._memo, {'not a date': False, '1994-11-06': True})
+
+    def test_memo_is_bounded(self):
+        max_memo = dates.MAX_MEMO
+        dates.MAX_MEMO = 4
+        try:
+            for day in range(1, 11):
+                dates.is_date('1994-02-{:02d}'.format(day))
+                self.assertLessEqual(len(dates._memo), 4)
+        finally:
+            dates.MAX_MEMO = max_memo
+        self.assertIn('1994-02-10', dates._memo)
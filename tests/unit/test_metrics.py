@@ -0,0 +1,49 @@
+from __future__ import absolute_import, unicode_literals
+
+import unittest
+
+from pedantic.metrics import Counter, Gauge, Histogram, expose
+
+
+class MetricsTestCase(unittest.TestCase):
+
+    def test_counter_reports_known_values(self):
+        counter = Counter('fixtures_total', 'Fixtures.', 'outcome',
+                          ('ok', 'invalid'))
+        counter.inc('ok')
+        counter.inc('ok')
+        self.assertEqual(counter.get('ok'), 2)
+        self.assertEqual(expose([counter]), '\n'.join([
+            '# HELP fixtures_total Fixtures.',
+            '# TYPE fixtures_total counter',
+            'fixtures_total{outcome="invalid"} 0',
+            'fixtures_total{outcome="ok"} 2',
+        ]) + '\n')
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram('phase_seconds', 'Phases.', 'phase', ('parse',),
+                              buckets=(0.001, 0.01))
+        for seconds in (0.0005, 0.001, 0.005, 1):
+            histogram.observe('parse', seconds)
+        self.assertEqual(histogram.count('parse'), 4)
+        self.assertEqual(expose([histogram]).splitlines()[2:], [
+            'phase_seconds_bucket{phase="parse",le="0.001"} 2',
+            'phase_seconds_bucket{phase="parse",le="0.01"} 3',
+            'phase_seconds_bucket{phase="parse",le="+Inf"} 4',
+            'phase_seconds_sum{phase="parse"} 1.0065',
+            'phase_seconds_count{phase="parse"} 4',
+        ])
+
+    def test_histogram_rejects_unknown_values(self):
+        histogram = Histogram('phase_seconds', 'Phases.', 'phase', ('parse',))
+        with self.assertRaises(KeyError):
+            histogram.observe('other', 1)
+
+    def test_gauge_is_read_when_exposed(self):
+        values = [('a"b', 1)]
+        gauge = Gauge('spec_resources', 'Resources.', 'spec', lambda: values)
+        values.append(('c', 2))
+        self.assertEqual(expose([gauge]).splitlines()[2:], [
+            'spec_resources{spec="a\\"b"} 1',
+            'spec_resources{spec="c"} 2',
+        ])
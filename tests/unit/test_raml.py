@@ -0,0 +1,178 @@
+from __future__ import absolute_import, unicode_literals
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from pedantic import raml
+from pedantic.check_against_schema import (
+    Data,
+    Request,
+    Response,
+    RouteIndex,
+    JSONSchemaValidationError,
+    validate_request_against_schema,
+)
+
+SPEC = """#%RAML 0.8
+---
+title: Example API
+mediaType: application/json
+documentation:
+  - title: Home
+    content: Not needed
+schemas:
+  - thing: !include schemas/thing.json
+traits:
+  - paged:
+      queryParameters:
+        <<prefix>>_page:
+          type: integer
+          description: Page of <<resourcePathName | !pluralize>>
+  - secured:
+      headers:
+        Authorization:
+resourceTypes:
+  - collection:
+      is: [secured]
+      get?:
+        description: List of <<resourcePathName>>
+      post:
+        body:
+          schema: <<item>>
+        responses:
+          201:
+            body:
+              schema: <<item>>
+  - member:
+      type: { collection: { item: thing } }
+      uriParameters:
+        <<resourcePathName | !singularize>>_id:
+          pattern: ^\\d+$
+
+/things:
+  type: { collection: { item: thing } }
+  get:
+    is: [{ paged: { prefix: thing } }]
+  /{thing_id}:
+    type: member
+    put:
+      body:
+        schema: !include schemas/thing.json
+      responses:
+        200:
+        204: !include responses/empty.yaml
+"""
+
+
+class LoadTestCase(unittest.TestCase):
+
+    def setUp(self):
+        if raml.yaml is None:
+            self.skipTest("PyYAML is not installed")
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.thing = json.dumps({
+            'required': ['name'],
+            'properties': {'name': {'type': 'string'}},
+        })
+        self.write('schemas/thing.json', self.thing)
+        self.write('responses/empty.yaml', 'description: Nothing\n')
+        self.spec = raml.load(self.write('api.raml', SPEC))
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def methods(self, resource):
+        return dict(
+            (method['method'], method) for method in resource['methods'])
+
+    def test_load_expands_resources(self):
+        self.assertNotIn('documentation', self.spec)
+        things = self.spec['resources'][0]
+        self.assertEqual(things['relativeUri'], '/things')
+        self.assertEqual(things['relativeUriPathSegments'], ['things'])
+        member = things['resources'][0]
+        self.assertEqual(member['relativeUri'], '/{thing_id}')
+        self.assertEqual(member['uriParameters'], {
+            'thing_id': {
+                'displayName': 'thing_id',
+                'type': 'string',
+                'pattern': '^\\d+$',
+                'required': True,
+            },
+        })
+
+    def test_load_applies_resource_types_and_traits(self):
+        methods = self.methods(self.spec['resources'][0])
+        self.assertEqual(sorted(methods), ['get', 'post'])
+        get = methods['get']
+        self.assertEqual(get['description'], 'List of things')
+        self.assertEqual(get['queryParameters']['thing_page']['type'],
+                         'integer')
+        self.assertEqual(
+            get['queryParameters']['thing_page']['description'],
+            'Page of things')
+        self.assertIn('Authorization', get['headers'])
+        post = methods['post']
+        self.assertEqual(post['body'],
+                         {'application/json': {'schema': self.thing}})
+        self.assertEqual(post['responses']['201']['body'],
+                         {'application/json': {'schema': self.thing}})
+
+    def test_load_skips_optional_methods(self):
+        member = self.spec['resources'][0]['resources'][0]
+        self.assertEqual(sorted(self.methods(member)), ['post', 'put'])
+
+    def test_load_includes_relative_files(self):
+        member = self.spec['resources'][0]['resources'][0]
+        put = self.methods(member)['put']
+        self.assertEqual(put['body']['application/json']['schema'],
+                         self.thing)
+        self.assertEqual(put['responses'],
+                         {'200': None, '204': {'description': 'Nothing'}})
+
+    def test_loaded_spec_validates_requests(self):
+        data = Data('/things/1', 'put', Request({'name': 1}, None), None)
+        method = RouteIndex(self.spec).get_method(data)
+        with self.assertRaises(JSONSchemaValidationError):
+            validate_request_against_schema(data, method)
+
+    def test_example_spec(self):
+        path = os.path.join(sys.path[0], 'example_schema.raml')
+        spec = raml.load(path)
+        data = Data('/api/test', 'post',
+                    Request({'x': 'a'}, {'required_param': 'a'}),
+                    Response(None, 200))
+        method = RouteIndex(spec).get_method(data)
+        self.assertEqual(method.required_params, ('required_param',))
+        validate_request_against_schema(data, method)
+
+    def test_load_rejects_other_versions(self):
+        path = self.write('v1.raml', '#%RAML 1.0\ntitle: API\n')
+        with self.assertRaises(raml.RamlError):
+            raml.load(path)
+
+    def test_load_rejects_undefined_trait(self):
+        path = self.write('bad.raml', '#%RAML 0.8\n/a:\n  get:\n    is: [x]\n')
+        with self.assertRaises(raml.RamlError):
+            raml.load(path)
+
+    def test_load_rejects_malformed_nodes(self):
+        for text in [
+            '#%RAML 0.8\n/a:\n  post:\n    body: a string\n',
+            '#%RAML 0.8\n/a:\n  get:\n    queryParameters:\n      q: 1\n',
+            '#%RAML 0.8\n/a: [1, 2]\n',
+            '#%RAML 0.8\n/a:\n  get: [1]\n',
+        ]:
+            path = self.write('malformed.raml', text)
+            with self.assertRaises(raml.RamlError):
+                raml.load(path)
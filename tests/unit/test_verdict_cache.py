@@ -0,0 +1,45 @@
+from __future__ import absolute_import, unicode_literals
+
+import unittest
+
+from pedantic.verdict_cache import VerdictCache
+
+
+class VerdictCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = VerdictCache(max_size=2)
+
+    def test_key_ignores_key_order(self):
+        first = self.cache.key({'a': 1, 'b': [1, 2]}, 1)
+        second = self.cache.key({'b': [1, 2], 'a': 1}, 1)
+        self.assertEqual(first, second)
+
+    def test_key_depends_on_context(self):
+        fixture = {'a': 1}
+        self.assertNotEqual(self.cache.key(fixture, 1),
+                            self.cache.key(fixture, 2))
+
+    def test_get_returns_copy(self):
+        self.cache.set('key', {'message': 'ok'}, 200)
+        value, status = self.cache.get('key')
+        value['status'] = status
+        self.assertEqual(self.cache.get('key'), ({'message': 'ok'}, 200))
+
+    def test_least_recently_used_is_evicted(self):
+        self.cache.set('a', {}, 200)
+        self.cache.set('b', {}, 200)
+        self.cache.get('a')
+        self.cache.set('c', {}, 200)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertIsNotNone(self.cache.get('a'))
+        stats = self.cache.stats()
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['size'], 2)
+
+    def test_disabled_cache_keeps_nothing(self):
+        self.cache.resize(0)
+        self.cache.set('a', {}, 200)
+        self.assertEqual(len(self.cache), 0)